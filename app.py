@@ -25,6 +25,10 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_bp)
     
+    # Settle async (pending) transactions inside this process if configured
+    if app.config['SETTLEMENT_EMBEDDED_WORKERS']:
+        from jobs.settle_pending import SettlementPool
+        app.extensions['settlement_pool'] = SettlementPool(workers=app.config['SETTLEMENT_EMBEDDED_WORKERS']).start()
 
     # Home route
     @app.route('/')
@@ -0,0 +1,84 @@
+# benchmarks/account_cache.py
+"""Database reads per customer page view, with and without the account cache.
+
+    python benchmarks/account_cache.py --rounds 50
+
+Renders the main customer pages through the Flask test client as the
+benchmark user and counts SELECTs with the server's Com_select counter,
+so run it against a database nobody else is using.
+"""
+import argparse
+import time
+
+from common import connect, create_accounts, get_bench_user, cleanup, print_table
+from app import create_app
+from models.account_cache import account_cache
+
+PAGES = ('/dashboard', '/transfer', '/deposit', '/pay-bills', '/transactions', '/profile', '/statements')
+
+
+def selects(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Com_select'")
+    value = int(cursor.fetchone()['Value'])
+    cursor.close()
+    return value
+
+
+def run(client, monitor, rounds):
+    """{page: (selects per view, ms per view)}"""
+    results = {}
+    for page in PAGES:
+        client.get(page)  # warm the caches the way a previous visit would
+        before = selects(monitor)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            response = client.get(page)
+            assert response.status_code == 200, (page, response.status_code)
+        elapsed = time.perf_counter() - started
+        results[page] = ((selects(monitor) - before) / rounds, elapsed * 1000 / rounds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--accounts', type=int, default=3)
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    monitor = connect(autocommit=True)
+    create_accounts(monitor, args.accounts, 1000, tag='AC')
+    user_id = get_bench_user(monitor)
+
+    app = create_app()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=user_id, username='bench_runner', role='customer')
+
+    ttl = account_cache.ttl
+    account_cache.ttl = 0
+    uncached = run(client, monitor, args.rounds)
+    account_cache.ttl = ttl
+    cached = run(client, monitor, args.rounds)
+
+    rows = []
+    for page in PAGES:
+        before, after = uncached[page][0], cached[page][0]
+        rows.append((page, f"{before:.1f}", f"{after:.1f}", f"{(1 - after / before) * 100 if before else 0:.0f}%",
+                     f"{uncached[page][1]:.1f}", f"{cached[page][1]:.1f}"))
+    total_before = sum(v[0] for v in uncached.values())
+    total_after = sum(v[0] for v in cached.values())
+    rows.append(('all pages', f"{total_before:.1f}", f"{total_after:.1f}",
+                 f"{(1 - total_after / total_before) * 100 if total_before else 0:.0f}%", '', ''))
+    print_table(('page', 'selects before', 'selects after', 'saved', 'ms before', 'ms after'), rows)
+    print()
+    print(account_cache.stats())
+
+    if args.cleanup:
+        print(f"Removed {cleanup(monitor)} benchmark accounts")
+    monitor.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/batch_transfer.py
+"""Lines per second for PostingEngine.post_batch vs one transfer per line.
+
+    python benchmarks/batch_transfer.py --sizes 1000,10000,50000 --destinations 2000
+"""
+import argparse
+import random
+import time
+
+from common import connect, create_accounts, cleanup, print_table
+from models.posting import PostingEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--destinations', type=int, default=2000)
+    parser.add_argument('--single-sample', type=int, default=500,
+                        help='lines posted one by one for the baseline')
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    conn = connect()
+    engine = PostingEngine()
+    source = create_accounts(conn, 1, 10 ** 12, tag='BS')[0]
+    destinations = create_accounts(conn, args.destinations, 0, tag='BD')
+    cursor = conn.cursor()
+    placeholders = ','.join(['%s'] * len(destinations))
+    cursor.execute(f"SELECT account_id, account_number FROM accounts WHERE account_id IN ({placeholders})", destinations)
+    numbers = [r['account_number'] for r in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+
+    rows = []
+    started = time.perf_counter()
+    for _ in range(args.single_sample):
+        engine.transfer(conn, source, random.choice(destinations), 1, {'description': 'bench single'})
+    elapsed = time.perf_counter() - started
+    rows.append(('single', args.single_sample, args.single_sample, f"{elapsed:.2f}", f"{args.single_sample / elapsed:.0f}"))
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        lines = [{'to_account': random.choice(numbers), 'amount': '1.00'} for _ in range(size)]
+        # A few bad lines so per-line status is exercised
+        lines[0]['to_account'] = 'BENCHDOESNOTEXIST'
+        started = time.perf_counter()
+        results = engine.post_batch(conn, source, lines, {'description': 'bench batch'})
+        elapsed = time.perf_counter() - started
+        accepted = sum(1 for r in results if r['status'] == 'completed')
+        rows.append(('batch', size, accepted, f"{elapsed:.2f}", f"{size / elapsed:.0f}"))
+
+    print_table(('mode', 'lines', 'accepted', 'secs', 'lines/s'), rows)
+
+    if args.cleanup:
+        cleanup(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
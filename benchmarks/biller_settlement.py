@@ -0,0 +1,93 @@
+# benchmarks/biller_settlement.py
+"""Time closing and exporting a biller settlement cycle.
+
+    python benchmarks/biller_settlement.py --payments 1000000 --format fixed
+
+Seeds completed bill payments from a BENCH account with the bulk insert
+path (Transaction.create_many, as post_batch uses, plus multi-row
+bill_payments inserts), then times Biller.close_cycle and the streamed file
+export for today's cycle. Balances are not moved by the seed. Closing
+today's cycle also settles any other unsettled payments, so run it against
+a database nobody else is using.
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import date
+
+from common import connect, create_accounts, cleanup, print_table
+from models.biller import Biller
+from models.transaction import Transaction
+from jobs.settle_billers import export_cycle, WRITERS
+
+
+def seed(conn, source, count, chunk=5000):
+    cursor = conn.cursor()
+    cursor.execute("SELECT biller_id FROM billers WHERE is_active = TRUE")
+    billers = [r['biller_id'] for r in cursor.fetchall()]
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        uids = Transaction.create_many(cursor, [{
+            'from_account_id': source,
+            'transaction_type': 'payment',
+            'amount': '1.00',
+            'description': 'bench bill',
+            'status': 'completed'
+        } for _ in range(size)])
+        ids = Transaction.ids_for_uids(cursor, uids)
+        cursor.execute(f"""
+            INSERT INTO bill_payments (transaction_id, biller_id, customer_reference)
+            VALUES {', '.join(['(%s, %s, %s)'] * size)}
+        """, [v for transaction_id in ids for v in (transaction_id, random.choice(billers), 'BENCH')])
+        conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=100000)
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    cycle = date.today()
+    conn = connect()
+    source = create_accounts(conn, 1, 0, tag='BL')[0]
+
+    started = time.perf_counter()
+    seed(conn, source, args.payments)
+    seeded = time.perf_counter() - started
+
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    settlements = Biller.close_cycle(cursor, cycle)
+    conn.commit()
+    closed = time.perf_counter() - started
+    cursor.close()
+
+    out_dir = tempfile.mkdtemp(prefix='settlements-')
+    started = time.perf_counter()
+    written = export_cycle(conn, cycle, out_dir, WRITERS[args.format])
+    exported = time.perf_counter() - started
+
+    payments = sum(s['payment_count'] for s in settlements)
+    print_table(('stage', 'payments', 'secs', 'payments/s'), [
+        ('seed', args.payments, f"{seeded:.2f}", f"{args.payments / seeded:.0f}"),
+        ('close_cycle', payments, f"{closed:.2f}", f"{payments / closed:.0f}"),
+        ('export', payments, f"{exported:.2f}", f"{payments / exported:.0f}"),
+    ])
+    print(f"\n{len(written)} files in {out_dir}")
+
+    if args.cleanup:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM bill_payments WHERE settlement_id IN (SELECT settlement_id FROM biller_settlements WHERE cycle_date = %s)", (cycle,))
+        cursor.execute("DELETE FROM biller_settlements WHERE cycle_date = %s", (cycle,))
+        conn.commit()
+        cursor.close()
+        cleanup(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
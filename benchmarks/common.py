@@ -0,0 +1,113 @@
+# benchmarks/common.py
+"""Shared fixtures for the benchmark scripts.
+
+Benchmarks run against the database configured in .env / config.py and create
+their own user and accounts (account numbers prefixed with BENCH) so they never
+touch real customer rows. Pass --cleanup to remove them afterwards.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db import connect  # noqa: E402
+
+# connect is re-exported so every benchmark gets its connections from here
+__all__ = ['BENCH_USERNAME', 'BENCH_PREFIX', 'connect', 'get_bench_user', 'create_accounts',
+           'total_balance', 'cleanup', 'percentile', 'print_table']
+
+BENCH_USERNAME = 'bench_runner'
+BENCH_PREFIX = 'BENCH'
+
+
+def get_bench_user(conn):
+    """Return the benchmark user's id, creating the user if needed"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id FROM users WHERE username = %s", (BENCH_USERNAME,))
+    row = cursor.fetchone()
+    if row:
+        user_id = row['user_id']
+    else:
+        cursor.execute("""
+            INSERT INTO users (username, email, password_hash, first_name, last_name)
+            VALUES (%s, %s, 'not-a-login', 'Bench', 'Runner')
+        """, (BENCH_USERNAME, f'{BENCH_USERNAME}@bench.invalid'))
+        user_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    return user_id
+
+
+def create_accounts(conn, count, balance, tag='', **columns):
+    """Create `count` benchmark accounts and return their ids"""
+    user_id = get_bench_user(conn)
+    cursor = conn.cursor()
+    ids = []
+    stamp = str(int(time.time() * 1000))[-9:]
+    extra_cols = ''.join(f', {c}' for c in columns)
+    extra_vals = ''.join(', %s' for _ in columns)
+    for i in range(count):
+        number = f'{BENCH_PREFIX}{tag}{stamp}{i:06d}'[:30]
+        cursor.execute(f"""
+            INSERT INTO accounts (account_number, user_id, account_type, balance, available_balance, opened_date{extra_cols})
+            VALUES (%s, %s, 'checking', %s, %s, CURDATE(){extra_vals})
+        """, (number, user_id, balance, balance, *columns.values()))
+        ids.append(cursor.lastrowid)
+    conn.commit()
+    cursor.close()
+    return ids
+
+
+def total_balance(conn, account_ids):
+    """Sum of balances over the given accounts"""
+    cursor = conn.cursor()
+    placeholders = ','.join(['%s'] * len(account_ids))
+    cursor.execute(f"SELECT COALESCE(SUM(balance), 0) AS total, MIN(balance) AS lowest FROM accounts WHERE account_id IN ({placeholders})", account_ids)
+    row = cursor.fetchone()
+    conn.rollback()
+    cursor.close()
+    return row['total'], row['lowest']
+
+
+def cleanup(conn):
+    """Remove every benchmark account and the rows hanging off them.
+
+    ledger_entries is append-only, so benchmark entries stay behind.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT account_id FROM accounts WHERE account_number LIKE %s", (BENCH_PREFIX + '%',))
+    ids = [r['account_id'] for r in cursor.fetchall()]
+    if ids:
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            DELETE FROM account_postings WHERE transaction_id IN (
+                SELECT transaction_id FROM transactions
+                WHERE from_account_id IN ({placeholders}) OR to_account_id IN ({placeholders})
+            )
+        """, ids * 2)
+        cursor.execute(f"DELETE FROM transactions WHERE from_account_id IN ({placeholders}) OR to_account_id IN ({placeholders})", ids * 2)
+        cursor.execute(f"DELETE FROM account_daily_rollup WHERE account_id IN ({placeholders})", ids)
+        cursor.execute(f"DELETE FROM accounts WHERE account_id IN ({placeholders})", ids)
+    conn.commit()
+    cursor.close()
+    return len(ids)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = '  '.join(str(h).rjust(w) for h, w in zip(headers, widths))
+    print(line)
+    print('-' * len(line))
+    for row in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,80 @@
+# benchmarks/connection_pool.py
+"""Per-request connect vs pooled connection: latency of one small query.
+
+    python benchmarks/connection_pool.py --requests 2000 --threads 8 --pool-size 8
+"""
+import argparse
+import threading
+import time
+
+from common import connect, percentile, print_table
+from utils.db import ConnectionPool
+
+QUERY = "SELECT account_id, balance FROM accounts ORDER BY account_id LIMIT 1"
+
+
+def run(threads, requests, handle):
+    samples = []
+    lock = threading.Lock()
+
+    def worker(count):
+        local = []
+        for _ in range(count):
+            started = time.perf_counter()
+            handle()
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            samples.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(requests // threads,)) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples, time.perf_counter() - started
+
+
+def per_request():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(QUERY)
+    cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(connect, size=args.pool_size)
+    pool.warm_up()
+
+    def pooled():
+        conn = pool.acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(QUERY)
+            cursor.fetchall()
+            cursor.close()
+        finally:
+            pool.release(conn)
+
+    rows = []
+    for name, handle in (('connect per request', per_request), ('pool', pooled)):
+        samples, elapsed = run(args.threads, args.requests, handle)
+        rows.append((name, len(samples), f"{percentile(samples, 50):.2f}", f"{percentile(samples, 99):.2f}",
+                     f"{len(samples) / elapsed:.0f}"))
+    print_table(('mode', 'requests', 'p50 ms', 'p99 ms', 'req/s'), rows)
+    print()
+    for key, value in pool.stats().items():
+        print(f"{key:>18}: {value}")
+    pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
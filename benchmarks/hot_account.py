@@ -0,0 +1,81 @@
+# benchmarks/hot_account.py
+"""Concurrent credits into one receiving account, with and without hot slots.
+
+Every worker posts deposits to the same account. The run is repeated with the
+account flagged hot (credits spread over --slots balance slots) and the final
+balance (accounts.balance + slots) is checked against the expected total.
+
+    python benchmarks/hot_account.py --workers 16 --credits 4000 --slots 16
+"""
+import argparse
+import threading
+import time
+from decimal import Decimal
+
+from common import connect, create_accounts, cleanup, print_table
+from models.account import Account
+from models.hot_account import HotAccount, _hot_cache
+from models.posting import PostingEngine
+
+
+def run_round(account_id, workers, credits):
+    engine = PostingEngine()
+    per_worker = credits // workers
+
+    def worker():
+        conn = connect()
+        for _ in range(per_worker):
+            engine.post(conn, {'to_account_id': account_id, 'transaction_type': 'deposit',
+                               'amount': '1.00', 'description': 'hot bench'})
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_worker * workers, time.perf_counter() - started, engine.retries
+
+
+def balance(conn, account_id):
+    cursor = conn.cursor()
+    value = Account.get_by_id(cursor, account_id)['balance']
+    conn.rollback()
+    cursor.close()
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--credits', type=int, default=4000)
+    parser.add_argument('--slots', type=int, default=16)
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    conn = connect()
+    rows = []
+    for label, slots in (('single row', 0), (f'{args.slots} slots', args.slots)):
+        account_id = create_accounts(conn, 1, 0, tag='HOT')[0]
+        if slots:
+            cursor = conn.cursor()
+            HotAccount.enable(cursor, account_id, slots)
+            conn.commit()
+            cursor.close()
+        _hot_cache.clear()
+
+        posted, elapsed, retries = run_round(account_id, args.workers, args.credits)
+        final = balance(conn, account_id)
+        rows.append((label, args.workers, posted, retries, f"{elapsed:.2f}", f"{posted / elapsed:.0f}",
+                     'yes' if final == Decimal(posted) else f'NO ({final})'))
+
+    print_table(('mode', 'workers', 'credits', 'retries', 'secs', 'tps', 'balance ok'), rows)
+
+    if args.cleanup:
+        cleanup(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/log_serializer.py
+"""Records per second: the schema-driven LogSerializer vs the previous formatter.
+
+    python benchmarks/log_serializer.py --records 200000
+
+Formats the same LogRecords the BankingLogger.log_* methods produce (one
+set per event type) with the old hasattr/json.dumps JSONFormatter, kept
+here as the baseline, and with LogSerializer on each installed JSON
+backend. No database or log files are touched. The fields column counts
+top-level keys per line: the baseline drops most declared fields.
+"""
+import argparse
+import json
+import logging
+import socket
+import time
+import traceback
+from datetime import datetime
+from decimal import Decimal
+
+from common import print_table
+from utils.logger import LogSerializer, orjson
+
+
+class LegacyJSONFormatter(logging.Formatter):
+    """The JSONFormatter this replaced, unchanged"""
+
+    def __init__(self):
+        super().__init__()
+        self.hostname = socket.gethostname()
+
+    def format(self, record):
+        log_record = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'hostname': self.hostname,
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            log_record['exception'] = {
+                'type': record.exc_info[0].__name__,
+                'message': str(record.exc_info[1]),
+                'traceback': traceback.format_exception(*record.exc_info)
+            }
+        if hasattr(record, 'user_id'):
+            log_record['user_id'] = record.user_id
+        if hasattr(record, 'ip'):
+            log_record['ip_address'] = record.ip
+        if hasattr(record, 'action'):
+            log_record['action'] = record.action
+        if hasattr(record, 'details'):
+            try:
+                if isinstance(record.details, str):
+                    log_record['details'] = json.loads(record.details)
+                else:
+                    log_record['details'] = record.details
+            except:
+                log_record['details'] = record.details
+        return json.dumps(log_record)
+
+
+def sample_records():
+    """{event: LogRecord} shaped like the log_* methods' records (extras flattened for the baseline)"""
+    logger = logging.getLogger('bench')
+
+    def record(name, level, message, extra):
+        rec = logger.makeRecord(name, level, __file__, 1, message, None, None, extra=extra)
+        # The baseline only saw extras as attributes, as log_* used to set them
+        for key, value in (extra.get('fields') or {}).items():
+            rec.__dict__.setdefault(key, value)
+        return rec
+
+    return {
+        'application': record('application', logging.INFO, 'Settlement batch posted',
+                              {'fields': {'posted': 100, 'failed': 0, 'seconds': 0.42}}),
+        'transaction': record('transactions', logging.INFO, 'Transaction', {
+            'transaction_id': 'b7e1c1a0-0d6f-4a51-9d8e-5c3f1f0a9e21', 'from_account': 'ACC1000000001',
+            'to_account': 'ACC1000000002', 'amount': Decimal('125.50'), 'status': 'completed',
+            'user_id': 42, 'event_type': 'transaction', 'fields': {}}),
+        'audit': record('audit', logging.INFO, 'Audit Event', {
+            'user_id': 42, 'ip_address': '10.0.0.7', 'action': 'LOGIN_SUCCESS',
+            'details': {'username': 'jdoe', 'method': 'password'}, 'event_type': 'audit'}),
+        'error': record('errors', logging.ERROR, 'Error occurred', {
+            'error': 'Deadlock found', 'error_type': 'OperationalError',
+            'traceback': 'Traceback (most recent call last):\n  ...\nOperationalError: (1213, ...)\n',
+            'event_type': 'error', 'fields': {'context': 'transfer', 'user_id': 42}}),
+        'performance': record('performance', logging.INFO, 'Performance Metric', {
+            'endpoint': '/dashboard', 'duration_ms': 12.34, 'user_id': 42, 'event_type': 'performance'}),
+    }
+
+
+def rate(format_record, record, count):
+    """(records per second, bytes per line, top-level fields)"""
+    line = format_record(record)
+    started = time.perf_counter()
+    for _ in range(count):
+        format_record(record)
+    elapsed = time.perf_counter() - started
+    return count / elapsed, len(line.encode()), len(json.loads(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=200000, help='records formatted per event type')
+    args = parser.parse_args()
+
+    formatters = [('previous', LegacyJSONFormatter().format), ('schema/json', LogSerializer(backend='json').serialize)]
+    if orjson is not None:
+        formatters.append(('schema/orjson', LogSerializer(backend='orjson').serialize))
+
+    rows = []
+    for event, record in sample_records().items():
+        baseline = None
+        for name, format_record in formatters:
+            per_second, size, fields = rate(format_record, record, args.records)
+            baseline = baseline or per_second
+            rows.append((event, name, f"{per_second:,.0f}", f"{per_second / baseline:.2f}x", size, fields))
+    print_table(('event', 'formatter', 'records/s', 'speedup', 'bytes', 'fields'), rows)
+    if orjson is None:
+        print("\norjson is not installed; pip install orjson to include its backend")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/posting_latency.py
+"""Latency of one posting: legacy multi-statement path vs posting engine vs procedure.
+
+legacy      START TRANSACTION, INSERT, UPDATE x2, COMMIT, verification SELECT
+            (what customer.transfer/deposit/pay_bills used to send)
+statements  PostingEngine(mode='statements') - locks + INSERT + UPDATEs + COMMIT
+procedure   PostingEngine(mode='procedure')  - one CALL sp_post_transaction
+
+Needs database/procedures.sql loaded. Run against a remote MySQL to see the
+round-trip effect; on localhost the differences are small.
+
+    python benchmarks/posting_latency.py --iterations 2000
+"""
+import argparse
+import time
+import uuid
+
+from common import connect, create_accounts, cleanup, percentile, print_table
+from models.posting import PostingEngine
+
+
+def legacy_transfer(conn, from_id, to_id, amount):
+    cursor = conn.cursor()
+    cursor.execute("START TRANSACTION")
+    cursor.execute("""
+        INSERT INTO transactions (
+            transaction_uid, from_account_id, to_account_id,
+            transaction_type, amount, description, status
+        ) VALUES (%s, %s, %s, 'transfer', %s, 'bench', 'completed')
+    """, (str(uuid.uuid4()), from_id, to_id, amount))
+    cursor.execute("""
+        UPDATE accounts SET balance = balance - %s, available_balance = available_balance - %s,
+               last_transaction_date = NOW()
+        WHERE account_id = %s
+    """, (amount, amount, from_id))
+    cursor.execute("""
+        UPDATE accounts SET balance = balance + %s, available_balance = available_balance + %s,
+               last_transaction_date = NOW()
+        WHERE account_id = %s
+    """, (amount, amount, to_id))
+    conn.commit()
+    cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (from_id,))
+    cursor.fetchone()
+    cursor.close()
+
+
+def measure(label, fn, iterations, account_ids):
+    samples = []
+    for i in range(iterations):
+        a, b = account_ids[i % 2], account_ids[(i + 1) % 2]
+        started = time.perf_counter()
+        fn(a, b, 1)
+        samples.append((time.perf_counter() - started) * 1000)
+    return (label, iterations, f"{percentile(samples, 50):.2f}", f"{percentile(samples, 95):.2f}",
+            f"{percentile(samples, 99):.2f}", f"{iterations / (sum(samples) / 1000):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    conn = connect()
+    account_ids = create_accounts(conn, 2, 1000000, tag='PL')
+    statements = PostingEngine(mode='statements')
+    procedure = PostingEngine(mode='procedure')
+
+    rows = [
+        measure('legacy', lambda a, b, amt: legacy_transfer(conn, a, b, amt), args.iterations, account_ids),
+        measure('statements', lambda a, b, amt: statements.transfer(conn, a, b, amt, {'description': 'bench'}),
+                args.iterations, account_ids),
+        measure('procedure', lambda a, b, amt: procedure.transfer(conn, a, b, amt, {'description': 'bench'}),
+                args.iterations, account_ids),
+    ]
+    print_table(('path', 'ops', 'p50 ms', 'p95 ms', 'p99 ms', 'ops/s'), rows)
+
+    if args.cleanup:
+        cleanup(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/transfer_stress.py
+"""Multi-threaded transfer stress test for the posting engine.
+
+Runs random transfers (including opposing A->B / B->A pairs) over a small set
+of accounts at increasing worker counts, then checks that the balances still
+sum to the starting total and that no account went negative.
+
+    python benchmarks/transfer_stress.py --workers 1,2,4,8,16 --transfers 2000
+"""
+import argparse
+import random
+import threading
+import time
+
+from common import connect, create_accounts, total_balance, cleanup, print_table
+from models.posting import PostingEngine
+from models.errors import InsufficientFunds
+
+
+def run_round(account_ids, workers, transfers, max_amount):
+    engine = PostingEngine()
+    per_worker = transfers // workers
+    counts = {'ok': 0, 'insufficient': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def worker():
+        conn = connect()
+        rng = random.Random()
+        local = {'ok': 0, 'insufficient': 0, 'failed': 0}
+        for _ in range(per_worker):
+            src, dst = rng.sample(account_ids, 2)
+            try:
+                engine.transfer(conn, src, dst, round(rng.uniform(1, max_amount), 2),
+                                {'description': 'stress'})
+                local['ok'] += 1
+            except InsufficientFunds:
+                local['insufficient'] += 1
+            except Exception:
+                local['failed'] += 1
+        conn.close()
+        with lock:
+            for k, v in local.items():
+                counts[k] += v
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return counts, elapsed, engine.retries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--workers', default='1,2,4,8,16')
+    parser.add_argument('--transfers', type=int, default=2000, help='transfers per round')
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--max-amount', type=float, default=50.0)
+    parser.add_argument('--cleanup', action='store_true')
+    args = parser.parse_args()
+
+    conn = connect()
+    account_ids = create_accounts(conn, args.accounts, args.balance, tag='TS')
+    expected, _ = total_balance(conn, account_ids)
+
+    rows = []
+    consistent = True
+    for workers in [int(w) for w in args.workers.split(',')]:
+        counts, elapsed, retries = run_round(account_ids, workers, args.transfers, args.max_amount)
+        total, lowest = total_balance(conn, account_ids)
+        ok = total == expected and lowest >= 0
+        consistent = consistent and ok
+        rows.append((workers, counts['ok'], counts['insufficient'], counts['failed'], retries,
+                     f"{elapsed:.2f}", f"{counts['ok'] / elapsed:.1f}", 'yes' if ok else 'NO'))
+
+    print_table(('workers', 'posted', 'nsf', 'failed', 'retries', 'secs', 'tps', 'balanced'), rows)
+    print(f"\nExpected total {expected}, final total {total_balance(conn, account_ids)[0]}")
+
+    if args.cleanup:
+        cleanup(conn)
+    conn.close()
+    raise SystemExit(0 if consistent else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,91 @@ class Config:
     MYSQL_CURSORCLASS = 'DictCursor'
     MYSQL_CHARSET = 'utf8mb4'
     
+    # Connection pool (per worker process, see utils/db.py PooledMySQL)
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 10))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))
+    MYSQL_POOL_RECYCLE = int(os.getenv('MYSQL_POOL_RECYCLE', 1800))
+    # Ping a connection idle at least this many seconds before reuse (0 = always)
+    MYSQL_POOL_PING_AFTER = int(os.getenv('MYSQL_POOL_PING_AFTER', 30))
+    # Connections opened when a gunicorn worker starts (gunicorn.conf.py)
+    MYSQL_POOL_WARMUP = int(os.getenv('MYSQL_POOL_WARMUP', 2))
+    
+    # Read replica for "replica OK" reads (mysql.read_connection); unset = primary only.
+    # User/password/db/port default to the primary's.
+    MYSQL_REPLICA_HOST = os.getenv('MYSQL_REPLICA_HOST')
+    MYSQL_REPLICA_PORT = int(os.getenv('MYSQL_REPLICA_PORT', os.getenv('MYSQL_PORT', 3306)))
+    MYSQL_REPLICA_USER = os.getenv('MYSQL_REPLICA_USER')
+    MYSQL_REPLICA_PASSWORD = os.getenv('MYSQL_REPLICA_PASSWORD')
+    MYSQL_REPLICA_DB = os.getenv('MYSQL_REPLICA_DB')
+    # Fall back to the primary when the replica is further behind (seconds; -1 = don't check)
+    MYSQL_REPLICA_MAX_LAG = int(os.getenv('MYSQL_REPLICA_MAX_LAG', 5))
+    MYSQL_REPLICA_CHECK_SECONDS = int(os.getenv('MYSQL_REPLICA_CHECK_SECONDS', 2))
+    # After a write request the session reads from the primary for this long
+    MYSQL_PRIMARY_PIN_SECONDS = int(os.getenv('MYSQL_PRIMARY_PIN_SECONDS', 5))
+    
+    # Posting: 'statements' (Python-side locks/updates) or 'procedure'
+    # (one CALL to sp_post_transaction, see database/procedures.sql)
+    POSTING_MODE = os.getenv('POSTING_MODE', 'statements')
+    
+    # Idempotency keys for money-moving endpoints
+    IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', 24))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+    
+    # Bulk transfer API (/api/transfers/batch)
+    BATCH_TRANSFER_MAX_LINES = int(os.getenv('BATCH_TRANSFER_MAX_LINES', 50000))
+    
+    # Hot accounts (credits spread over accounts.hot_slots balance slots)
+    HOT_ACCOUNT_REFRESH_SECONDS = int(os.getenv('HOT_ACCOUNT_REFRESH_SECONDS', 5))
+    
+    # Dashboard counters (stats_counters) are cached per process for this long
+    STATS_CACHE_SECONDS = int(os.getenv('STATS_CACHE_SECONDS', 5))
+    
+    # Per-user account cache (0 disables); the optional Redis URL carries
+    # invalidations to every gunicorn worker
+    ACCOUNT_CACHE_TTL = int(os.getenv('ACCOUNT_CACHE_TTL', 30))
+    ACCOUNT_CACHE_SIZE = int(os.getenv('ACCOUNT_CACHE_SIZE', 10000))
+    ACCOUNT_CACHE_REDIS_URL = os.getenv('ACCOUNT_CACHE_REDIS_URL', '')
+    
+    # Account-number lookups (/api/verify_account): LRU of found accounts, short-lived
+    # misses, and a membership filter topped up every few seconds and rebuilt hourly
+    ACCOUNT_LOOKUP_CACHE_SIZE = int(os.getenv('ACCOUNT_LOOKUP_CACHE_SIZE', 50000))
+    ACCOUNT_LOOKUP_TTL = int(os.getenv('ACCOUNT_LOOKUP_TTL', 300))
+    ACCOUNT_LOOKUP_NEGATIVE_TTL = int(os.getenv('ACCOUNT_LOOKUP_NEGATIVE_TTL', 10))
+    ACCOUNT_LOOKUP_REFRESH_SECONDS = int(os.getenv('ACCOUNT_LOOKUP_REFRESH_SECONDS', 5))
+    ACCOUNT_LOOKUP_REBUILD_SECONDS = int(os.getenv('ACCOUNT_LOOKUP_REBUILD_SECONDS', 3600))
+    ACCOUNT_LOOKUP_BATCH_MAX = int(os.getenv('ACCOUNT_LOOKUP_BATCH_MAX', 100))
+    
+    # Settlement: 'sync' posts balances in the request, 'async' accepts the
+    # transaction as pending and settles it in jobs/settle_pending.py workers
+    SETTLEMENT_MODE = os.getenv('SETTLEMENT_MODE', 'sync')
+    SETTLEMENT_WORKERS = int(os.getenv('SETTLEMENT_WORKERS', 4))
+    SETTLEMENT_BATCH_SIZE = int(os.getenv('SETTLEMENT_BATCH_SIZE', 100))
+    # Settlement threads started inside each app process (0 = run the job separately)
+    SETTLEMENT_EMBEDDED_WORKERS = int(os.getenv('SETTLEMENT_EMBEDDED_WORKERS', 0))
+    
+    # Scheduled transfers: spread each day's runs over this many seconds
+    # and post at most SCHEDULER_BATCH_SIZE schedules per claim
+    SCHEDULER_SPREAD_SECONDS = int(os.getenv('SCHEDULER_SPREAD_SECONDS', 3600))
+    SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', 500))
+    
+    # Ledger: snapshot an account's balance after this many new entries
+    LEDGER_SNAPSHOT_INTERVAL = int(os.getenv('LEDGER_SNAPSHOT_INTERVAL', 500))
+    
+    # Pre-generated monthly statements (jobs/generate_statements.py)
+    STATEMENTS_DIR = os.getenv('STATEMENTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'var', 'statements'))
+    
+    # Conditional GET (utils/decorators.py conditional_get): ETags also change
+    # whenever templates do; set this to invalidate them on any other deploy
+    ETAG_RELEASE = os.getenv('ETAG_RELEASE', '')
+    
+    # Logging (utils/logger.py): records are written by a background thread
+    # from a queue of LOG_QUEUE_SIZE (0 = write on the calling thread); when it
+    # is full LOG_QUEUE_POLICY is 'block', 'drop-debug' or 'drop-oldest'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_QUEUE_POLICY = os.getenv('LOG_QUEUE_POLICY', 'drop-debug')
+    # 'orjson' or 'json'; unset = orjson when it is installed
+    LOG_JSON_BACKEND = os.getenv('LOG_JSON_BACKEND', '')
+    
     # App
     APP_NAME = 'SecureBank'
     APP_URL = os.getenv('APP_URL', 'http://localhost:5000')
@@ -0,0 +1,265 @@
+-- =============================================
+-- SECUREBANK - STORED PROCEDURES
+-- Load after schema.sql:
+--   mysql -u root -p banking_system < database/procedures.sql
+-- =============================================
+
+USE banking_system;
+
+DELIMITER $$
+
+-- =============================================
+-- sp_lock_account
+-- Lock one account row (shared or exclusive) and return its state.
+-- Shared locks are used for credits to hot accounts (hot_slots > 0).
+-- =============================================
+DROP PROCEDURE IF EXISTS sp_lock_account$$
+CREATE PROCEDURE sp_lock_account(
+    IN p_account_id INT,
+    IN p_shared BOOLEAN,
+    OUT p_balance DECIMAL(15,2),
+    OUT p_status VARCHAR(10),
+    OUT p_hot_slots TINYINT UNSIGNED
+)
+BEGIN
+    SET p_balance = NULL, p_status = NULL, p_hot_slots = 0;
+    IF p_shared THEN
+        SELECT balance, status, hot_slots INTO p_balance, p_status, p_hot_slots
+        FROM accounts WHERE account_id = p_account_id LOCK IN SHARE MODE;
+    ELSE
+        SELECT balance, status, hot_slots INTO p_balance, p_status, p_hot_slots
+        FROM accounts WHERE account_id = p_account_id FOR UPDATE;
+    END IF;
+END$$
+
+-- =============================================
+-- sp_post_transaction
+-- Validate, lock, record and apply a posting in a single round trip.
+-- Used by models.transaction.Transaction.post (POSTING_MODE=procedure).
+--
+-- Returns one row: transaction_id, transaction_uid, from_balance, to_balance,
+-- from_user_id, to_user_id
+-- Errors are raised as SQLSTATE 45000 with MESSAGE_TEXT:
+--   INVALID_AMOUNT
+--   ACCOUNT_UNAVAILABLE:<account_id>
+--   INSUFFICIENT_FUNDS:<account_id>:<balance>
+-- =============================================
+DROP PROCEDURE IF EXISTS sp_post_transaction$$
+CREATE PROCEDURE sp_post_transaction(
+    IN p_transaction_uid VARCHAR(36),
+    IN p_transaction_type VARCHAR(20),
+    IN p_from_account_id INT,
+    IN p_to_account_id INT,
+    IN p_amount DECIMAL(15,2),
+    IN p_description VARCHAR(255),
+    IN p_initiated_by INT,
+    IN p_ip_address VARCHAR(45),
+    IN p_user_agent TEXT,
+    IN p_biller_id INT,
+    IN p_biller_reference VARCHAR(50)
+)
+BEGIN
+    DECLARE v_from_balance DECIMAL(15,2) DEFAULT NULL;
+    DECLARE v_to_balance DECIMAL(15,2) DEFAULT NULL;
+    DECLARE v_from_status VARCHAR(10) DEFAULT NULL;
+    DECLARE v_to_status VARCHAR(10) DEFAULT NULL;
+    DECLARE v_from_hot TINYINT UNSIGNED DEFAULT 0;
+    DECLARE v_to_hot TINYINT UNSIGNED DEFAULT 0;
+    DECLARE v_to_shared BOOLEAN DEFAULT FALSE;
+    DECLARE v_pending DECIMAL(15,2) DEFAULT 0;
+    DECLARE v_transaction_id INT;
+    DECLARE v_message VARCHAR(128);
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    IF p_amount IS NULL OR p_amount <= 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'INVALID_AMOUNT';
+    END IF;
+
+    START TRANSACTION;
+
+    -- Credits to hot accounts only need a shared lock (see models/hot_account.py)
+    IF p_to_account_id IS NOT NULL AND NOT (p_to_account_id <=> p_from_account_id) THEN
+        SELECT hot_slots > 0 INTO v_to_shared FROM accounts WHERE account_id = p_to_account_id;
+    END IF;
+
+    -- Lock rows in ascending account_id order (same order as Account.lock_for_update)
+    IF p_to_account_id IS NOT NULL AND (p_from_account_id IS NULL OR p_to_account_id < p_from_account_id) THEN
+        CALL sp_lock_account(p_to_account_id, v_to_shared, v_to_balance, v_to_status, v_to_hot);
+    END IF;
+
+    IF p_from_account_id IS NOT NULL THEN
+        CALL sp_lock_account(p_from_account_id, FALSE, v_from_balance, v_from_status, v_from_hot);
+    END IF;
+
+    IF p_to_account_id IS NOT NULL AND p_from_account_id IS NOT NULL AND p_to_account_id > p_from_account_id THEN
+        CALL sp_lock_account(p_to_account_id, v_to_shared, v_to_balance, v_to_status, v_to_hot);
+    END IF;
+
+    -- Fold a hot source's slots into its balance before checking funds
+    IF p_from_account_id IS NOT NULL AND v_from_hot > 0 THEN
+        SELECT COALESCE(SUM(balance), 0) INTO v_pending
+        FROM account_balance_slots WHERE account_id = p_from_account_id FOR UPDATE;
+        IF v_pending <> 0 THEN
+            UPDATE accounts
+            SET balance = balance + v_pending, available_balance = available_balance + v_pending
+            WHERE account_id = p_from_account_id;
+            UPDATE account_balance_slots SET balance = 0 WHERE account_id = p_from_account_id;
+            UPDATE user_account_summary s JOIN accounts a ON a.user_id = s.user_id
+            SET s.total_balance = s.total_balance + v_pending
+            WHERE a.account_id = p_from_account_id;
+            SET v_from_balance = v_from_balance + v_pending;
+        END IF;
+    END IF;
+
+    -- Validate under the locks
+    IF p_from_account_id IS NOT NULL AND (v_from_status IS NULL OR v_from_status <> 'active') THEN
+        SET v_message = CONCAT('ACCOUNT_UNAVAILABLE:', p_from_account_id);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+
+    IF p_to_account_id IS NOT NULL AND (v_to_status IS NULL OR v_to_status <> 'active') THEN
+        SET v_message = CONCAT('ACCOUNT_UNAVAILABLE:', p_to_account_id);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+
+    IF p_from_account_id IS NOT NULL AND v_from_balance < p_amount THEN
+        SET v_message = CONCAT('INSUFFICIENT_FUNDS:', p_from_account_id, ':', v_from_balance);
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+
+    -- Record the transaction
+    INSERT INTO transactions (
+        transaction_uid, from_account_id, to_account_id, transaction_type,
+        amount, description, status, initiated_by, ip_address, user_agent, completed_at
+    ) VALUES (
+        p_transaction_uid, p_from_account_id, p_to_account_id, p_transaction_type,
+        p_amount, p_description, 'completed', p_initiated_by, p_ip_address, p_user_agent, NOW()
+    );
+    SET v_transaction_id = LAST_INSERT_ID();
+
+    -- Bill payments are linked to their biller for settlement
+    IF p_biller_id IS NOT NULL THEN
+        INSERT INTO bill_payments (transaction_id, biller_id, customer_reference)
+        VALUES (v_transaction_id, p_biller_id, COALESCE(p_biller_reference, ''));
+    END IF;
+
+    -- Per-account history index (models/account_posting.py)
+    INSERT INTO account_postings (account_id, initiated_at, transaction_id, direction, amount)
+    SELECT from_account_id, initiated_at, transaction_id, 'debit', amount
+    FROM transactions WHERE transaction_id = v_transaction_id AND from_account_id IS NOT NULL
+    UNION ALL
+    SELECT to_account_id, initiated_at, transaction_id, 'credit', amount
+    FROM transactions WHERE transaction_id = v_transaction_id AND to_account_id IS NOT NULL;
+
+    -- Double-entry ledger rows (account 0 = external clearing, see models/ledger.py)
+    INSERT INTO ledger_entries (account_id, transaction_id, direction, amount) VALUES
+        (COALESCE(p_from_account_id, 0), v_transaction_id, 'debit', p_amount),
+        (COALESCE(p_to_account_id, 0), v_transaction_id, 'credit', p_amount);
+
+    -- Apply the balances
+    IF p_from_account_id IS NOT NULL THEN
+        UPDATE accounts
+        SET balance = balance - p_amount,
+            available_balance = available_balance - p_amount,
+            last_transaction_date = NOW()
+        WHERE account_id = p_from_account_id;
+        SET v_from_balance = v_from_balance - p_amount;
+    END IF;
+
+    IF p_to_account_id IS NOT NULL AND v_to_shared THEN
+        INSERT INTO account_balance_slots (account_id, slot, balance)
+        VALUES (p_to_account_id, FLOOR(RAND() * GREATEST(v_to_hot, 1)), p_amount)
+        ON DUPLICATE KEY UPDATE balance = balance + VALUES(balance);
+        SELECT v_to_balance + COALESCE(SUM(balance), 0) INTO v_to_balance
+        FROM account_balance_slots WHERE account_id = p_to_account_id;
+    ELSEIF p_to_account_id IS NOT NULL THEN
+        UPDATE accounts
+        SET balance = balance + p_amount,
+            available_balance = available_balance + p_amount,
+            last_transaction_date = NOW()
+        WHERE account_id = p_to_account_id;
+        SET v_to_balance = v_to_balance + p_amount;
+    END IF;
+
+    -- Dashboard counters, spread over 16 slots (same as models/counters.py)
+    IF p_from_account_id IS NOT NULL THEN
+        INSERT INTO stats_counters (name, slot, value)
+        SELECT CONCAT('balance:', account_type), FLOOR(RAND() * 16), -p_amount
+        FROM accounts WHERE account_id = p_from_account_id
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value);
+    END IF;
+
+    IF p_to_account_id IS NOT NULL THEN
+        INSERT INTO stats_counters (name, slot, value)
+        SELECT CONCAT('balance:', account_type), FLOOR(RAND() * 16), p_amount
+        FROM accounts WHERE account_id = p_to_account_id
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value);
+    END IF;
+
+    INSERT INTO stats_counters (name, slot, value)
+    VALUES (CONCAT('transactions:', CURDATE()), FLOOR(RAND() * 16), 1)
+    ON DUPLICATE KEY UPDATE value = value + VALUES(value);
+
+    -- Per-user totals for the admin user directory (models/user_summary.py); hot credits wait for the fold
+    IF p_from_account_id IS NOT NULL THEN
+        UPDATE user_account_summary s JOIN accounts a ON a.user_id = s.user_id
+        SET s.total_balance = s.total_balance - p_amount
+        WHERE a.account_id = p_from_account_id;
+    END IF;
+
+    IF p_to_account_id IS NOT NULL AND NOT v_to_shared THEN
+        UPDATE user_account_summary s JOIN accounts a ON a.user_id = s.user_id
+        SET s.total_balance = s.total_balance + p_amount
+        WHERE a.account_id = p_to_account_id;
+    END IF;
+
+    -- Today's per-account totals (models/account_rollup.py); hot credits are left to the fold job
+    IF p_from_account_id IS NOT NULL THEN
+        INSERT INTO account_daily_rollup (account_id, day, credits, debits, count, closing_balance)
+        VALUES (p_from_account_id, CURDATE(), 0, p_amount, 1, v_from_balance)
+        ON DUPLICATE KEY UPDATE
+            credits = credits + VALUES(credits), debits = debits + VALUES(debits),
+            count = count + VALUES(count), closing_balance = VALUES(closing_balance);
+    END IF;
+
+    IF p_to_account_id IS NOT NULL AND NOT v_to_shared THEN
+        INSERT INTO account_daily_rollup (account_id, day, credits, debits, count, closing_balance)
+        VALUES (p_to_account_id, CURDATE(), p_amount, 0, 1, COALESCE(v_to_balance, v_from_balance + p_amount))
+        ON DUPLICATE KEY UPDATE
+            credits = credits + VALUES(credits), debits = debits + VALUES(debits),
+            count = count + VALUES(count), closing_balance = VALUES(closing_balance);
+    END IF;
+
+    COMMIT;
+
+    SELECT v_transaction_id AS transaction_id,
+           p_transaction_uid AS transaction_uid,
+           v_from_balance AS from_balance,
+           v_to_balance AS to_balance,
+           (SELECT user_id FROM accounts WHERE account_id = p_from_account_id) AS from_user_id,
+           (SELECT user_id FROM accounts WHERE account_id = p_to_account_id) AS to_user_id;
+END$$
+
+-- =============================================
+-- Ledger tables are append-only
+-- =============================================
+DROP TRIGGER IF EXISTS trg_ledger_entries_no_update$$
+CREATE TRIGGER trg_ledger_entries_no_update BEFORE UPDATE ON ledger_entries
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'LEDGER_APPEND_ONLY';
+END$$
+
+DROP TRIGGER IF EXISTS trg_ledger_entries_no_delete$$
+CREATE TRIGGER trg_ledger_entries_no_delete BEFORE DELETE ON ledger_entries
+FOR EACH ROW
+BEGIN
+    SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'LEDGER_APPEND_ONLY';
+END$$
+
+DELIMITER ;
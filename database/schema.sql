@@ -73,6 +73,7 @@ CREATE TABLE accounts (
     last_transaction_date TIMESTAMP NULL,
     monthly_fee DECIMAL(10,2) DEFAULT 0.00,
     minimum_balance DECIMAL(15,2) DEFAULT 0.00,
+    hot_slots TINYINT UNSIGNED DEFAULT 0,  -- > 0: credits land on N account_balance_slots rows
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
@@ -81,7 +82,8 @@ CREATE TABLE accounts (
     INDEX idx_account_number (account_number),
     INDEX idx_status (status),
     INDEX idx_type (account_type),
-    INDEX idx_balance (balance)
+    INDEX idx_balance (balance),
+    INDEX idx_hot_slots (hot_slots)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =============================================
@@ -309,6 +311,230 @@ CREATE TABLE transaction_disputes (
     INDEX idx_status (status)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =============================================
+-- 11. IDEMPOTENCY KEYS TABLE
+-- Client-supplied keys for /transfer, /deposit and /pay-bills retries
+-- =============================================
+CREATE TABLE idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    endpoint VARCHAR(50) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status ENUM('processing', 'completed') DEFAULT 'processing',
+    transaction_id INT NULL,
+    response JSON NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    
+    INDEX idx_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 12. ACCOUNT BALANCE SLOTS TABLE
+-- Unfolded credits for hot accounts (accounts.hot_slots > 0).
+-- Real balance = accounts.balance + SUM(slots.balance)
+-- =============================================
+CREATE TABLE account_balance_slots (
+    account_id INT NOT NULL,
+    slot TINYINT UNSIGNED NOT NULL,
+    balance DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+    
+    PRIMARY KEY (account_id, slot),
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 13. LEDGER ENTRIES TABLE
+-- Append-only double-entry ledger: one debit and one credit row per posting.
+-- seq is allocated under the account lock, so it orders an account's entries.
+-- account_id 0 is the external clearing account (deposits / bill payments).
+-- =============================================
+CREATE TABLE ledger_entries (
+    account_id INT NOT NULL,
+    seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    transaction_id INT NOT NULL,
+    direction ENUM('debit', 'credit') NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    
+    PRIMARY KEY (account_id, seq),
+    
+    UNIQUE KEY idx_seq (seq),
+    INDEX idx_transaction (transaction_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 14. LEDGER SNAPSHOTS TABLE
+-- Account balance as of a ledger seq (seq 0 = opening balance).
+-- Balance at any point = nearest snapshot + entries after it.
+-- =============================================
+CREATE TABLE ledger_snapshots (
+    account_id INT NOT NULL,
+    seq BIGINT UNSIGNED NOT NULL,
+    balance DECIMAL(15,2) NOT NULL,
+    taken_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    
+    PRIMARY KEY (account_id, seq),
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 15. BILLERS TABLE
+-- Biller registry behind the Pay Bills form
+-- =============================================
+CREATE TABLE billers (
+    biller_id INT AUTO_INCREMENT PRIMARY KEY,
+    code VARCHAR(20) UNIQUE NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    icon VARCHAR(30) DEFAULT 'file-invoice',
+    settlement_account VARCHAR(50) NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    sort_order SMALLINT DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_active (is_active, sort_order)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 16. BILLER SETTLEMENTS TABLE
+-- What we owe each biller per settlement cycle
+-- =============================================
+CREATE TABLE biller_settlements (
+    settlement_id INT AUTO_INCREMENT PRIMARY KEY,
+    biller_id INT NOT NULL,
+    cycle_date DATE NOT NULL,
+    payment_count INT DEFAULT 0,
+    total_amount DECIMAL(18,2) DEFAULT 0.00,
+    status ENUM('open', 'closed', 'exported') DEFAULT 'open',
+    file_path VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    exported_at TIMESTAMP NULL,
+    
+    FOREIGN KEY (biller_id) REFERENCES billers(biller_id),
+    
+    UNIQUE KEY idx_biller_cycle (biller_id, cycle_date),
+    INDEX idx_cycle (cycle_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 17. BILL PAYMENTS TABLE
+-- Biller and customer reference of each payment transaction
+-- =============================================
+CREATE TABLE bill_payments (
+    transaction_id INT PRIMARY KEY,
+    biller_id INT NOT NULL,
+    customer_reference VARCHAR(50) NOT NULL,
+    settlement_id INT NULL,
+    
+    FOREIGN KEY (transaction_id) REFERENCES transactions(transaction_id) ON DELETE CASCADE,
+    FOREIGN KEY (biller_id) REFERENCES billers(biller_id),
+    FOREIGN KEY (settlement_id) REFERENCES biller_settlements(settlement_id),
+    
+    INDEX idx_settlement (settlement_id, transaction_id),
+    INDEX idx_biller (biller_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 18. SCHEDULED TRANSFERS TABLE
+-- Standing orders / future-dated transfers (jobs/run_scheduled_transfers.py)
+-- =============================================
+CREATE TABLE scheduled_transfers (
+    schedule_id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    from_account_id INT NOT NULL,
+    to_account_id INT NOT NULL,
+    beneficiary_id INT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    description VARCHAR(255),
+    frequency ENUM('once', 'daily', 'weekly', 'monthly') NOT NULL,
+    anchor_day TINYINT UNSIGNED NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NULL,
+    next_run_at DATETIME NOT NULL,
+    status ENUM('active', 'paused', 'completed', 'cancelled') DEFAULT 'active',
+    run_count INT DEFAULT 0,
+    failure_count INT DEFAULT 0,
+    last_run_at DATETIME NULL,
+    last_status ENUM('completed', 'failed', 'retry') NULL,
+    last_transaction_id INT NULL,
+    last_error VARCHAR(255) NULL,
+    claimed_by VARCHAR(64) NULL,
+    claimed_until DATETIME NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (from_account_id) REFERENCES accounts(account_id) ON DELETE CASCADE,
+    FOREIGN KEY (to_account_id) REFERENCES accounts(account_id) ON DELETE CASCADE,
+    FOREIGN KEY (beneficiary_id) REFERENCES beneficiaries(beneficiary_id) ON DELETE SET NULL,
+    
+    INDEX idx_due (status, next_run_at),
+    INDEX idx_user (user_id, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 19. STATS COUNTERS TABLE
+-- Dashboard counters maintained by the write paths (models/counters.py)
+-- Each counter is the SUM(value) of its slot rows
+-- =============================================
+CREATE TABLE stats_counters (
+    name VARCHAR(64) NOT NULL,
+    slot TINYINT UNSIGNED NOT NULL,
+    value DECIMAL(20,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (name, slot)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 20. ACCOUNT POSTINGS TABLE
+-- One row per account side of every transaction, written with it;
+-- history reads are one primary key range scan (models/account_posting.py)
+-- =============================================
+CREATE TABLE account_postings (
+    account_id INT NOT NULL,
+    initiated_at TIMESTAMP NOT NULL,
+    transaction_id INT NOT NULL,
+    direction ENUM('debit', 'credit') NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    
+    PRIMARY KEY (account_id, initiated_at, transaction_id, direction),
+    INDEX idx_transaction (transaction_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 21. ACCOUNT DAILY ROLLUP TABLE
+-- Completed credits/debits per account and day plus the day's closing
+-- balance, maintained on posting (models/account_rollup.py)
+-- =============================================
+CREATE TABLE account_daily_rollup (
+    account_id INT NOT NULL,
+    day DATE NOT NULL,
+    credits DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debits DECIMAL(18,2) NOT NULL DEFAULT 0,
+    count INT UNSIGNED NOT NULL DEFAULT 0,
+    closing_balance DECIMAL(15,2) NOT NULL,
+    
+    PRIMARY KEY (account_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =============================================
+-- 22. USER ACCOUNT SUMMARY TABLE
+-- Account count and total balance per user, maintained on posting
+-- (models/user_summary.py); the admin user directory sorts on it
+-- =============================================
+CREATE TABLE user_account_summary (
+    user_id INT PRIMARY KEY,
+    account_count INT NOT NULL DEFAULT 0,
+    total_balance DECIMAL(18,2) NOT NULL DEFAULT 0,
+    
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    INDEX idx_total_balance (total_balance)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =============================================
 -- INSERT SAMPLE DATA
 -- =============================================
@@ -323,6 +549,17 @@ INSERT INTO users (username, email, password_hash, first_name, last_name, phone,
 ('jane_smith', 'jane.smith@email.com', 'password123_hash_will_be_replaced', 'Jane', 'Smith', '+1-555-0102', '456 Oak Ave, Los Angeles, CA 90001', 'customer', TRUE),
 ('bob_wilson', 'bob.wilson@email.com', 'password123_hash_will_be_replaced', 'Bob', 'Wilson', '+1-555-0103', '789 Pine St, Chicago, IL 60601', 'customer', TRUE);
 
+-- Insert billers
+INSERT INTO billers (code, name, icon, settlement_account, sort_order) VALUES
+('electric', 'Electric Company', 'bolt', 'EXT-ELEC-0001', 1),
+('water', 'Water Utility', 'tint', 'EXT-WATR-0001', 2),
+('internet', 'Internet Provider', 'wifi', 'EXT-INET-0001', 3),
+('phone', 'Phone Company', 'phone', 'EXT-PHON-0001', 4),
+('credit', 'Credit Card', 'credit-card', 'EXT-CRED-0001', 5),
+('insurance', 'Insurance', 'shield-alt', 'EXT-INSR-0001', 6),
+('rent', 'Rent', 'home', 'EXT-RENT-0001', 7),
+('other', 'Other', 'file-invoice', NULL, 8);
+
 -- Insert accounts for customers (using shorter account numbers)
 INSERT INTO accounts (account_number, user_id, account_type, balance, available_balance, interest_rate, opened_date) VALUES
 ('ACC10000001', 2, 'savings', 25000.00, 25000.00, 1.5, '2024-01-15'),
@@ -339,6 +576,51 @@ INSERT INTO transactions (transaction_uid, from_account_id, to_account_id, trans
 (UUID(), 2, 4, 'transfer', 150.00, 'Gift', 'completed', 2, DATE_SUB(NOW(), INTERVAL 1 DAY), DATE_SUB(NOW(), INTERVAL 1 DAY), '192.168.1.103'),
 (UUID(), 4, 2, 'transfer', 75.00, 'Coffee shop', 'completed', 3, DATE_SUB(NOW(), INTERVAL 12 HOUR), DATE_SUB(NOW(), INTERVAL 12 HOUR), '192.168.1.104');
 
+-- Index the sample transactions per account
+INSERT INTO account_postings (account_id, initiated_at, transaction_id, direction, amount)
+SELECT from_account_id, initiated_at, transaction_id, 'debit', amount FROM transactions WHERE from_account_id IS NOT NULL
+UNION ALL
+SELECT to_account_id, initiated_at, transaction_id, 'credit', amount FROM transactions WHERE to_account_id IS NOT NULL;
+
+-- Roll the sample postings up per day, closing balances walked back from today's
+INSERT INTO account_daily_rollup (account_id, day, credits, debits, count, closing_balance)
+SELECT d.account_id, d.day, d.credits, d.debits, d.count,
+       a.balance - COALESCE((
+           SELECT SUM(IF(p.direction = 'credit', p.amount, -p.amount)) FROM account_postings p
+           WHERE p.account_id = d.account_id AND p.initiated_at >= d.day + INTERVAL 1 DAY
+       ), 0)
+FROM (
+    SELECT account_id, DATE(initiated_at) AS day,
+           SUM(IF(direction = 'credit', amount, 0)) AS credits,
+           SUM(IF(direction = 'debit', amount, 0)) AS debits,
+           COUNT(*) AS count
+    FROM account_postings GROUP BY account_id, DATE(initiated_at)
+) d
+JOIN accounts a ON a.account_id = d.account_id;
+
+-- Anchor the ledger at the sample opening balances
+INSERT INTO ledger_snapshots (account_id, seq, balance)
+SELECT account_id, 0, balance FROM accounts;
+
+-- Seed the dashboard counters from the sample data
+INSERT INTO stats_counters (name, slot, value)
+SELECT 'users:customers', 0, COUNT(*) FROM users WHERE role = 'customer'
+UNION ALL
+SELECT 'users:active', 0, COUNT(*) FROM users WHERE role = 'customer' AND is_active = TRUE
+UNION ALL
+SELECT CONCAT('accounts:', account_type), 0, COUNT(*) FROM accounts GROUP BY account_type
+UNION ALL
+SELECT CONCAT('balance:', account_type), 0, SUM(balance) FROM accounts GROUP BY account_type
+UNION ALL
+SELECT CONCAT('transactions:', DATE(initiated_at)), 0, COUNT(*) FROM transactions GROUP BY DATE(initiated_at);
+
+-- Seed the per-user summaries from the sample data
+INSERT INTO user_account_summary (user_id, account_count, total_balance)
+SELECT u.user_id, COUNT(a.account_id), COALESCE(SUM(a.balance), 0)
+FROM users u
+LEFT JOIN accounts a ON a.user_id = u.user_id
+GROUP BY u.user_id;
+
 -- Insert beneficiaries
 INSERT INTO beneficiaries (user_id, beneficiary_account_id, beneficiary_name, nickname) VALUES
 (2, 3, 'Jane Smith', 'Jane'),
@@ -359,9 +641,18 @@ INSERT INTO notifications (user_id, type, title, message, is_read) VALUES
 CREATE INDEX idx_transactions_composite ON transactions(initiated_at, status, transaction_type);
 CREATE INDEX idx_transactions_account_date ON transactions(from_account_id, initiated_at);
 CREATE INDEX idx_transactions_recipient_date ON transactions(to_account_id, initiated_at);
+-- Admin transaction explorer (models/transaction_explorer.py): newest-first per filter
+CREATE INDEX idx_transactions_initiator_date ON transactions(initiated_by, initiated_at);
+CREATE INDEX idx_transactions_status_date ON transactions(status, initiated_at);
+CREATE INDEX idx_transactions_type_date ON transactions(transaction_type, initiated_at);
 CREATE INDEX idx_audit_log_composite ON audit_log(created_at, action, user_id);
 CREATE INDEX idx_notifications_user_read ON notifications(user_id, is_read, created_at);
 CREATE INDEX idx_accounts_user_status ON accounts(user_id, status, account_type);
+-- Admin user directory (models/user_directory.py): name prefix search, filtered newest-first pages
+CREATE INDEX idx_users_name ON users(last_name);
+CREATE INDEX idx_users_role_created ON users(role, created_at);
+CREATE INDEX idx_users_active_created ON users(is_active, created_at);
+CREATE INDEX idx_users_kyc_created ON users(kyc_status, created_at);
 
 -- =============================================
 -- VERIFICATION QUERY
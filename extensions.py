@@ -1,8 +1,9 @@
 # extensions.py
-from flask_mysqldb import MySQL
 from flask_bcrypt import Bcrypt
+from utils.db import PooledMySQL
 
-mysql = MySQL()
+# Pooled drop-in for flask_mysqldb.MySQL: mysql.connection works as before
+mysql = PooledMySQL()
 bcrypt = Bcrypt()
 
 # Add this to ensure proper transaction handling
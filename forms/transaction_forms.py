@@ -3,6 +3,7 @@ from flask_wtf import FlaskForm
 from wtforms import SelectField, StringField, DecimalField, TextAreaField
 from wtforms.validators import DataRequired, NumberRange, Optional, ValidationError
 from extensions import mysql
+from models.biller import Biller
 
 class TransferForm(FlaskForm):
     """Transfer funds form"""
@@ -36,16 +37,7 @@ class DepositForm(FlaskForm):
 class PayBillForm(FlaskForm):
     """Pay bill form"""
     from_account = SelectField('From Account', coerce=int, validators=[DataRequired()])
-    biller = SelectField('Biller', choices=[
-        ('electric', 'Electric Company'),
-        ('water', 'Water Utility'),
-        ('internet', 'Internet Provider'),
-        ('phone', 'Phone Company'),
-        ('credit', 'Credit Card'),
-        ('insurance', 'Insurance'),
-        ('rent', 'Rent'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
+    biller = SelectField('Biller', validators=[DataRequired()])
     account_number = StringField('Account Number', validators=[DataRequired()])
     amount = DecimalField('Amount', validators=[
         DataRequired(),
@@ -53,6 +45,13 @@ class PayBillForm(FlaskForm):
     ])
     description = StringField('Description', validators=[Optional()])
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Choices come from the billers registry
+        cursor = mysql.connection.cursor()
+        self.biller.choices = Biller.choices(cursor)
+        cursor.close()
+    
     def validate_amount(self, amount):
         """Validate sufficient funds"""
         if self.from_account.data:
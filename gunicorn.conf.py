@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py "app:create_app()"
+
+Each worker builds its own MySQL connection pool after the fork and warms
+MYSQL_POOL_WARMUP connections before accepting requests. On exit it closes
+the pool and drains the log queue.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+
+def post_worker_init(worker):
+    from extensions import mysql
+    if mysql.app is not None:
+        opened = mysql.warm_up()
+        worker.log.info("Warmed %s MySQL connections", opened)
+
+
+def worker_exit(server, worker):
+    from extensions import mysql
+    from utils.logger import bank_logger
+    mysql.close()
+    # Write out whatever is still queued before the worker goes away
+    bank_logger.close()
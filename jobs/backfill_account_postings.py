@@ -0,0 +1,52 @@
+# jobs/backfill_account_postings.py
+"""Populate account_postings from the existing transactions.
+
+    python -m jobs.backfill_account_postings                   # everything
+    python -m jobs.backfill_account_postings --start-id 500000 # resume
+    python -m jobs.backfill_account_postings --chunk 20000 --pause 0.05
+
+Walks transactions in transaction_id ranges and copies each range with one
+INSERT IGNORE ... SELECT, committing per range, so it can run next to live
+traffic and be stopped and resumed at any point (rows already indexed,
+including those written by new postings, are skipped).
+"""
+import argparse
+import time
+from utils.db import connect
+from utils.logger import bank_logger
+from models.account_posting import AccountPosting
+from models.posting import PostingEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start-id', type=int, default=0, help='first transaction_id to index')
+    parser.add_argument('--chunk', type=int, default=10000, help='transaction ids per INSERT')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between chunks')
+    args = parser.parse_args()
+
+    conn = connect()
+    engine = PostingEngine()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(transaction_id), 0) AS max_id FROM transactions")
+        max_id = cursor.fetchone()['max_id']
+        conn.commit()
+        cursor.close()
+
+        started = time.perf_counter()
+        added = 0
+        for from_id in range(args.start_id, max_id + 1, args.chunk):
+            to_id = from_id + args.chunk
+            added += engine.run(conn, lambda cur: AccountPosting.backfill(cur, from_id, to_id))
+            print(f"indexed transaction_id < {to_id} ({added} postings added)", flush=True)
+            if args.pause:
+                time.sleep(args.pause)
+        bank_logger.log_app('info', 'Account postings backfilled', postings=added, max_transaction_id=max_id,
+                            seconds=round(time.perf_counter() - started, 2))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
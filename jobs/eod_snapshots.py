@@ -0,0 +1,102 @@
+# jobs/eod_snapshots.py
+"""Record every account's end-of-day closing balance as a ledger snapshot.
+
+    python -m jobs.eod_snapshots                       # close yesterday
+    python -m jobs.eod_snapshots --day 2026-10-16 --workers 8 --chunk 20000
+    python -m jobs.eod_snapshots --from-id 4200000     # resume after a crash
+
+The cut-off is the first ledger seq written at or after midnight ending
+the day (Ledger.first_seq_at). Accounts are then snapshotted in account_id
+ranges, one bulk INSERT ... SELECT per range (Ledger.snapshot_range),
+spread over --workers threads with a connection each. Sessions run under
+READ COMMITTED so the bulk reads take no row locks and postings carry on
+while the job runs. Ranges can be re-run safely; Account.balance_as_of
+reads the snapshots.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from utils.db import connect
+from utils.logger import bank_logger
+from models.ledger import Ledger
+
+_local = threading.local()
+_opened = []
+
+
+def connection():
+    """This thread's connection (READ COMMITTED, one commit per range)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = connect()
+        _opened.append(conn)
+        cursor = conn.cursor()
+        cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        cursor.close()
+    return conn
+
+
+def snapshot(task):
+    from_id, to_id, cutoff_seq, cutoff_at = task
+    conn = connection()
+    cursor = conn.cursor()
+    try:
+        written = Ledger.snapshot_range(cursor, from_id, to_id, cutoff_seq, cutoff_at)
+        conn.commit()
+        return from_id, to_id, written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--day', help='day to close, YYYY-MM-DD (default: yesterday)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk', type=int, default=10000, help='account ids per INSERT ... SELECT')
+    parser.add_argument('--from-id', type=int, default=0, help='skip account ids below this')
+    args = parser.parse_args()
+
+    day = datetime.strptime(args.day, '%Y-%m-%d').date() if args.day else date.today() - timedelta(days=1)
+    cutoff_at = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    if cutoff_at > datetime.now():
+        parser.error(f"{day} has not ended yet")
+
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cutoff_seq = Ledger.first_seq_at(cursor, cutoff_at)
+        cursor.execute("SELECT COALESCE(MAX(account_id), 0) AS hi FROM accounts")
+        max_id = cursor.fetchone()['hi']
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+    tasks = [(lo, lo + args.chunk, cutoff_seq, cutoff_at) for lo in range(args.from_id, max_id + 1, args.chunk)]
+    started = time.perf_counter()
+    written = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for done, (lo, hi, count) in enumerate(pool.map(snapshot, tasks), 1):
+                written += count
+                if done % 100 == 0 or done == len(tasks):
+                    elapsed = time.perf_counter() - started
+                    print(f"[{done}/{len(tasks)}] up to id {hi - 1}: {written} snapshots, "
+                          f"{(hi - args.from_id) / elapsed:.0f} account ids/s")
+    finally:
+        for opened in _opened:
+            opened.close()
+
+    elapsed = time.perf_counter() - started
+    bank_logger.log_app('info', 'End-of-day snapshots taken', day=day.isoformat(), cutoff_seq=cutoff_seq,
+                        snapshots=written, seconds=round(elapsed, 2))
+    print(f"{day}: {written} snapshots at seq < {cutoff_seq} in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
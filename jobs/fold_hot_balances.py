@@ -0,0 +1,75 @@
+# jobs/fold_hot_balances.py
+"""Fold hot-account balance slots back into accounts.balance.
+
+    python -m jobs.fold_hot_balances                 # fold once
+    python -m jobs.fold_hot_balances --every 10      # keep folding
+    python -m jobs.fold_hot_balances --enable 42 --slots 16
+    python -m jobs.fold_hot_balances --disable 42
+
+Also sweeps slots of accounts that are no longer flagged hot, and
+rebuilds the daily rollup of every folded account for today (and
+yesterday, just after midnight), since hot credits skip it inline.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from utils.db import connect
+from utils.logger import bank_logger
+from models.account import Account
+from models.hot_account import HotAccount
+from models.account_rollup import AccountRollup
+from models.posting import PostingEngine
+
+
+def fold_all(conn, engine):
+    """Fold every account that has unfolded credits; returns (accounts, amount)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT account_id FROM account_balance_slots WHERE balance <> 0")
+    account_ids = [row['account_id'] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+
+    total = 0
+    since = (datetime.now() - timedelta(hours=1)).date()
+    for account_id in account_ids:
+        def work(cur, account_id=account_id):
+            Account.lock_for_update(cur, [account_id])
+            folded = HotAccount.fold(cur, account_id)
+            AccountRollup.rebuild(cur, [account_id], since)
+            return folded
+        total += engine.run(conn, work)
+    return len(account_ids), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--every', type=int, default=0, help='repeat every N seconds (0 = run once)')
+    parser.add_argument('--enable', type=int, metavar='ACCOUNT_ID')
+    parser.add_argument('--slots', type=int, default=16)
+    parser.add_argument('--disable', type=int, metavar='ACCOUNT_ID')
+    args = parser.parse_args()
+
+    conn = connect()
+    engine = PostingEngine()
+    try:
+        if args.enable:
+            engine.run(conn, lambda cur: HotAccount.enable(cur, args.enable, args.slots))
+            bank_logger.log_app('info', 'Hot account enabled', account_id=args.enable, slots=args.slots)
+            return
+        if args.disable:
+            engine.run(conn, lambda cur: HotAccount.disable(cur, args.disable))
+            bank_logger.log_app('info', 'Hot account disabled', account_id=args.disable)
+            return
+        while True:
+            accounts, amount = fold_all(conn, engine)
+            if accounts:
+                bank_logger.log_app('info', 'Folded hot account slots', accounts=accounts, amount=str(amount))
+            if not args.every:
+                break
+            time.sleep(args.every)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
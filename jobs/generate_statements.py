@@ -0,0 +1,129 @@
+# jobs/generate_statements.py
+"""Pre-generate every active account's monthly statement.
+
+    python -m jobs.generate_statements                      # last month, all cores
+    python -m jobs.generate_statements --month 2026-09 --workers 8
+    python -m jobs.generate_statements --range-size 5000 --out /var/securebank/statements
+
+Accounts are split into fixed account_id ranges handed to a process pool;
+each worker process keeps its own MySQL connection and streams every
+statement through a server-side cursor into a gzipped CSV file (the same
+content as /generate-statement/<id>?format=csv for that month). Files and
+the manifest layout are described in models/statement_archive.py;
+/statements/<account_id>/<month> serves them.
+
+Re-running the same month resumes: finished ranges are skipped, and so
+are finished files inside a range that was interrupted.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from datetime import date, timedelta
+from utils.db import connect
+from utils.logger import bank_logger
+from utils.streaming import buffered, csv_lines
+from models.statement import Statement, CSV_COLUMNS
+from models.statement_archive import StatementArchive
+
+# Per-process state, set up by init_worker
+_worker = {}
+
+
+def init_worker(root):
+    _worker['conn'] = connect()
+    _worker['archive'] = StatementArchive(root)
+
+
+def generate_range(task):
+    """Write the statements of active accounts with lo <= account_id < hi; returns (lo, hi, written, skipped)"""
+    month, lo, hi = task
+    conn, archive = _worker['conn'], _worker['archive']
+    start_date, end_date = Statement.month_period(month)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT a.*, u.first_name, u.last_name, u.email
+        FROM accounts a
+        JOIN users u ON a.user_id = u.user_id
+        WHERE a.account_id >= %s AND a.account_id < %s AND a.status = 'active'
+        ORDER BY a.account_id
+    """, (lo, hi))
+    accounts = cursor.fetchall()
+
+    entries = {}
+    written = skipped = 0
+    for account in accounts:
+        account_id = account['account_id']
+        if archive.exists(month, account_id):
+            entries[account_id] = {'file': os.path.basename(archive.path(month, account_id)),
+                                   'bytes': os.path.getsize(archive.path(month, account_id))}
+            skipped += 1
+            continue
+        summary = Statement.summary(cursor, account, start_date, end_date)
+        lines = Statement.lines(conn, account_id, start_date, end_date, summary['opening_balance'])
+        entry = archive.write(month, account_id, buffered(csv_lines(CSV_COLUMNS, Statement.csv_rows(summary, lines))))
+        entry.update(account_number=account['account_number'],
+                     transactions=summary['transaction_count'],
+                     closing_balance=str(summary['closing_balance']))
+        entries[account_id] = entry
+        written += 1
+    cursor.close()
+    conn.commit()
+    archive.finish_part(month, lo, hi, entries)
+    return lo, hi, written, skipped
+
+
+def main():
+    last_month = (date.today().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--month', default=last_month, help='YYYY-MM (default: last month)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--range-size', type=int, default=2000, help='account ids per task')
+    parser.add_argument('--out', default=None, help='archive root (default: STATEMENTS_DIR)')
+    args = parser.parse_args()
+
+    archive = StatementArchive(args.out)
+    if not archive.valid_month(args.month):
+        parser.error('--month must be YYYY-MM')
+
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(account_id) AS lo, MAX(account_id) AS hi FROM accounts WHERE status = 'active'")
+        bounds = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    if bounds['lo'] is None:
+        print("No active accounts")
+        return
+
+    # Fixed ranges, so a re-run lines up with the part files of the last one
+    first = bounds['lo'] // args.range_size * args.range_size
+    tasks = [(args.month, lo, lo + args.range_size)
+             for lo in range(first, bounds['hi'] + 1, args.range_size)
+             if not archive.part_done(args.month, lo, lo + args.range_size)]
+    resumed = (bounds['hi'] - first) // args.range_size + 1 - len(tasks)
+
+    started = time.perf_counter()
+    written = skipped = 0
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(archive.root,)) as pool:
+        for done, (lo, hi, range_written, range_skipped) in enumerate(pool.imap_unordered(generate_range, tasks), 1):
+            written += range_written
+            skipped += range_skipped
+            elapsed = time.perf_counter() - started
+            print(f"[{done}/{len(tasks)}] ids {lo}-{hi - 1}: {range_written} written; "
+                  f"{written} total, {written / elapsed:.1f} accounts/s")
+
+    elapsed = time.perf_counter() - started
+    listed = archive.write_manifest(args.month, {'seconds': round(elapsed, 2)})
+    bank_logger.log_app('info', 'Monthly statements generated', month=args.month, written=written,
+                        skipped=skipped, ranges_resumed=resumed, statements=listed, seconds=round(elapsed, 2),
+                        accounts_per_second=round(written / elapsed, 1) if elapsed else None)
+    print(f"{written} statements written ({skipped} already present, {resumed} ranges resumed) "
+          f"in {elapsed:.1f}s; manifest lists {listed}")
+
+
+if __name__ == '__main__':
+    main()
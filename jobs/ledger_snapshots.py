@@ -0,0 +1,91 @@
+# jobs/ledger_snapshots.py
+"""Write ledger balance snapshots so historical balances stay cheap to read.
+
+    python -m jobs.ledger_snapshots                  # snapshot busy accounts once
+    python -m jobs.ledger_snapshots --every 300      # keep snapshotting
+    python -m jobs.ledger_snapshots --anchor         # opening snapshot for accounts without one
+    python -m jobs.ledger_snapshots --verify 42      # compare ledger vs accounts.balance
+
+An account is snapshotted once it has LEDGER_SNAPSHOT_INTERVAL entries
+since its last snapshot.
+"""
+import argparse
+import time
+from config import Config
+from utils.db import connect
+from utils.logger import bank_logger
+from models.account import Account
+from models.hot_account import HotAccount
+from models.ledger import Ledger
+from models.posting import PostingEngine
+
+
+def snapshot_accounts(conn, engine, account_ids):
+    """Snapshot each account under its own short exclusive lock"""
+    for account_id in account_ids:
+        def work(cur, account_id=account_id):
+            locked = Account.lock_for_update(cur, [account_id])
+            if account_id not in locked:
+                return
+            if locked[account_id]['hot_slots']:
+                HotAccount.fold(cur, account_id)
+            Ledger.take_snapshot(cur, account_id)
+        engine.run(conn, work)
+    return len(account_ids)
+
+
+def due_accounts(conn, interval, batch_size):
+    cursor = conn.cursor()
+    rows = Ledger.accounts_needing_snapshot(cursor, interval, batch_size)
+    conn.commit()
+    cursor.close()
+    return [row['account_id'] for row in rows]
+
+
+def unanchored_accounts(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT a.account_id FROM accounts a
+        WHERE NOT EXISTS (SELECT 1 FROM ledger_snapshots s WHERE s.account_id = a.account_id)
+    """)
+    ids = [row['account_id'] for row in cursor.fetchall()]
+    conn.commit()
+    cursor.close()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--every', type=int, default=0, help='repeat every N seconds (0 = run once)')
+    parser.add_argument('--interval', type=int, default=Config.LEDGER_SNAPSHOT_INTERVAL,
+                        help='entries since the last snapshot before taking a new one')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--anchor', action='store_true')
+    parser.add_argument('--verify', type=int, metavar='ACCOUNT_ID')
+    args = parser.parse_args()
+
+    conn = connect()
+    engine = PostingEngine()
+    try:
+        if args.verify:
+            result = engine.run(conn, lambda cur: Ledger.verify(cur, args.verify))
+            print(f"account {result['account_id']}: ledger {result['ledger_balance']} "
+                  f"accounts {result['account_balance']} -> {'OK' if result['matches'] else 'MISMATCH'}")
+            return
+        if args.anchor:
+            count = snapshot_accounts(conn, engine, unanchored_accounts(conn))
+            bank_logger.log_app('info', 'Anchored ledger accounts', accounts=count)
+            return
+        while True:
+            count = snapshot_accounts(conn, engine, due_accounts(conn, args.interval, args.batch_size))
+            if count:
+                bank_logger.log_app('info', 'Took ledger snapshots', accounts=count)
+            if not args.every:
+                break
+            time.sleep(args.every)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# jobs/purge_idempotency.py
+"""Delete expired idempotency keys in small batches.
+
+    python -m jobs.purge_idempotency            # run once
+    python -m jobs.purge_idempotency --every 300
+"""
+import argparse
+import time
+from utils.db import connect
+from utils.logger import bank_logger
+from models.idempotency import IdempotencyKey
+
+
+def purge(conn, batch_size=1000):
+    """Delete expired keys batch by batch; returns the total removed"""
+    total = 0
+    while True:
+        cursor = conn.cursor()
+        removed = IdempotencyKey.purge_expired(cursor, batch_size)
+        conn.commit()
+        cursor.close()
+        total += removed
+        if removed < batch_size:
+            return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--every', type=int, default=0, help='repeat every N seconds (0 = run once)')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        while True:
+            removed = purge(conn, args.batch_size)
+            bank_logger.log_app('info', 'Purged expired idempotency keys', removed=removed)
+            if not args.every:
+                break
+            time.sleep(args.every)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# jobs/rebuild_counters.py
+"""Recompute the dashboard counters (stats_counters) from the base tables.
+
+    python -m jobs.rebuild_counters
+
+The write paths keep the counters current; run this after loading or
+correcting data outside the application, or after applying the schema to
+an existing database. Transaction-per-day counters are rebuilt for the
+last 30 days.
+"""
+import argparse
+import time
+from utils.db import connect
+from utils.logger import bank_logger
+from models.counters import Counters
+from models.posting import PostingEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    conn = connect()
+    try:
+        started = time.perf_counter()
+        values = PostingEngine().run(conn, Counters.rebuild)
+        bank_logger.log_app('info', 'Stats counters rebuilt', counters=len(values),
+                            seconds=round(time.perf_counter() - started, 2))
+        for name, value in sorted(values.items()):
+            print(f"{name:40} {value}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
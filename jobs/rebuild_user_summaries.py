@@ -0,0 +1,48 @@
+# jobs/rebuild_user_summaries.py
+"""Recompute user_account_summary (per-user account count and balance).
+
+    python -m jobs.rebuild_user_summaries
+    python -m jobs.rebuild_user_summaries --chunk 5000 --from-id 4200000
+
+The write paths keep the summaries current; run this after applying the
+schema to an existing database, after creating users or accounts outside
+the application (add_admin.py, data loads) or to repair drift. Users are
+rebuilt in user_id ranges, each in its own short transaction holding the
+range's account row locks.
+"""
+import argparse
+import time
+from utils.db import connect
+from utils.logger import bank_logger
+from models.user_summary import UserSummary
+from models.posting import PostingEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk', type=int, default=1000, help='user ids per transaction')
+    parser.add_argument('--from-id', type=int, default=0, help='skip user ids below this')
+    args = parser.parse_args()
+
+    conn = connect()
+    engine = PostingEngine()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(user_id), 0) AS hi FROM users")
+        max_id = cursor.fetchone()['hi']
+        conn.commit()
+        cursor.close()
+
+        started = time.perf_counter()
+        rows = 0
+        for lo in range(args.from_id, max_id + 1, args.chunk):
+            rows += engine.run(conn, lambda cur, lo=lo: UserSummary.rebuild(cur, lo, lo + args.chunk))
+        bank_logger.log_app('info', 'User summaries rebuilt', users=rows,
+                            seconds=round(time.perf_counter() - started, 2))
+        print(f"{rows} user summaries rebuilt")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
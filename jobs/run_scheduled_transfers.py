@@ -0,0 +1,111 @@
+# jobs/run_scheduled_transfers.py
+"""Post scheduled and recurring transfers that are due.
+
+    python -m jobs.run_scheduled_transfers                # drain due schedules once
+    python -m jobs.run_scheduled_transfers --every 30     # keep running
+    python -m jobs.run_scheduled_transfers --batch-size 1000 --pause 0.1
+
+Several schedulers can run at once: each leases its own batch with
+FOR UPDATE SKIP LOCKED. Every run posts through the normal posting engine
+with an idempotency key derived from (schedule_id, next_run_at), so a run
+that is retried after a crash is never posted twice.
+"""
+import argparse
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from config import Config
+from utils.db import connect
+from utils.logger import bank_logger
+from models.posting import posting_engine
+from models.idempotency import IdempotencyKey
+from models.scheduled_transfer import ScheduledTransfer
+from models.errors import InsufficientFunds, AccountUnavailable, IdempotencyConflict, IdempotencyInProgress
+
+RETRY_DELAY = timedelta(minutes=1)
+
+
+def run_schedule(conn, schedule):
+    """Post one due schedule; returns its outcome for advance_many"""
+    outcome = {'schedule_id': schedule['schedule_id'], 'next_run_at': ScheduledTransfer.next_run_at(schedule)}
+    if schedule['beneficiary_id'] and not schedule['beneficiary_active']:
+        # The beneficiary was removed (or deleted): never pay it again
+        outcome.update(last_status='failed', error='Beneficiary removed')
+        return outcome
+    idempotency = IdempotencyKey.build(
+        schedule['user_id'],
+        f"schedule-{schedule['schedule_id']}-{schedule['next_run_at']:%Y%m%d%H%M%S}",
+        'scheduled_transfer',
+        {'schedule': schedule['schedule_id'], 'run': schedule['next_run_at']}
+    )
+    try:
+        result = posting_engine.transfer(
+            conn,
+            schedule['from_account_id'],
+            schedule['to_account_id'],
+            schedule['amount'],
+            {
+                'description': schedule['description'] or 'Scheduled transfer',
+                'initiated_by': schedule['user_id'],
+                'user_agent': 'scheduler'
+            },
+            idempotency=idempotency
+        )
+        outcome.update(last_status='completed', transaction_id=result['transaction_id'])
+    except (InsufficientFunds, AccountUnavailable, IdempotencyConflict) as e:
+        # The run is missed; the schedule moves on to its next date
+        outcome.update(last_status='failed', error=str(e))
+    except IdempotencyInProgress as e:
+        outcome.update(last_status='retry', error=str(e), retry_at=datetime.now() + RETRY_DELAY)
+    except Exception as e:
+        bank_logger.log_error(e, context="scheduled_transfer", schedule_id=schedule['schedule_id'])
+        outcome.update(last_status='retry', error=str(e), retry_at=datetime.now() + RETRY_DELAY)
+    return outcome
+
+
+def run_due(conn, worker, batch_size, pause=0.0):
+    """Drain due schedules in bounded batches; returns (posted, failed, retried)"""
+    posted = failed = retried = 0
+    while True:
+        schedules = posting_engine.run(conn, lambda cur: ScheduledTransfer.claim_due(cur, worker, batch_size))
+        if not schedules:
+            break
+        outcomes = [run_schedule(conn, schedule) for schedule in schedules]
+        posting_engine.run(conn, lambda cur: ScheduledTransfer.advance_many(cur, outcomes))
+
+        posted += sum(1 for o in outcomes if o['last_status'] == 'completed')
+        failed += sum(1 for o in outcomes if o['last_status'] == 'failed')
+        retried += sum(1 for o in outcomes if o['last_status'] == 'retry')
+        if len(schedules) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return posted, failed, retried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--every', type=int, default=0, help='repeat every N seconds (0 = run once)')
+    parser.add_argument('--batch-size', type=int, default=Config.SCHEDULER_BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between full batches')
+    args = parser.parse_args()
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect()
+    try:
+        while True:
+            started = time.perf_counter()
+            posted, failed, retried = run_due(conn, worker, args.batch_size, args.pause)
+            if posted or failed or retried:
+                bank_logger.log_app('info', 'Scheduled transfers run', posted=posted, failed=failed,
+                                    retried=retried, seconds=round(time.perf_counter() - started, 2))
+            if not args.every:
+                break
+            time.sleep(args.every)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
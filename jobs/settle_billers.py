@@ -0,0 +1,148 @@
+# jobs/settle_billers.py
+"""Close a biller settlement cycle and write one settlement file per biller.
+
+    python -m jobs.settle_billers                          # yesterday, CSV
+    python -m jobs.settle_billers --cycle 2026-10-16 --format fixed
+    python -m jobs.settle_billers --cycle 2026-10-16 --out /var/securebank/settlements
+
+Payments are assigned to the cycle with set-based SQL (Biller.close_cycle),
+then the detail is streamed through a server-side cursor straight into the
+files, so memory stays flat however many payments the cycle holds. Running
+it again for a cycle only writes the settlements not yet exported; files
+already sent are never rewritten and late payments for those billers go
+into their next cycle.
+
+File layouts (one file per biller, <out>/<cycle>/<biller_code>.<ext>):
+
+    csv    record_type,... with H (header), D (detail) and T (trailer) rows
+    fixed  H code(10) cycle(8) settlement_account(30)
+           D transaction_uid(36) customer_reference(20) amount_cents(15) completed_at(14)
+           T payment_count(10) total_cents(18)
+"""
+import argparse
+import csv
+import os
+import time
+from datetime import date, datetime, timedelta
+import MySQLdb.cursors
+from utils.db import connect
+from utils.logger import bank_logger
+from models.biller import Biller
+from models.posting import PostingEngine
+
+
+def cents(amount):
+    return int(amount * 100)
+
+
+class CSVSettlementWriter:
+    extension = 'csv'
+
+    def __init__(self, handle):
+        self.writer = csv.writer(handle)
+
+    def header(self, settlement, cycle):
+        self.writer.writerow(['H', settlement['code'], cycle.isoformat(), settlement['settlement_account'] or ''])
+
+    def detail(self, row):
+        self.writer.writerow(['D', row['transaction_uid'], row['customer_reference'],
+                              f"{row['amount']:.2f}", row['completed_at'].strftime('%Y-%m-%d %H:%M:%S')])
+
+    def trailer(self, count, total):
+        self.writer.writerow(['T', count, f"{total:.2f}"])
+
+
+class FixedWidthSettlementWriter:
+    extension = 'txt'
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def header(self, settlement, cycle):
+        self.handle.write(f"H{settlement['code'][:10]:<10}{cycle:%Y%m%d}{(settlement['settlement_account'] or '')[:30]:<30}\n")
+
+    def detail(self, row):
+        self.handle.write(f"D{row['transaction_uid']:<36}{row['customer_reference'][:20]:<20}"
+                          f"{cents(row['amount']):015d}{row['completed_at']:%Y%m%d%H%M%S}\n")
+
+    def trailer(self, count, total):
+        self.handle.write(f"T{count:010d}{cents(total):018d}\n")
+
+
+WRITERS = {'csv': CSVSettlementWriter, 'fixed': FixedWidthSettlementWriter}
+
+
+def export_cycle(conn, cycle, out_dir, writer_class):
+    """Stream the cycle's unexported payments into per-biller files; returns settlements written"""
+    cursor = conn.cursor()
+    settlements = {s['settlement_id']: s for s in Biller.get_settlements(cursor, cycle)}
+    conn.commit()
+    cursor.close()
+
+    cycle_dir = os.path.join(out_dir, cycle.isoformat())
+    os.makedirs(cycle_dir, exist_ok=True)
+
+    written = []
+    stream = conn.cursor(MySQLdb.cursors.SSDictCursor)
+    handle = writer = current = None
+    count = total = 0
+    try:
+        for row in Biller.settlement_lines(stream, cycle):
+            if row['settlement_id'] != current:
+                if writer:
+                    writer.trailer(count, total)
+                    handle.close()
+                current = row['settlement_id']
+                settlement = settlements[current]
+                path = os.path.join(cycle_dir, f"{settlement['code']}.{writer_class.extension}")
+                handle = open(path, 'w', newline='', buffering=1024 * 1024)
+                writer = writer_class(handle)
+                writer.header(settlement, cycle)
+                written.append((current, path))
+                count, total = 0, 0
+            writer.detail(row)
+            count += 1
+            total += row['amount']
+        if writer:
+            writer.trailer(count, total)
+            handle.close()
+    finally:
+        stream.close()
+        conn.commit()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycle', help='cycle date YYYY-MM-DD (default: yesterday)')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--out', default='settlements')
+    args = parser.parse_args()
+
+    cycle = datetime.strptime(args.cycle, '%Y-%m-%d').date() if args.cycle else date.today() - timedelta(days=1)
+
+    conn = connect()
+    engine = PostingEngine()
+    try:
+        started = time.perf_counter()
+        settlements = engine.run(conn, lambda cur: Biller.close_cycle(cur, cycle))
+        closed = time.perf_counter() - started
+
+        written = export_cycle(conn, cycle, args.out, WRITERS[args.format])
+        for settlement_id, path in written:
+            engine.run(conn, lambda cur, sid=settlement_id, p=path: Biller.mark_exported(cur, sid, p))
+        elapsed = time.perf_counter() - started
+
+        payments = sum(s['payment_count'] for s in settlements)
+        bank_logger.log_app('info', 'Biller settlement cycle closed', cycle=cycle.isoformat(),
+                            billers=len(settlements), payments=payments,
+                            total=str(sum(s['total_amount'] for s in settlements)),
+                            close_seconds=round(closed, 2), seconds=round(elapsed, 2))
+        for s in settlements:
+            print(f"{s['code']:<12} {s['payment_count']:>10} {s['total_amount']:>18,.2f}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# jobs/settle_pending.py
+"""Settle pending transactions accepted with SETTLEMENT_MODE=async.
+
+    python -m jobs.settle_pending                    # run the worker pool
+    python -m jobs.settle_pending --workers 8 --batch-size 200
+    python -m jobs.settle_pending --once             # settle until the queue is empty
+
+Each worker thread has its own MySQL connection and claims batches with
+FOR UPDATE SKIP LOCKED, so several pools (or processes) can run side by side.
+The same pool can run inside the app (SETTLEMENT_EMBEDDED_WORKERS).
+"""
+import argparse
+import threading
+import time
+from config import Config
+from utils.db import connect
+from utils.logger import bank_logger
+from models.posting import PostingEngine
+from models.settlement import Settlement
+
+
+class SettlementPool:
+    """Local pool of settlement worker threads"""
+
+    def __init__(self, workers=Config.SETTLEMENT_WORKERS, batch_size=Config.SETTLEMENT_BATCH_SIZE,
+                 idle_sleep=0.5, stop_when_idle=False):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.stop_when_idle = stop_when_idle
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'settlement-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        bank_logger.log_app('info', 'Settlement pool started', workers=self.workers, batch_size=self.batch_size)
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        return {'workers': self.workers, 'completed': self.completed, 'failed': self.failed}
+
+    def _work(self):
+        engine = PostingEngine()
+        conn = None
+        while not self._stop.is_set():
+            try:
+                if conn is None:
+                    conn = connect()
+                completed, failed = engine.run(conn, lambda cur: Settlement.settle_batch(cur, self.batch_size))
+            except Exception as e:
+                bank_logger.log_error(e, context="settlement_worker")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                self._stop.wait(self.idle_sleep)
+                continue
+
+            with self._lock:
+                self.completed += completed
+                self.failed += failed
+            if completed + failed == 0:
+                if self.stop_when_idle:
+                    break
+                self._stop.wait(self.idle_sleep)
+        if conn is not None:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=Config.SETTLEMENT_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=Config.SETTLEMENT_BATCH_SIZE)
+    parser.add_argument('--idle-sleep', type=float, default=0.5, help='seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='exit once no pending transactions are left')
+    args = parser.parse_args()
+
+    pool = SettlementPool(args.workers, args.batch_size, args.idle_sleep, stop_when_idle=args.once)
+    started = time.perf_counter()
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
+    elapsed = time.perf_counter() - started
+    bank_logger.log_app('info', 'Settlement pool stopped', seconds=round(elapsed, 2), **pool.stats())
+
+
+if __name__ == '__main__':
+    main()
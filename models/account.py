@@ -1,4 +1,20 @@
 # models/account.py
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from models.errors import AccountUnavailable, InsufficientFunds
+from models.hot_account import HotAccount
+from models.account_rollup import AccountRollup
+from models.ledger import Ledger
+from models.counters import Counters
+from models.account_cache import account_cache
+from models.user_summary import UserSummary
+
+CENT = Decimal('0.01')
+
+def to_money(value):
+    """Normalise an amount (str/float/Decimal) to a 2dp Decimal"""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
 class Account:
     """Account model - handles all account-related database operations"""
     
@@ -9,7 +25,7 @@ class Account:
             cursor.execute("SELECT * FROM accounts WHERE account_id = %s AND user_id = %s", (account_id, user_id))
         else:
             cursor.execute("SELECT * FROM accounts WHERE account_id = %s", (account_id,))
-        return cursor.fetchone()
+        return HotAccount.include_pending(cursor, cursor.fetchone())
     
     @staticmethod
     def get_by_number(cursor, account_number):
@@ -20,16 +36,20 @@ class Account:
             JOIN users u ON a.user_id = u.user_id
             WHERE a.account_number = %s
         """, (account_number,))
-        return cursor.fetchone()
+        return HotAccount.include_pending(cursor, cursor.fetchone())
     
     @staticmethod
-    def get_user_accounts(cursor, user_id, active_only=True):
-        """Get all accounts for a user"""
-        if active_only:
-            cursor.execute("SELECT * FROM accounts WHERE user_id = %s AND status = 'active' ORDER BY account_type", (user_id,))
-        else:
-            cursor.execute("SELECT * FROM accounts WHERE user_id = %s ORDER BY account_type", (user_id,))
-        return cursor.fetchall()
+    def get_user_accounts(cursor, user_id, active_only=True, fresh=False):
+        """Get all accounts for a user (cached, see AccountCache)"""
+        return account_cache.get_user_accounts(cursor, user_id, active_only, fresh)
+    
+    @staticmethod
+    def pick(accounts, account_id):
+        """The account with account_id from a get_user_accounts list, or None"""
+        for account in accounts:
+            if str(account['account_id']) == str(account_id):
+                return account
+        return None
     
     @staticmethod
     def create(cursor, account_data):
@@ -44,68 +64,232 @@ class Account:
             account_data['account_type'],
             account_data['balance'],
             account_data['available_balance'],
-            account_data.get('opened_date', 'CURDATE()')
+            account_data.get('opened_date') or date.today()
         ))
-        return cursor.lastrowid
+        account_id = cursor.lastrowid
+        Ledger.open_account(cursor, account_id, account_data['balance'])
+        account_cache.touch(cursor, [account_data['user_id']])
+        Counters.record_account(cursor, account_data['account_type'], account_data['balance'])
+        UserSummary.add(cursor, {account_data['user_id']: (1, account_data['balance'])})
+        return account_id
     
     @staticmethod
     def update_balance(cursor, account_id, amount, is_deposit=True):
-        """Update account balance"""
+        """Update account balance.
+        
+        Debits are conditional on the balance covering the amount, so two
+        concurrent withdrawals can never take the account negative. Credits
+        to hot accounts land on a balance slot (see HotAccount).
+        """
+        hot = HotAccount.hot_accounts(cursor)
         if is_deposit:
+            if account_id in hot:
+                cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s LOCK IN SHARE MODE", (account_id,))
+                HotAccount.credit(cursor, account_id, amount, hot[account_id])
+                return
             cursor.execute("""
                 UPDATE accounts 
                 SET balance = balance + %s, available_balance = available_balance + %s, last_transaction_date = NOW()
                 WHERE account_id = %s
             """, (amount, amount, account_id))
+            UserSummary.record_account_balance(cursor, account_id, amount)
         else:
+            if account_id in hot:
+                Account.lock_for_update(cursor, [account_id])
+                HotAccount.fold(cursor, account_id)
+            cursor.execute("""
+                UPDATE accounts 
+                SET balance = balance - %s, available_balance = available_balance - %s, last_transaction_date = NOW()
+                WHERE account_id = %s AND balance >= %s
+            """, (amount, amount, account_id, amount))
+            if cursor.rowcount == 0:
+                account = Account.get_by_id(cursor, account_id)
+                if not account:
+                    raise AccountUnavailable(account_id)
+                raise InsufficientFunds(account_id, account['balance'], amount)
+            UserSummary.record_account_balance(cursor, account_id, -amount)
+    
+    @staticmethod
+    def lock_for_update(cursor, account_ids, shared_ids=(), chunk_size=1000):
+        """Lock account rows in ascending account_id order and return them keyed by id.
+        
+        Every writer locks in the same order, so A->B and B->A transfers queue
+        behind each other instead of deadlocking. Large sets are locked in
+        ascending chunks so the order still holds across statements.
+        Ids in shared_ids (hot accounts only being credited) get a shared
+        lock so concurrent credits do not queue behind each other.
+        """
+        shared = set(int(a) for a in shared_ids)
+        ids = sorted(set(int(a) for a in account_ids) | shared)
+        
+        # Split into ascending runs of the same lock mode, at most chunk_size long
+        runs = []
+        for account_id in ids:
+            mode = account_id in shared
+            if runs and runs[-1][0] == mode and len(runs[-1][1]) < chunk_size:
+                runs[-1][1].append(account_id)
+            else:
+                runs.append((mode, [account_id]))
+        
+        locked = {}
+        for is_shared, chunk in runs:
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                SELECT account_id, account_number, user_id, account_type, balance, available_balance, status, hot_slots
+                FROM accounts WHERE account_id IN ({placeholders})
+                ORDER BY account_id
+                {'LOCK IN SHARE MODE' if is_shared else 'FOR UPDATE'}
+            """, chunk)
+            for row in cursor.fetchall():
+                locked[row['account_id']] = row
+        account_cache.touch(cursor, {row['user_id'] for row in locked.values()})
+        return locked
+    
+    @staticmethod
+    def find_by_numbers(cursor, account_numbers, chunk_size=5000):
+        """Set-based lookup of many account numbers; returns {account_number: row}"""
+        numbers = list(set(account_numbers))
+        found = {}
+        for i in range(0, len(numbers), chunk_size):
+            chunk = numbers[i:i + chunk_size]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                SELECT account_id, account_number, user_id, status
+                FROM accounts WHERE account_number IN ({placeholders})
+            """, chunk)
+            for row in cursor.fetchall():
+                found[row['account_number']] = row
+        return found
+    
+    @staticmethod
+    def apply_deltas(cursor, deltas, locked, chunk_size=1000):
+        """Apply net balance changes {account_id: signed amount} with grouped UPDATEs.
+        
+        Rows must already be locked (lock_for_update, passed as `locked`) and
+        checked by the caller; hot accounts being debited must have been
+        folded. Credits to hot accounts go to a balance slot instead of the
+        accounts row.
+        """
+        by_type = {}
+        for account_id, delta in deltas.items():
+            account_type = locked[account_id]['account_type']
+            by_type[account_type] = by_type.get(account_type, 0) + delta
+        Counters.record_balances(cursor, by_type)
+        
+        hot = HotAccount.hot_accounts(cursor)
+        for account_id in sorted(a for a, d in deltas.items() if d > 0 and a in hot):
+            HotAccount.credit(cursor, account_id, deltas[account_id], hot[account_id])
+        ids = sorted(a for a, d in deltas.items() if d and not (d > 0 and a in hot))
+        UserSummary.record_balances(cursor, {a: deltas[a] for a in ids}, locked)
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            case = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+            case_params = [v for a in chunk for v in (a, deltas[a])]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                UPDATE accounts
+                SET balance = balance + (CASE account_id {case} END),
+                    available_balance = available_balance + (CASE account_id {case} END),
+                    last_transaction_date = NOW()
+                WHERE account_id IN ({placeholders})
+            """, case_params + case_params + chunk)
+    
+    @staticmethod
+    def move_funds(cursor, from_account_id, to_account_id, amount):
+        """Debit and/or credit accounts under row locks.
+        
+        Either side may be None (deposits have no source, bill payments no
+        destination). Locks the rows ordered by account_id, re-checks status
+        and funds under the lock and applies the legs, with today's
+        AccountRollup rows. Must run inside the caller's transaction.
+        Returns the new balances keyed by account_id.
+        """
+        from_account_id = int(from_account_id) if from_account_id else None
+        to_account_id = int(to_account_id) if to_account_id else None
+        amount = to_money(amount)
+        hot = HotAccount.hot_accounts(cursor)
+        to_hot = bool(to_account_id) and to_account_id in hot and to_account_id != from_account_id
+        involved = [a for a in (from_account_id, to_account_id) if a]
+        locked = Account.lock_for_update(
+            cursor,
+            [a for a in involved if not (to_hot and a == to_account_id)],
+            shared_ids=[to_account_id] if to_hot else ()
+        )
+        for account_id in involved:
+            if account_id not in locked or locked[account_id]['status'] != 'active':
+                raise AccountUnavailable(account_id)
+        
+        balances = {}
+        type_deltas = {}
+        movements = {}
+        if from_account_id:
+            source = locked[from_account_id]
+            if source['hot_slots']:
+                source['balance'] += HotAccount.fold(cursor, from_account_id)
+            if source['balance'] < amount:
+                raise InsufficientFunds(from_account_id, source['balance'], amount)
+            
+            # Deduct from source
             cursor.execute("""
                 UPDATE accounts 
                 SET balance = balance - %s, available_balance = available_balance - %s, last_transaction_date = NOW()
                 WHERE account_id = %s
-            """, (amount, amount, account_id))
+            """, (amount, amount, from_account_id))
+            balances[from_account_id] = source['balance'] - amount
+            type_deltas[source['account_type']] = -amount
+            movements[from_account_id] = {'debits': amount, 'count': 1}
+        
+        if to_hot:
+            # Spread credits to hot accounts over their balance slots
+            HotAccount.credit(cursor, to_account_id, amount, hot[to_account_id])
+            pending = HotAccount.pending(cursor, [to_account_id]).get(to_account_id) or 0
+            balances[to_account_id] = locked[to_account_id]['balance'] + pending
+        elif to_account_id:
+            # Add to destination
+            cursor.execute("""
+                UPDATE accounts 
+                SET balance = balance + %s, available_balance = available_balance + %s, last_transaction_date = NOW()
+                WHERE account_id = %s
+            """, (amount, amount, to_account_id))
+            balances[to_account_id] = balances.get(to_account_id, locked[to_account_id]['balance']) + amount
+            movement = movements.setdefault(to_account_id, {'count': 0})
+            movement.update(credits=amount, count=movement['count'] + 1)
+        if to_account_id:
+            to_type = locked[to_account_id]['account_type']
+            type_deltas[to_type] = type_deltas.get(to_type, 0) + amount
+        Counters.record_balances(cursor, type_deltas)
+        UserSummary.record_balances(cursor, {a: m.get('credits', 0) - m.get('debits', 0) for a, m in movements.items()}, locked)
+        for account_id, movement in movements.items():
+            movement['closing_balance'] = balances[account_id]
+        AccountRollup.record(cursor, movements)
+        
+        return balances
     
     @staticmethod
     def transfer(cursor, from_account_id, to_account_id, amount):
-        """Transfer money between accounts"""
-        # Deduct from source
-        cursor.execute("""
-            UPDATE accounts 
-            SET balance = balance - %s, available_balance = available_balance - %s, last_transaction_date = NOW()
-            WHERE account_id = %s
-        """, (amount, amount, from_account_id))
-        
-        # Add to destination
-        cursor.execute("""
-            UPDATE accounts 
-            SET balance = balance + %s, available_balance = available_balance + %s, last_transaction_date = NOW()
-            WHERE account_id = %s
-        """, (amount, amount, to_account_id))
+        """Transfer money between accounts (see move_funds)"""
+        return Account.move_funds(cursor, from_account_id, to_account_id, amount)
+    
+    @staticmethod
+    def balance_as_of(cursor, account_id, ts):
+        """Balance at a point in time: the nearest ledger snapshot at or
+        before ts (jobs/eod_snapshots.py writes one per account per day)
+        plus the account's entries between it and ts."""
+        return Ledger.balance_at(cursor, account_id, ts)
     
     @staticmethod
     def check_sufficient_balance(cursor, account_id, amount):
         """Check if account has sufficient balance"""
-        cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
-        account = cursor.fetchone()
+        account = Account.get_by_id(cursor, account_id)
         return account and account['balance'] >= amount
     
     @staticmethod
     def get_total_balance(cursor):
-        """Get total balance of all accounts"""
-        cursor.execute("SELECT SUM(balance) as total FROM accounts")
-        result = cursor.fetchone()
-        return result['total'] or 0
+        """Get total balance of all accounts (from the stats counters)"""
+        return Counters.dashboard(cursor)['total_balance']
     
     @staticmethod
     def get_stats(cursor):
-        """Get account statistics"""
-        cursor.execute("SELECT COUNT(*) as total FROM accounts")
-        total = cursor.fetchone()['total']
-        
-        cursor.execute("""
-            SELECT account_type, COUNT(*) as count, SUM(balance) as total_balance
-            FROM accounts
-            GROUP BY account_type
-        """)
-        by_type = cursor.fetchall()
-        
-        return {'total': total, 'by_type': by_type}
\ No newline at end of file
+        """Get account statistics (from the stats counters)"""
+        stats = Counters.dashboard(cursor)
+        return {'total': stats['total_accounts'], 'by_type': stats['by_type']}
\ No newline at end of file
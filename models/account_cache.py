@@ -0,0 +1,185 @@
+# models/account_cache.py
+import itertools
+import time
+from config import Config
+from utils.cache import LRUCache
+from models.hot_account import HotAccount
+
+try:
+    import redis
+except ImportError:  # optional shared backend
+    redis = None
+
+# Connection attribute collecting user_ids touched by the open transaction
+_TOUCHED = '_account_cache_touched'
+
+
+class AccountCache:
+    """Per-user cache of account rows (Account.get_user_accounts).
+
+    Two levels: a request-scoped copy on flask.g, so a page that needs the
+    accounts twice reads them once, and a process-level LRU keyed by user_id
+    with a TTL. Each entry keeps the rows' MAX(updated_at) as its version.
+
+    Write paths mark the users whose accounts they lock (touch) and the
+    posting engine invalidates them once the transaction commits (flush),
+    or forgets them on rollback (discard). Invalidation always reaches this
+    process and the current user's session (read-your-writes on any
+    worker). With ACCOUNT_CACHE_REDIS_URL set, a per-user generation in
+    Redis carries it to every worker; without it, changes made by other
+    processes show up within ACCOUNT_CACHE_TTL seconds.
+
+    Unfolded hot-account credits are never cached: they are added to a
+    copy of the rows on every read, like the uncached getter does.
+    """
+
+    SESSION_KEY = '_accounts_changed_at'
+
+    def __init__(self, ttl=30, maxsize=10000, redis_url=None):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._invalidated = LRUCache(maxsize=maxsize, ttl=max(ttl, 1) * 2)
+        self._clock = itertools.count(1)
+        self._redis = redis.Redis.from_url(redis_url) if redis_url and redis else None
+        self.loads = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get_user_accounts(self, cursor, user_id, active_only=True, fresh=False):
+        """A user's accounts ordered by type, from cache when possible.
+
+        fresh=True re-reads the rows (and refreshes the cache), for pages
+        that validate a form against the balances.
+        """
+        if not self.enabled:
+            rows = self._load(cursor, user_id)
+        else:
+            rows = None if fresh else self._request_rows(user_id)
+            if rows is None:
+                rows = self._process_rows(cursor, user_id, fresh)
+                self._remember_for_request(user_id, rows)
+        if active_only:
+            rows = [row for row in rows if row['status'] == 'active']
+        return HotAccount.include_pending(cursor, [dict(row) for row in rows])
+
+    def version(self, cursor, user_id):
+        """MAX(updated_at) over the user's accounts, as cached"""
+        self.get_user_accounts(cursor, user_id, active_only=False)
+        entry = self._entries.get(user_id)
+        return entry['version'] if entry else None
+
+    def _load(self, cursor, user_id):
+        cursor.execute("SELECT * FROM accounts WHERE user_id = %s ORDER BY account_type", (user_id,))
+        self.loads += 1
+        return cursor.fetchall()
+
+    def _process_rows(self, cursor, user_id, fresh=False):
+        generation = self._generation(user_id)
+        if generation is None:
+            return self._load(cursor, user_id)
+        entry = None if fresh else self._entries.get(user_id)
+        if entry and entry['generation'] == generation and entry['loaded_at'] > self._session_mark():
+            return entry['rows']
+
+        started = next(self._clock)
+        loaded_at = time.time()
+        rows = self._load(cursor, user_id)
+        # Skip storing if the user was invalidated while the rows were read
+        if self._invalidated.get(user_id, 0) < started:
+            self._entries.set(user_id, {
+                'rows': rows,
+                'version': max((row['updated_at'] for row in rows if row.get('updated_at')), default=None),
+                'generation': generation,
+                'loaded_at': loaded_at
+            })
+        return rows
+
+    def touch(self, cursor, user_ids):
+        """Mark users whose accounts the open transaction changes"""
+        connection = cursor.connection
+        touched = getattr(connection, _TOUCHED, None)
+        if touched is None:
+            touched = set()
+            setattr(connection, _TOUCHED, touched)
+        touched.update(u for u in user_ids if u)
+
+    def flush(self, connection):
+        """Invalidate users touched by the transaction that just committed"""
+        touched = getattr(connection, _TOUCHED, None)
+        if touched:
+            setattr(connection, _TOUCHED, None)
+            self.invalidate(touched)
+
+    def discard(self, connection):
+        """Forget touched users after a rollback"""
+        if getattr(connection, _TOUCHED, None):
+            setattr(connection, _TOUCHED, None)
+
+    def invalidate(self, user_ids):
+        user_ids = set(user_ids)
+        stamp = next(self._clock)
+        for user_id in user_ids:
+            self._invalidated.set(user_id, stamp)
+            self._entries.delete(user_id)
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for user_id in user_ids:
+                    pipe.incr(self._redis_key(user_id))
+                    pipe.expire(self._redis_key(user_id), 86400)
+                pipe.execute()
+            except redis.RedisError:
+                pass
+        self._forget_for_request(user_ids)
+
+    def _generation(self, user_id):
+        if self._redis is None:
+            return 0
+        try:
+            return int(self._redis.get(self._redis_key(user_id)) or 0)
+        except redis.RedisError:
+            # Shared backend down: read the database until it is back
+            return None
+
+    @staticmethod
+    def _redis_key(user_id):
+        return f"securebank:accounts:{user_id}"
+
+    # Request scope (no-ops outside a Flask request, e.g. in jobs)
+
+    def _request_rows(self, user_id):
+        from flask import g, has_app_context
+        if not has_app_context():
+            return None
+        return g.get('_user_accounts', {}).get(user_id)
+
+    def _remember_for_request(self, user_id, rows):
+        from flask import g, has_app_context
+        if has_app_context():
+            g.setdefault('_user_accounts', {})[user_id] = rows
+
+    def _forget_for_request(self, user_ids):
+        from flask import g, has_app_context, has_request_context, session
+        if has_app_context():
+            cached = g.get('_user_accounts')
+            for user_id in user_ids:
+                if cached:
+                    cached.pop(user_id, None)
+        if has_request_context() and session.get('user_id') in user_ids:
+            session[self.SESSION_KEY] = time.time()
+
+    def _session_mark(self):
+        from flask import has_request_context, session
+        return session.get(self.SESSION_KEY, 0) if has_request_context() else 0
+
+    def stats(self):
+        return dict(self._entries.stats(), loads=self.loads, shared=self._redis is not None)
+
+
+account_cache = AccountCache(
+    ttl=Config.ACCOUNT_CACHE_TTL,
+    maxsize=Config.ACCOUNT_CACHE_SIZE,
+    redis_url=Config.ACCOUNT_CACHE_REDIS_URL
+)
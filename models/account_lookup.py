@@ -0,0 +1,190 @@
+# models/account_lookup.py
+import threading
+import time
+import MySQLdb.cursors
+from config import Config
+from utils.bloom import BloomFilter
+from utils.cache import LRUCache
+from utils.db import connect
+from utils.logger import bank_logger
+
+# Value stored in the negative cache
+_ABSENT = False
+
+# Top-ups re-read this many ids below the last one seen, for accounts whose
+# insert committed after one with a higher id
+_TOP_UP_OVERLAP = 1000
+
+
+class AccountLookup:
+    """Account number -> holder lookups for /api/verify_account.
+
+    Three layers in front of MySQL:
+
+    - a bounded LRU of found accounts (ACCOUNT_LOOKUP_TTL),
+    - a short-TTL cache of numbers that were not found
+      (ACCOUNT_LOOKUP_NEGATIVE_TTL), so a new account is visible soon,
+    - a Bloom filter of every accounts.account_number. A number the filter
+      rejects cannot exist, so mistyped numbers never reach MySQL.
+
+    The filter is topped up from account_id > last seen id every
+    ACCOUNT_LOOKUP_REFRESH_SECONDS (one primary key range read), and
+    rebuilt from scratch in a background thread every
+    ACCOUNT_LOOKUP_REBUILD_SECONDS to resize it. Until the first build
+    finishes every lookup goes to MySQL.
+    """
+
+    def __init__(self, cache_size=50000, ttl=300, negative_ttl=10, refresh_seconds=5,
+                 rebuild_seconds=3600, error_rate=0.01):
+        self._found = LRUCache(maxsize=cache_size, ttl=ttl)
+        self._missing = LRUCache(maxsize=cache_size, ttl=negative_ttl)
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.error_rate = error_rate
+        self._filter = None
+        self._last_id = 0
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._building = False
+        self.filtered = 0
+        self.queries = 0
+
+    @staticmethod
+    def normalize(account_number):
+        return str(account_number or '').strip().upper()
+
+    def lookup(self, cursor, account_number):
+        """{'account_number', 'holder_name'} or None"""
+        return self.lookup_many(cursor, [account_number]).get(self.normalize(account_number))
+
+    def lookup_many(self, cursor, account_numbers, chunk_size=1000):
+        """{normalized number: {'account_number', 'holder_name'} or None} for every number given"""
+        numbers = {self.normalize(n) for n in account_numbers}
+        results = {}
+        pending = []
+        bloom = self._current_filter(cursor)
+        for number in numbers:
+            found = self._found.get(number)
+            if found is not None:
+                results[number] = found
+            elif not number or self._missing.get(number) is _ABSENT:
+                results[number] = None
+            elif bloom is not None and number not in bloom:
+                self.filtered += 1
+                results[number] = None
+            else:
+                pending.append(number)
+
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                SELECT a.account_number, u.first_name, u.last_name
+                FROM accounts a
+                JOIN users u ON a.user_id = u.user_id
+                WHERE a.account_number IN ({placeholders})
+            """, chunk)
+            self.queries += 1
+            for row in cursor.fetchall():
+                number = self.normalize(row['account_number'])
+                found = {
+                    'account_number': row['account_number'],
+                    'holder_name': f"{row['first_name']} {row['last_name']}".strip()
+                }
+                self._found.set(number, found)
+                results[number] = found
+            for number in chunk:
+                if number not in results:
+                    self._missing.set(number, _ABSENT)
+                    results[number] = None
+        return results
+
+    # Membership filter
+
+    def _current_filter(self, cursor):
+        now = time.monotonic()
+        if now - self._built_at >= self.rebuild_seconds:
+            self._start_rebuild()
+        if self._filter is not None and now - self._refreshed_at >= self.refresh_seconds:
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._top_up(cursor)
+                finally:
+                    self._lock.release()
+        return self._filter
+
+    def _top_up(self, cursor):
+        """Add accounts created since the filter last looked (caller holds _lock)"""
+        cursor.execute("""
+            SELECT account_id, account_number FROM accounts
+            WHERE account_id > %s ORDER BY account_id
+        """, (max(self._last_id - _TOP_UP_OVERLAP, 0),))
+        for row in cursor.fetchall():
+            number = self.normalize(row['account_number'])
+            if row['account_id'] > self._last_id or number not in self._filter:
+                self._filter.add(number)
+            self._last_id = max(self._last_id, row['account_id'])
+        self._refreshed_at = time.monotonic()
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._built_at = time.monotonic()
+        threading.Thread(target=self._rebuild, name='account-lookup-filter', daemon=True).start()
+
+    def _rebuild(self):
+        """Build a new filter from every account number, streamed, then swap it in"""
+        conn = None
+        try:
+            conn = connect()
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) AS count FROM accounts")
+            capacity = int(cursor.fetchone()['count'] * 1.25) + 10000
+            cursor.close()
+            bloom = BloomFilter(capacity, self.error_rate)
+            last_id = 0
+            stream = conn.cursor(MySQLdb.cursors.SSDictCursor)
+            stream.execute("SELECT account_id, account_number FROM accounts ORDER BY account_id")
+            while True:
+                rows = stream.fetchmany(5000)
+                if not rows:
+                    break
+                for row in rows:
+                    bloom.add(self.normalize(row['account_number']))
+                    last_id = row['account_id']
+            stream.close()
+            with self._lock:
+                self._filter = bloom
+                self._last_id = last_id
+                self._refreshed_at = 0.0
+            bank_logger.log_app('info', 'Account lookup filter rebuilt', accounts=len(bloom), bytes=bloom.nbytes)
+        except Exception as e:
+            bank_logger.log_error(e, context="account_lookup_rebuild")
+            # Retry at the next refresh interval rather than a full rebuild period later
+            self._built_at = time.monotonic() - self.rebuild_seconds + self.refresh_seconds
+        finally:
+            self._building = False
+            if conn is not None:
+                conn.close()
+
+    def stats(self):
+        return {
+            'found': self._found.stats(),
+            'missing': self._missing.stats(),
+            'filter_items': len(self._filter) if self._filter is not None else None,
+            'filter_bytes': self._filter.nbytes if self._filter is not None else None,
+            'filtered': self.filtered,
+            'queries': self.queries
+        }
+
+
+account_lookup = AccountLookup(
+    cache_size=Config.ACCOUNT_LOOKUP_CACHE_SIZE,
+    ttl=Config.ACCOUNT_LOOKUP_TTL,
+    negative_ttl=Config.ACCOUNT_LOOKUP_NEGATIVE_TTL,
+    refresh_seconds=Config.ACCOUNT_LOOKUP_REFRESH_SECONDS,
+    rebuild_seconds=Config.ACCOUNT_LOOKUP_REBUILD_SECONDS
+)
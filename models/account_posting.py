@@ -0,0 +1,108 @@
+# models/account_posting.py
+import re
+
+# A reference to the transactions alias in a column list or condition
+_USES_T = re.compile(r'\bt\.')
+
+
+class AccountPosting:
+    """Per-account index of transactions (account_postings).
+
+    Each transaction gets one row per account side it touches (debit for
+    from_account_id, credit for to_account_id), written in the same
+    database transaction. The primary key leads with (account_id,
+    initiated_at, transaction_id), so any "history of account X" read is
+    one index range scan in time order, instead of an OR over from/to_account_id
+    followed by a filesort. Rows are copied from the transactions row
+    itself, so initiated_at always matches.
+    """
+
+    _COPY = """
+        INSERT {ignore} INTO account_postings (account_id, initiated_at, transaction_id, direction, amount)
+        SELECT from_account_id, initiated_at, transaction_id, 'debit', amount
+        FROM transactions WHERE {where} AND from_account_id IS NOT NULL
+        UNION ALL
+        SELECT to_account_id, initiated_at, transaction_id, 'credit', amount
+        FROM transactions WHERE {where} AND to_account_id IS NOT NULL
+    """
+
+    @staticmethod
+    def record(cursor, transaction_id):
+        """Index one freshly inserted transaction"""
+        cursor.execute(AccountPosting._COPY.format(ignore='', where="transaction_id = %s"), (transaction_id, transaction_id))
+
+    @staticmethod
+    def record_uids(cursor, uids):
+        """Index many freshly inserted transactions by transaction_uid"""
+        if not uids:
+            return
+        placeholders = ','.join(['%s'] * len(uids))
+        where = f"transaction_uid IN ({placeholders})"
+        cursor.execute(AccountPosting._COPY.format(ignore='', where=where), list(uids) * 2)
+
+    @staticmethod
+    def seek(account_id, conditions=(), params=(), key=None, descending=True, limit=None,
+             columns='p.transaction_id, p.initiated_at', joins=''):
+        """SQL + params reading one account's postings in key order.
+
+        conditions may reference p (account_postings) and t (transactions);
+        the join to transactions is only made when something needs it.
+        key is an (initiated_at, transaction_id) tuple to continue after.
+        """
+        where = ["p.account_id = %s"] + list(conditions)
+        args = [account_id] + list(params)
+        if key:
+            op = '<' if descending else '>'
+            where.append(f"(p.initiated_at {op} %s OR (p.initiated_at = %s AND p.transaction_id {op} %s))")
+            args += [key[0], key[0], key[1]]
+        if joins or _USES_T.search(columns) or any(_USES_T.search(c) for c in conditions):
+            joins = "JOIN transactions t ON t.transaction_id = p.transaction_id " + joins
+        order = 'DESC' if descending else 'ASC'
+        sql = f"""
+            SELECT {columns} FROM account_postings p {joins}
+            WHERE {' AND '.join(where)}
+            ORDER BY p.initiated_at {order}, p.transaction_id {order}
+        """
+        if limit:
+            sql += " LIMIT %s"
+            args.append(limit)
+        return sql, args
+
+    @staticmethod
+    def get_account_history(cursor, account_id, start_date=None, end_date=None, status=None):
+        """One account's transactions, oldest first, read with one range scan.
+
+        Rows are transactions rows plus this account's direction and the
+        from/to account numbers.
+        """
+        cursor.execute(*AccountPosting.history_query(account_id, start_date, end_date, status))
+        return cursor.fetchall()
+
+    @staticmethod
+    def history_query(account_id, start_date=None, end_date=None, status=None):
+        """SQL + params behind get_account_history, for callers that stream the rows"""
+        conditions, params = [], []
+        if start_date:
+            conditions.append("p.initiated_at >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append("p.initiated_at <= %s")
+            params.append(end_date)
+        if status:
+            conditions.append("t.status = %s")
+            params.append(status)
+        sql, args = AccountPosting.seek(
+            account_id, conditions, params, descending=False,
+            columns="t.*, p.direction, a_from.account_number as from_account_number, "
+                    "a_to.account_number as to_account_number",
+            joins="LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id "
+                  "LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id"
+        )
+        return sql, args
+
+    @staticmethod
+    def backfill(cursor, from_id, to_id):
+        """Index transactions with from_id <= transaction_id < to_id; returns rows added"""
+        where = "transaction_id >= %s AND transaction_id < %s"
+        cursor.execute(AccountPosting._COPY.format(ignore='IGNORE', where=where), (from_id, to_id, from_id, to_id))
+        return cursor.rowcount
@@ -0,0 +1,146 @@
+# models/account_rollup.py
+from datetime import timedelta
+from decimal import Decimal
+from models.hot_account import HotAccount
+
+
+class AccountRollup:
+    """Per-account daily totals (account_daily_rollup).
+
+    One row per account and day holds the completed credits, debits and
+    posting count of that day plus the balance at the end of it. Posting
+    paths add to today's row in the same transaction as the balance change,
+    so totals for any date range are a SUM over at most one row per day
+    and the balance at any day boundary is one primary key lookup.
+
+    Only writers holding the exclusive account lock maintain the row inline,
+    which is what makes closing_balance exact. Credits to hot accounts
+    (shared lock, see HotAccount) are not rolled up inline, or every credit
+    would queue on the day row again; jobs/fold_hot_balances.py rebuilds
+    those accounts' recent days when it folds them. rebuild() recomputes
+    any account and range from account_postings (jobs/rebuild_daily_rollups.py).
+    """
+
+    @staticmethod
+    def record(cursor, movements):
+        """Add today's movements {account_id: {'credits', 'debits', 'count', 'closing_balance'}}.
+
+        closing_balance is the balance after the movement; callers hold
+        the account's exclusive lock, so the last writer of the day is also
+        the latest balance.
+        """
+        rows = [
+            (account_id, m.get('credits', 0), m.get('debits', 0), m['count'], m['closing_balance'])
+            for account_id, m in sorted(movements.items())
+        ]
+        if not rows:
+            return
+        cursor.execute(f"""
+            INSERT INTO account_daily_rollup (account_id, day, credits, debits, count, closing_balance)
+            VALUES {', '.join(['(%s, CURDATE(), %s, %s, %s, %s)'] * len(rows))}
+            ON DUPLICATE KEY UPDATE
+                credits = credits + VALUES(credits),
+                debits = debits + VALUES(debits),
+                count = count + VALUES(count),
+                closing_balance = VALUES(closing_balance)
+        """, [v for row in rows for v in row])
+
+    @staticmethod
+    def totals(cursor, account_ids, start_day=None, end_day=None):
+        """{'credits', 'debits', 'count'} over the accounts for start_day..end_day (inclusive)"""
+        ids = list(account_ids)
+        if not ids:
+            return {'credits': Decimal('0.00'), 'debits': Decimal('0.00'), 'count': 0}
+        conditions = [f"account_id IN ({','.join(['%s'] * len(ids))})"]
+        params = ids
+        if start_day:
+            conditions.append("day >= %s")
+            params.append(start_day)
+        if end_day:
+            conditions.append("day <= %s")
+            params.append(end_day)
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(credits), 0) AS credits,
+                   COALESCE(SUM(debits), 0) AS debits,
+                   COALESCE(SUM(count), 0) AS count
+            FROM account_daily_rollup
+            WHERE {' AND '.join(conditions)}
+        """, params)
+        row = cursor.fetchone()
+        return {'credits': row['credits'], 'debits': row['debits'], 'count': int(row['count'])}
+
+    @staticmethod
+    def opening_balance(cursor, account_id, day):
+        """Balance at the start of `day`, or None if the account has no rollup rows.
+
+        Two primary key lookups: the closing balance of the last day before
+        it, else the first day from it backed out by that day's movements.
+        """
+        cursor.execute("""
+            SELECT closing_balance FROM account_daily_rollup
+            WHERE account_id = %s AND day < %s
+            ORDER BY day DESC LIMIT 1
+        """, (account_id, day))
+        row = cursor.fetchone()
+        if row:
+            return row['closing_balance']
+        cursor.execute("""
+            SELECT closing_balance - credits + debits AS opening FROM account_daily_rollup
+            WHERE account_id = %s AND day >= %s
+            ORDER BY day ASC LIMIT 1
+        """, (account_id, day))
+        row = cursor.fetchone()
+        return row['opening'] if row else None
+
+    @staticmethod
+    def rebuild(cursor, account_ids, since):
+        """Recompute the accounts' rows from `since` (a date) to today.
+
+        Locks the account rows so no posting moves them meanwhile, sums
+        completed postings per day and walks closing balances back from
+        the current balance (unfolded hot-account credits included).
+        Settlements are attributed to the day they completed. Returns the
+        number of rows written.
+        """
+        ids = sorted(set(account_ids))
+        if not ids:
+            return 0
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT account_id, balance FROM accounts
+            WHERE account_id IN ({placeholders})
+            ORDER BY account_id
+            FOR UPDATE
+        """, ids)
+        closing = {row['account_id']: row['balance'] for row in cursor.fetchall()}
+        for account_id, pending in HotAccount.pending(cursor, closing).items():
+            closing[account_id] += pending or 0
+
+        # Postings are keyed by initiated_at; look back a day for late settlements
+        cursor.execute(f"""
+            SELECT p.account_id, DATE(COALESCE(t.completed_at, p.initiated_at)) AS day,
+                   SUM(CASE WHEN p.direction = 'credit' THEN p.amount ELSE 0 END) AS credits,
+                   SUM(CASE WHEN p.direction = 'debit' THEN p.amount ELSE 0 END) AS debits,
+                   COUNT(*) AS count
+            FROM account_postings p
+            JOIN transactions t ON t.transaction_id = p.transaction_id
+            WHERE p.account_id IN ({placeholders}) AND p.initiated_at >= %s AND t.status = 'completed'
+            GROUP BY p.account_id, day
+            HAVING day >= %s
+            ORDER BY p.account_id, day DESC
+        """, ids + [since - timedelta(days=1), since])
+
+        rows = []
+        for row in cursor.fetchall():
+            account_id = row['account_id']
+            rows.append((account_id, row['day'], row['credits'], row['debits'], row['count'], closing[account_id]))
+            closing[account_id] -= row['credits'] - row['debits']
+
+        cursor.execute(f"DELETE FROM account_daily_rollup WHERE account_id IN ({placeholders}) AND day >= %s",
+                       ids + [since])
+        if rows:
+            cursor.executemany("""
+                INSERT INTO account_daily_rollup (account_id, day, credits, debits, count, closing_balance)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+        return len(rows)
@@ -0,0 +1,137 @@
+# models/biller.py
+from datetime import timedelta
+from utils.cache import LRUCache
+
+# Active billers change rarely; keep the list for a minute per process
+_biller_cache = LRUCache(maxsize=1, ttl=60)
+
+
+class Biller:
+    """Biller registry and per-cycle biller settlement.
+
+    Every bill payment writes a bill_payments row (biller + customer
+    reference) in the same transaction as the payment itself. close_cycle
+    then rolls all completed, unsettled payments up into one
+    biller_settlements row per biller with three set-based statements, and
+    settlement_lines streams the detail for the settlement files
+    (jobs/settle_billers.py).
+    """
+
+    @staticmethod
+    def get_active(cursor):
+        """Active billers ordered for display"""
+        billers = _biller_cache.get('active')
+        if billers is None:
+            cursor.execute("""
+                SELECT biller_id, code, name, icon FROM billers
+                WHERE is_active = TRUE
+                ORDER BY sort_order, name
+            """)
+            billers = cursor.fetchall()
+            _biller_cache.set('active', billers)
+        return billers
+
+    @staticmethod
+    def get_by_code(cursor, code):
+        """Active biller by code, or None"""
+        for biller in Biller.get_active(cursor):
+            if biller['code'] == code:
+                return biller
+        return None
+
+    @staticmethod
+    def choices(cursor):
+        """(code, name) pairs for PayBillForm.biller"""
+        return [(b['code'], b['name']) for b in Biller.get_active(cursor)]
+
+    @staticmethod
+    def record_payment(cursor, transaction_id, biller_id, customer_reference):
+        """Link a payment transaction to its biller"""
+        cursor.execute("""
+            INSERT INTO bill_payments (transaction_id, biller_id, customer_reference)
+            VALUES (%s, %s, %s)
+        """, (transaction_id, biller_id, (customer_reference or '')[:50]))
+
+    @staticmethod
+    def close_cycle(cursor, cycle_date):
+        """Assign completed, unsettled payments up to the end of cycle_date.
+
+        Creates (or tops up) one biller_settlements row per biller for the
+        cycle and recomputes its count and total. Returns the settlements.
+        Payments completed before completed_at was written on insert fall
+        back to initiated_at. A settlement already exported is never
+        changed again: payments that arrive late for it stay unsettled and
+        go into the biller's next cycle.
+        """
+        cutoff = cycle_date + timedelta(days=1)
+        cursor.execute("""
+            INSERT IGNORE INTO biller_settlements (biller_id, cycle_date)
+            SELECT DISTINCT bp.biller_id, %s
+            FROM bill_payments bp
+            JOIN transactions t ON t.transaction_id = bp.transaction_id
+            WHERE bp.settlement_id IS NULL AND t.status = 'completed'
+              AND COALESCE(t.completed_at, t.initiated_at) < %s
+        """, (cycle_date, cutoff))
+        cursor.execute("""
+            UPDATE bill_payments bp
+            JOIN transactions t ON t.transaction_id = bp.transaction_id
+            JOIN biller_settlements s ON s.biller_id = bp.biller_id AND s.cycle_date = %s
+                                     AND s.status != 'exported'
+            SET bp.settlement_id = s.settlement_id
+            WHERE bp.settlement_id IS NULL AND t.status = 'completed'
+              AND COALESCE(t.completed_at, t.initiated_at) < %s
+        """, (cycle_date, cutoff))
+        cursor.execute("""
+            UPDATE biller_settlements s
+            JOIN (
+                SELECT bp.settlement_id, COUNT(*) AS payment_count, SUM(t.amount) AS total_amount
+                FROM biller_settlements cs
+                JOIN bill_payments bp ON bp.settlement_id = cs.settlement_id
+                JOIN transactions t ON t.transaction_id = bp.transaction_id
+                WHERE cs.cycle_date = %s AND cs.status != 'exported'
+                GROUP BY bp.settlement_id
+            ) agg ON agg.settlement_id = s.settlement_id
+            SET s.payment_count = agg.payment_count, s.total_amount = agg.total_amount, s.status = 'closed'
+        """, (cycle_date,))
+        return Biller.get_settlements(cursor, cycle_date)
+
+    @staticmethod
+    def get_settlements(cursor, cycle_date):
+        """Settlement rows for a cycle with biller details"""
+        cursor.execute("""
+            SELECT s.*, b.code, b.name, b.settlement_account
+            FROM biller_settlements s
+            JOIN billers b ON b.biller_id = s.biller_id
+            WHERE s.cycle_date = %s
+            ORDER BY b.code
+        """, (cycle_date,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def settlement_lines(cursor, cycle_date, fetch_size=5000):
+        """Yield payment detail rows for a cycle's unexported settlements, grouped by settlement.
+
+        Pass a server-side cursor (SSDictCursor) so rows stream from MySQL
+        instead of being buffered in memory.
+        """
+        cursor.execute("""
+            SELECT bp.settlement_id, t.transaction_uid, bp.customer_reference, t.amount,
+                   COALESCE(t.completed_at, t.initiated_at) AS completed_at
+            FROM biller_settlements s
+            JOIN bill_payments bp ON bp.settlement_id = s.settlement_id
+            JOIN transactions t ON t.transaction_id = bp.transaction_id
+            WHERE s.cycle_date = %s AND s.status != 'exported'
+            ORDER BY bp.settlement_id, bp.transaction_id
+        """, (cycle_date,))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+
+    @staticmethod
+    def mark_exported(cursor, settlement_id, file_path):
+        cursor.execute("""
+            UPDATE biller_settlements SET status = 'exported', file_path = %s, exported_at = NOW()
+            WHERE settlement_id = %s
+        """, (file_path, settlement_id))
@@ -0,0 +1,145 @@
+# models/counters.py
+import random
+from datetime import date
+from decimal import Decimal
+from config import Config
+from utils.cache import LRUCache
+
+# Each counter is spread over this many rows so concurrent postings do not
+# queue on one row lock (database/procedures.sql uses the same number)
+COUNTER_SLOTS = 16
+
+ACCOUNT_TYPES = ('savings', 'checking', 'fixed_deposit', 'loan', 'credit_card')
+
+_counter_cache = LRUCache(maxsize=256, ttl=Config.STATS_CACHE_SECONDS)
+
+
+class Counters:
+    """Incrementally maintained statistics for the admin dashboard.
+
+    Writers add signed deltas to named counters in stats_counters inside
+    their own transaction, so a counter is exactly as committed as the rows
+    it counts. Reads sum at most COUNTER_SLOTS rows per counter and are
+    cached in-process for STATS_CACHE_SECONDS.
+
+    Counter names:
+        users:customers, users:active       customer users / active customers
+        accounts:<type>, balance:<type>     account count / balance per type
+        transactions:<YYYY-MM-DD>           transactions initiated that day
+    """
+
+    @staticmethod
+    def add(cursor, deltas):
+        """Add {name: delta} to counters (names sorted for a stable lock order)"""
+        rows = [(name, random.randrange(COUNTER_SLOTS), delta) for name, delta in sorted(deltas.items()) if delta]
+        if not rows:
+            return
+        cursor.execute(f"""
+            INSERT INTO stats_counters (name, slot, value)
+            VALUES {', '.join(['(%s, %s, %s)'] * len(rows))}
+            ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+        """, [v for row in rows for v in row])
+
+    @staticmethod
+    def get(cursor, names, cached=True):
+        """Current values of the named counters ({name: value}, 0 if unset)"""
+        names = tuple(sorted(set(names)))
+        values = _counter_cache.get(names) if cached else None
+        if values is None:
+            placeholders = ','.join(['%s'] * len(names))
+            cursor.execute(f"""
+                SELECT name, SUM(value) AS value FROM stats_counters
+                WHERE name IN ({placeholders})
+                GROUP BY name
+            """, names)
+            found = {row['name']: row['value'] for row in cursor.fetchall()}
+            values = {name: found.get(name) or Decimal('0') for name in names}
+            _counter_cache.set(names, values)
+        return values
+
+    @staticmethod
+    def transactions_key(day=None):
+        return f"transactions:{(day or date.today()).isoformat()}"
+
+    @staticmethod
+    def record_transactions(cursor, count=1):
+        Counters.add(cursor, {Counters.transactions_key(): count})
+
+    @staticmethod
+    def record_balances(cursor, type_deltas):
+        """Add {account_type: signed amount} to the per-type balance counters"""
+        Counters.add(cursor, {f"balance:{t}": d for t, d in type_deltas.items()})
+
+    @staticmethod
+    def record_account(cursor, account_type, balance):
+        Counters.add(cursor, {f"accounts:{account_type}": 1, f"balance:{account_type}": balance})
+
+    @staticmethod
+    def record_user(cursor, active=True):
+        Counters.add(cursor, {'users:customers': 1, 'users:active': 1 if active else 0})
+
+    @staticmethod
+    def record_toggle(cursor, activated, role='customer'):
+        if role == 'customer':
+            Counters.add(cursor, {'users:active': 1 if activated else -1})
+
+    @staticmethod
+    def dashboard(cursor):
+        """Everything admin.dashboard shows, from counters only"""
+        names = ['users:customers', 'users:active', Counters.transactions_key()]
+        names += [f"accounts:{t}" for t in ACCOUNT_TYPES] + [f"balance:{t}" for t in ACCOUNT_TYPES]
+        values = Counters.get(cursor, names)
+        return {
+            'total_users': int(values['users:customers']),
+            'active_users': int(values['users:active']),
+            'total_accounts': int(sum(values[f"accounts:{t}"] for t in ACCOUNT_TYPES)),
+            'today_transactions': int(values[Counters.transactions_key()]),
+            'total_balance': sum(values[f"balance:{t}"] for t in ACCOUNT_TYPES),
+            'by_type': [
+                {'account_type': t, 'count': int(values[f"accounts:{t}"]), 'total_balance': values[f"balance:{t}"]}
+                for t in ACCOUNT_TYPES if values[f"accounts:{t}"]
+            ]
+        }
+
+    @staticmethod
+    def rebuild(cursor):
+        """Recompute every counter from the base tables.
+
+        Locks the counter rows first so postings that have not yet bumped a
+        counter wait and apply their delta on top of the rebuilt value.
+        Run with jobs/rebuild_counters.py after loading data outside the app.
+        """
+        cursor.execute("SELECT name FROM stats_counters FOR UPDATE")
+        values = {}
+        cursor.execute("""
+            SELECT COUNT(*) AS customers, COALESCE(SUM(is_active), 0) AS active
+            FROM users WHERE role = 'customer'
+        """)
+        row = cursor.fetchone()
+        values['users:customers'] = row['customers']
+        values['users:active'] = row['active']
+        cursor.execute("""
+            SELECT a.account_type, COUNT(*) AS count,
+                   SUM(a.balance + COALESCE(s.pending, 0)) AS balance
+            FROM accounts a
+            LEFT JOIN (SELECT account_id, SUM(balance) AS pending FROM account_balance_slots GROUP BY account_id) s
+                ON s.account_id = a.account_id
+            GROUP BY a.account_type
+        """)
+        for row in cursor.fetchall():
+            values[f"accounts:{row['account_type']}"] = row['count']
+            values[f"balance:{row['account_type']}"] = row['balance']
+        cursor.execute("""
+            SELECT DATE(initiated_at) AS day, COUNT(*) AS count FROM transactions
+            WHERE initiated_at >= CURDATE() - INTERVAL 30 DAY
+            GROUP BY DATE(initiated_at)
+        """)
+        for row in cursor.fetchall():
+            values[Counters.transactions_key(row['day'])] = row['count']
+
+        cursor.execute("DELETE FROM stats_counters WHERE name NOT LIKE 'transactions:%%' OR name IN ({})".format(
+            ','.join(['%s'] * len(values))), list(values))
+        cursor.executemany("INSERT INTO stats_counters (name, slot, value) VALUES (%s, 0, %s)",
+                           list(values.items()))
+        _counter_cache.clear()
+        return values
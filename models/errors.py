@@ -0,0 +1,37 @@
+# models/errors.py
+class PostingError(Exception):
+    """Base class for errors raised while posting money movements"""
+
+
+class AccountUnavailable(PostingError):
+    """Account does not exist or is not active"""
+
+    def __init__(self, account_id):
+        super().__init__(f"Account {account_id} not found or inactive")
+        self.account_id = account_id
+
+
+class InsufficientFunds(PostingError):
+    """Source account balance does not cover the amount"""
+
+    def __init__(self, account_id, balance, amount):
+        super().__init__(f"Insufficient funds in account {account_id}")
+        self.account_id = account_id
+        self.balance = balance
+        self.amount = amount
+
+
+class IdempotencyConflict(PostingError):
+    """Idempotency key was already used for a different request"""
+
+    def __init__(self, key):
+        super().__init__(f"Idempotency key {key} was used with different parameters")
+        self.key = key
+
+
+class IdempotencyInProgress(PostingError):
+    """Another request holding the same idempotency key has not finished"""
+
+    def __init__(self, key):
+        super().__init__(f"Request with idempotency key {key} is still being processed")
+        self.key = key
@@ -0,0 +1,122 @@
+# models/hot_account.py
+import random
+from decimal import Decimal
+from config import Config
+from utils.cache import LRUCache
+from models.user_summary import UserSummary
+
+# {account_id: slot count} for every hot account, refreshed every few seconds
+_hot_cache = LRUCache(maxsize=1, ttl=Config.HOT_ACCOUNT_REFRESH_SECONDS)
+
+
+class HotAccount:
+    """Sub-balance slots for high-volume receiving accounts.
+
+    An account with accounts.hot_slots = N > 0 takes credits on one of N rows
+    in account_balance_slots instead of its accounts row. Credits then hold
+    only a shared lock on the account row and spread over N slot rows, so
+    they no longer serialize on one row lock. The slot total is folded back
+    into accounts.balance before any debit, by jobs/fold_hot_balances.py,
+    and is added to the balance whenever an Account getter reads the row.
+    """
+
+    @staticmethod
+    def hot_accounts(cursor):
+        """Map of hot account_id -> slot count (cached for a few seconds)"""
+        hot = _hot_cache.get('hot')
+        if hot is None:
+            cursor.execute("SELECT account_id, hot_slots FROM accounts WHERE hot_slots > 0")
+            hot = {row['account_id']: row['hot_slots'] for row in cursor.fetchall()}
+            _hot_cache.set('hot', hot)
+        return hot
+
+    @staticmethod
+    def enable(cursor, account_id, slots):
+        """Flag an account as hot with `slots` credit slots"""
+        cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
+        HotAccount.fold(cursor, account_id)
+        cursor.execute("DELETE FROM account_balance_slots WHERE account_id = %s AND slot >= %s", (account_id, slots))
+        cursor.executemany("""
+            INSERT IGNORE INTO account_balance_slots (account_id, slot, balance) VALUES (%s, %s, 0)
+        """, [(account_id, slot) for slot in range(slots)])
+        cursor.execute("UPDATE accounts SET hot_slots = %s WHERE account_id = %s", (slots, account_id))
+        _hot_cache.clear()
+
+    @staticmethod
+    def disable(cursor, account_id):
+        """Fold the slots back and return the account to a single balance row"""
+        cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s FOR UPDATE", (account_id,))
+        HotAccount.fold(cursor, account_id)
+        cursor.execute("DELETE FROM account_balance_slots WHERE account_id = %s", (account_id,))
+        cursor.execute("UPDATE accounts SET hot_slots = 0 WHERE account_id = %s", (account_id,))
+        _hot_cache.clear()
+
+    @staticmethod
+    def credit(cursor, account_id, amount, slots):
+        """Add a credit to a random slot (caller holds a shared lock on the account)"""
+        slot = random.randrange(slots)
+        cursor.execute("""
+            UPDATE account_balance_slots SET balance = balance + %s
+            WHERE account_id = %s AND slot = %s
+        """, (amount, account_id, slot))
+        if cursor.rowcount == 0:
+            cursor.execute("""
+                INSERT INTO account_balance_slots (account_id, slot, balance) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE balance = balance + VALUES(balance)
+            """, (account_id, slot, amount))
+
+    @staticmethod
+    def pending(cursor, account_ids):
+        """Unfolded slot totals keyed by account_id"""
+        ids = list(account_ids)
+        if not ids:
+            return {}
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT account_id, SUM(balance) AS pending
+            FROM account_balance_slots
+            WHERE account_id IN ({placeholders})
+            GROUP BY account_id
+        """, ids)
+        return {row['account_id']: row['pending'] for row in cursor.fetchall()}
+
+    @staticmethod
+    def fold(cursor, account_id):
+        """Move the slot total into accounts.balance and zero the slots.
+
+        The caller must hold an exclusive lock on the accounts row, which
+        keeps new credits out until the transaction ends. Returns the amount
+        folded.
+        """
+        cursor.execute("""
+            SELECT COALESCE(SUM(balance), 0) AS pending
+            FROM account_balance_slots WHERE account_id = %s
+            FOR UPDATE
+        """, (account_id,))
+        pending = cursor.fetchone()['pending'] or Decimal('0.00')
+        if pending:
+            cursor.execute("""
+                UPDATE accounts
+                SET balance = balance + %s, available_balance = available_balance + %s, last_transaction_date = NOW()
+                WHERE account_id = %s
+            """, (pending, pending, account_id))
+            cursor.execute("UPDATE account_balance_slots SET balance = 0 WHERE account_id = %s", (account_id,))
+            UserSummary.record_account_balance(cursor, account_id, pending)
+        return pending
+
+    @staticmethod
+    def include_pending(cursor, rows):
+        """Add unfolded credits to balance/available_balance of hot account rows"""
+        if not rows:
+            return rows
+        single = isinstance(rows, dict)
+        items = [rows] if single else list(rows)
+        hot = [row for row in items if row.get('hot_slots')]
+        if hot:
+            pending = HotAccount.pending(cursor, [row['account_id'] for row in hot])
+            for row in hot:
+                extra = pending.get(row['account_id']) or 0
+                row['balance'] += extra
+                if 'available_balance' in row:
+                    row['available_balance'] += extra
+        return rows
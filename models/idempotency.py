@@ -0,0 +1,158 @@
+# models/idempotency.py
+import hashlib
+import json
+from decimal import Decimal
+from config import Config
+from models.errors import IdempotencyConflict, IdempotencyInProgress
+from utils.cache import LRUCache
+
+# In-process front for completed keys; replays from the same worker skip MySQL
+idempotency_cache = LRUCache(
+    maxsize=Config.IDEMPOTENCY_CACHE_SIZE,
+    ttl=Config.IDEMPOTENCY_TTL_HOURS * 3600
+)
+
+
+class IdempotencyKey:
+    """Idempotency key model - deduplicates retried money movements.
+
+    A key is scoped to (user_id, idempotency_key) and remembers a hash of the
+    request it was first used with plus the posting result. Rows expire after
+    IDEMPOTENCY_TTL_HOURS and are removed by jobs/purge_idempotency.py.
+    """
+
+    @staticmethod
+    def build(user_id, key, endpoint, params):
+        """Build the idempotency descriptor passed to PostingEngine.post"""
+        canonical = json.dumps({'endpoint': endpoint, 'params': params}, sort_keys=True, default=str)
+        return {
+            'user_id': user_id,
+            'key': key[:64],
+            'endpoint': endpoint,
+            'request_hash': hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        }
+
+    @staticmethod
+    def cached(idem):
+        """Return a cached result for this key, or None"""
+        entry = idempotency_cache.get((idem['user_id'], idem['key']))
+        if entry is None:
+            return None
+        request_hash, result = entry
+        if request_hash != idem['request_hash']:
+            raise IdempotencyConflict(idem['key'])
+        return dict(result, replayed=True)
+
+    @staticmethod
+    def lookup(cursor, idem):
+        """Return the stored result of a completed key, or None (no locks taken).
+
+        Lets a route answer a retry before checking anything that depends on
+        current state (balances, account status). Keys that are new, expired
+        or still processing return None and go through reserve() as usual.
+        """
+        cursor.execute("""
+            SELECT request_hash, status, response, expires_at < NOW() AS expired
+            FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s
+        """, (idem['user_id'], idem['key']))
+        row = cursor.fetchone()
+        if not row or row['expired'] or row['status'] != 'completed':
+            return None
+        if row['request_hash'] != idem['request_hash']:
+            raise IdempotencyConflict(idem['key'])
+        result = IdempotencyKey._decode(row['response'])
+        idempotency_cache.set((idem['user_id'], idem['key']), (idem['request_hash'], result))
+        return dict(result, replayed=True)
+
+    @staticmethod
+    def reserve(cursor, idem):
+        """Claim the key inside the caller's transaction.
+
+        Returns None when the key is new (the caller should post), or the
+        stored result when the key was already completed. A concurrent
+        request with the same key blocks on the insert until the first one
+        commits or rolls back.
+        """
+        cursor.execute("""
+            INSERT IGNORE INTO idempotency_keys
+                (user_id, idempotency_key, endpoint, request_hash, status, expires_at)
+            VALUES (%s, %s, %s, %s, 'processing', NOW() + INTERVAL %s HOUR)
+        """, (idem['user_id'], idem['key'], idem['endpoint'], idem['request_hash'],
+              Config.IDEMPOTENCY_TTL_HOURS))
+        if cursor.rowcount == 1:
+            return None
+
+        cursor.execute("""
+            SELECT request_hash, status, response, expires_at < NOW() AS expired
+            FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s
+            FOR UPDATE
+        """, (idem['user_id'], idem['key']))
+        row = cursor.fetchone()
+
+        if row['expired']:
+            # Expired but not yet purged: take the key over as new
+            cursor.execute("""
+                UPDATE idempotency_keys
+                SET endpoint = %s, request_hash = %s, status = 'processing', response = NULL,
+                    transaction_id = NULL, created_at = NOW(), expires_at = NOW() + INTERVAL %s HOUR
+                WHERE user_id = %s AND idempotency_key = %s
+            """, (idem['endpoint'], idem['request_hash'], Config.IDEMPOTENCY_TTL_HOURS,
+                  idem['user_id'], idem['key']))
+            return None
+        if row['request_hash'] != idem['request_hash']:
+            raise IdempotencyConflict(idem['key'])
+        if row['status'] != 'completed':
+            raise IdempotencyInProgress(idem['key'])
+
+        result = IdempotencyKey._decode(row['response'])
+        idempotency_cache.set((idem['user_id'], idem['key']), (idem['request_hash'], result))
+        return dict(result, replayed=True)
+
+    @staticmethod
+    def complete(cursor, idem, result):
+        """Store the posting result against the key"""
+        cursor.execute("""
+            UPDATE idempotency_keys
+            SET status = 'completed', transaction_id = %s, response = %s
+            WHERE user_id = %s AND idempotency_key = %s
+        """, (result['transaction_id'], IdempotencyKey._encode(result), idem['user_id'], idem['key']))
+
+    @staticmethod
+    def remember(idem, result):
+        """Put a committed result in the in-process cache"""
+        idempotency_cache.set((idem['user_id'], idem['key']), (idem['request_hash'], result))
+
+    @staticmethod
+    def release(cursor, idem):
+        """Drop an unfinished reservation so the client may retry"""
+        cursor.execute("""
+            DELETE FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s AND status = 'processing'
+        """, (idem['user_id'], idem['key']))
+
+    @staticmethod
+    def purge_expired(cursor, batch_size=1000):
+        """Delete up to batch_size expired keys; returns the number removed"""
+        cursor.execute("DELETE FROM idempotency_keys WHERE expires_at < NOW() LIMIT %s", (batch_size,))
+        return cursor.rowcount
+
+    @staticmethod
+    def _encode(result):
+        return json.dumps({
+            'transaction_id': result['transaction_id'],
+            'transaction_uid': result['transaction_uid'],
+            'balances': {str(k): str(v) for k, v in result['balances'].items()},
+            'status': result.get('status', 'completed')
+        })
+
+    @staticmethod
+    def _decode(response):
+        data = json.loads(response)
+        return {
+            'transaction_id': data['transaction_id'],
+            'transaction_uid': data['transaction_uid'],
+            'balances': {int(k): Decimal(v) for k, v in data['balances'].items()},
+            'status': data.get('status', 'completed')
+        }
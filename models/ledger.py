@@ -0,0 +1,199 @@
+# models/ledger.py
+from decimal import Decimal
+
+# Ledger account that stands in for the outside world: the debit side of a
+# deposit and the credit side of a bill payment. Its seq is the global entry
+# id, so it never needs a lock.
+EXTERNAL_ACCOUNT_ID = 0
+
+
+class Ledger:
+    """Append-only double-entry ledger.
+
+    Every completed posting writes one debit and one credit row to
+    ledger_entries, keyed by (account_id, seq). seq is an AUTO_INCREMENT
+    value allocated while the posting holds the account lock, so it grows
+    with posting order within an account. ledger_snapshots stores an
+    account's balance at a seq so any historical balance is a snapshot plus
+    a short tail scan (jobs/ledger_snapshots.py writes them periodically).
+    """
+
+    @staticmethod
+    def record(cursor, transaction_id, from_account_id, to_account_id, amount):
+        """Write the debit and credit entries for one posting"""
+        Ledger.record_many(cursor, [(transaction_id, from_account_id, to_account_id, amount)])
+
+    @staticmethod
+    def record_many(cursor, postings, chunk_size=1000):
+        """Write entries for many (transaction_id, from_id, to_id, amount) postings"""
+        rows = []
+        for transaction_id, from_account_id, to_account_id, amount in postings:
+            rows.append((from_account_id or EXTERNAL_ACCOUNT_ID, transaction_id, 'debit', amount))
+            rows.append((to_account_id or EXTERNAL_ACCOUNT_ID, transaction_id, 'credit', amount))
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            cursor.execute(f"""
+                INSERT INTO ledger_entries (account_id, transaction_id, direction, amount)
+                VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))}
+            """, [v for row in chunk for v in row])
+
+    @staticmethod
+    def open_account(cursor, account_id, balance):
+        """Anchor a new account's ledger with its opening balance"""
+        cursor.execute("""
+            INSERT INTO ledger_snapshots (account_id, seq, balance) VALUES (%s, 0, %s)
+        """, (account_id, balance))
+
+    @staticmethod
+    def get_entries(cursor, account_id, after_seq=0, limit=100):
+        """Entries for an account after a seq, oldest first"""
+        cursor.execute("""
+            SELECT * FROM ledger_entries
+            WHERE account_id = %s AND seq > %s
+            ORDER BY seq
+            LIMIT %s
+        """, (account_id, after_seq, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def latest_snapshot(cursor, account_id, as_of=None):
+        """Most recent snapshot (optionally taken at or before as_of)"""
+        if as_of:
+            cursor.execute("""
+                SELECT * FROM ledger_snapshots
+                WHERE account_id = %s AND taken_at <= %s
+                ORDER BY seq DESC LIMIT 1
+            """, (account_id, as_of))
+        else:
+            cursor.execute("""
+                SELECT * FROM ledger_snapshots WHERE account_id = %s
+                ORDER BY seq DESC LIMIT 1
+            """, (account_id,))
+        return cursor.fetchone()
+
+    @staticmethod
+    def balance_at(cursor, account_id, as_of=None):
+        """Ledger balance of an account now or at a point in time.
+
+        Starts from the nearest snapshot at or before as_of and adds the
+        entries after it, so the scan length is bounded by the snapshot
+        interval rather than the account's history.
+        """
+        snapshot = Ledger.latest_snapshot(cursor, account_id, as_of)
+        start_seq = snapshot['seq'] if snapshot else 0
+        balance = snapshot['balance'] if snapshot else Decimal('0.00')
+
+        query = """
+            SELECT COALESCE(SUM(CASE direction WHEN 'credit' THEN amount ELSE -amount END), 0) AS delta
+            FROM ledger_entries
+            WHERE account_id = %s AND seq > %s
+        """
+        params = [account_id, start_seq]
+        if as_of:
+            query += " AND created_at <= %s"
+            params.append(as_of)
+        cursor.execute(query, params)
+        return balance + cursor.fetchone()['delta']
+
+    @staticmethod
+    def take_snapshot(cursor, account_id):
+        """Record the account's current balance at its latest seq.
+
+        The caller must hold an exclusive lock on the accounts row (and have
+        folded any hot-account slots) so no posting is in flight. Returns
+        the snapshot row values.
+        """
+        cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
+        balance = cursor.fetchone()['balance']
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM ledger_entries WHERE account_id = %s", (account_id,))
+        seq = cursor.fetchone()['seq']
+        cursor.execute("""
+            INSERT INTO ledger_snapshots (account_id, seq, balance) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE balance = VALUES(balance)
+        """, (account_id, seq, balance))
+        return {'account_id': account_id, 'seq': seq, 'balance': balance}
+
+    @staticmethod
+    def first_seq_at(cursor, ts):
+        """Lowest seq written at or after ts (binary search on the seq index).
+
+        seq and created_at are both assigned at insert, so created_at grows
+        with seq closely enough to draw a cut-off line between two days.
+        Returns MAX(seq) + 1 if nothing was written since ts.
+        """
+        cursor.execute("SELECT COALESCE(MIN(seq), 1) AS lo, COALESCE(MAX(seq), 0) + 1 AS hi FROM ledger_entries")
+        row = cursor.fetchone()
+        lo, hi = row['lo'], row['hi']
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cursor.execute("SELECT seq, created_at FROM ledger_entries WHERE seq >= %s ORDER BY seq LIMIT 1", (mid,))
+            found = cursor.fetchone()
+            if found is None or found['created_at'] >= ts:
+                hi = mid
+            else:
+                lo = found['seq'] + 1
+        return lo
+
+    @staticmethod
+    def snapshot_range(cursor, from_id, to_id, cutoff_seq, cutoff_at):
+        """Closing-balance snapshots at cutoff_seq for accounts from_id <= account_id < to_id.
+
+        One INSERT ... SELECT: each account's balance now (hot slots
+        included) minus its entries from cutoff_seq on, stored at its last
+        entry before the cut-off. Takes no locks when run under READ
+        COMMITTED: the statement reads one consistent view, and a posting
+        still in flight holds a seq above every visible one of its account,
+        so it falls in a later snapshot's tail. Accounts whose last seq
+        already has a snapshot are skipped (INSERT IGNORE), so re-runs are
+        harmless. Returns the number of snapshots written.
+        """
+        cursor.execute("""
+            INSERT IGNORE INTO ledger_snapshots (account_id, seq, balance, taken_at)
+            SELECT a.account_id,
+                   COALESCE((SELECT MAX(e.seq) FROM ledger_entries e
+                             WHERE e.account_id = a.account_id AND e.seq < %s), 0),
+                   a.balance
+                   + COALESCE((SELECT SUM(s.balance) FROM account_balance_slots s
+                               WHERE s.account_id = a.account_id), 0)
+                   - COALESCE((SELECT SUM(CASE e.direction WHEN 'credit' THEN e.amount ELSE -e.amount END)
+                               FROM ledger_entries e
+                               WHERE e.account_id = a.account_id AND e.seq >= %s), 0),
+                   %s
+            FROM accounts a
+            WHERE a.account_id >= %s AND a.account_id < %s
+        """, (cutoff_seq, cutoff_seq, cutoff_at, from_id, to_id))
+        return cursor.rowcount
+
+    @staticmethod
+    def accounts_needing_snapshot(cursor, min_entries, limit=1000):
+        """Accounts with at least min_entries entries since their last snapshot"""
+        cursor.execute("""
+            SELECT e.account_id, COUNT(*) AS pending_entries
+            FROM ledger_entries e
+            LEFT JOIN (
+                SELECT account_id, MAX(seq) AS seq FROM ledger_snapshots GROUP BY account_id
+            ) s ON s.account_id = e.account_id
+            WHERE e.account_id <> %s AND e.seq > COALESCE(s.seq, 0)
+            GROUP BY e.account_id
+            HAVING COUNT(*) >= %s
+            LIMIT %s
+        """, (EXTERNAL_ACCOUNT_ID, min_entries, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def verify(cursor, account_id):
+        """Compare the ledger balance with accounts.balance (+ hot slots)"""
+        ledger_balance = Ledger.balance_at(cursor, account_id)
+        cursor.execute("""
+            SELECT a.balance + COALESCE((SELECT SUM(s.balance) FROM account_balance_slots s
+                                         WHERE s.account_id = a.account_id), 0) AS balance
+            FROM accounts a WHERE a.account_id = %s
+        """, (account_id,))
+        row = cursor.fetchone()
+        account_balance = row['balance'] if row else None
+        return {
+            'account_id': account_id,
+            'ledger_balance': ledger_balance,
+            'account_balance': account_balance,
+            'matches': account_balance == ledger_balance
+        }
@@ -0,0 +1,308 @@
+# models/posting.py
+import random
+import time
+from config import Config
+from decimal import InvalidOperation
+from models.account import Account, to_money
+from models.transaction import Transaction
+from models.idempotency import IdempotencyKey
+from models.hot_account import HotAccount
+from models.ledger import Ledger
+from models.biller import Biller
+from models.account_cache import account_cache
+from models.account_rollup import AccountRollup
+from models.errors import AccountUnavailable
+from utils.db import is_retryable
+
+
+class PostingEngine:
+    """Runs money movements as short locked transactions with deadlock retry.
+
+    Each attempt opens its own cursor on the given connection, does all its
+    work inside one database transaction and commits. Deadlocks and lock wait
+    timeouts roll back and retry with jittered exponential backoff; any other
+    error rolls back and propagates to the caller.
+
+    mode selects how post() talks to MySQL: 'statements' issues the lock,
+    insert and update statements from Python; 'procedure' does the whole
+    posting in one CALL to sp_post_transaction (database/procedures.sql).
+
+    settlement selects when balances move: 'sync' posts them in the request;
+    'async' only records a pending transaction and leaves the balances to
+    the settlement workers (models/settlement.py, jobs/settle_pending.py).
+    """
+
+    def __init__(self, mode='statements', settlement='sync', max_attempts=5, base_delay=0.005, max_delay=0.2):
+        self.mode = mode
+        self.settlement = settlement
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def run(self, connection, work, commit=True):
+        """Call work(cursor) in a transaction, retrying on deadlock.
+
+        Pass commit=False when work commits server-side (stored procedures)
+        to save the extra COMMIT round trip.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            cursor = connection.cursor()
+            try:
+                result = work(cursor)
+                if commit:
+                    connection.commit()
+                account_cache.flush(connection)
+                return result
+            except Exception as e:
+                connection.rollback()
+                account_cache.discard(connection)
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                self.retries += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+                time.sleep(random.uniform(0, delay))
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def apply(cursor, transaction_data):
+        """Statement-by-statement posting inside the caller's transaction"""
+        balances = Account.move_funds(
+            cursor,
+            transaction_data.get('from_account_id'),
+            transaction_data.get('to_account_id'),
+            transaction_data['amount']
+        )
+        transaction_id, transaction_uid = Transaction.create(cursor, transaction_data)
+        if transaction_data.get('biller_id'):
+            Biller.record_payment(cursor, transaction_id, transaction_data['biller_id'],
+                                  transaction_data.get('biller_reference'))
+        Ledger.record(
+            cursor,
+            transaction_id,
+            transaction_data.get('from_account_id'),
+            transaction_data.get('to_account_id'),
+            transaction_data['amount']
+        )
+        return {
+            'transaction_id': transaction_id,
+            'transaction_uid': transaction_uid,
+            'balances': balances,
+            'status': 'completed'
+        }
+
+    @staticmethod
+    def accept(cursor, transaction_data):
+        """Record a pending transaction for the settlement workers"""
+        transaction_data['status'] = 'pending'
+        transaction_id, transaction_uid = Transaction.create(cursor, transaction_data)
+        if transaction_data.get('biller_id'):
+            Biller.record_payment(cursor, transaction_id, transaction_data['biller_id'],
+                                  transaction_data.get('biller_reference'))
+        return {
+            'transaction_id': transaction_id,
+            'transaction_uid': transaction_uid,
+            'balances': {},
+            'status': 'pending'
+        }
+
+    def post(self, connection, transaction_data, idempotency=None):
+        """Post a completed deposit, payment or transfer.
+
+        transaction_data takes the same keys as Transaction.create. Returns
+        {'transaction_id', 'transaction_uid', 'balances', 'status'} where
+        balances maps each touched account_id to its balance after the
+        posting. With settlement='async' the transaction is only accepted:
+        status is 'pending' and balances is empty.
+
+        idempotency (from IdempotencyKey.build) makes the call safe to retry:
+        a repeat with the same key returns the first result with
+        'replayed': True and does not touch accounts again.
+        """
+        data = dict(transaction_data)
+        data['amount'] = to_money(data['amount'])
+        data['status'] = 'completed'
+        apply = self.accept if self.settlement == 'async' else self.apply
+        use_procedure = self.mode == 'procedure' and self.settlement != 'async'
+        if idempotency:
+            return self._post_idempotent(connection, data, idempotency, apply, use_procedure)
+        if use_procedure:
+            return self.run(connection, lambda cursor: Transaction.post(cursor, dict(data)), commit=False)
+        return self.run(connection, lambda cursor: apply(cursor, dict(data)))
+
+    def replay(self, connection, idempotency):
+        """The first result for an already completed idempotency key, or None.
+
+        Raises IdempotencyConflict if the key was used with other details.
+        """
+        cached = IdempotencyKey.cached(idempotency)
+        if cached:
+            return cached
+        return self.run(connection, lambda cursor: IdempotencyKey.lookup(cursor, idempotency))
+
+    def _post_idempotent(self, connection, data, idem, apply, use_procedure):
+        cached = IdempotencyKey.cached(idem)
+        if cached:
+            return cached
+
+        if use_procedure:
+            # The procedure commits on its own, so the key is reserved in a
+            # separate short transaction and released again if posting fails.
+            replay = self.run(connection, lambda cursor: IdempotencyKey.reserve(cursor, idem))
+            if replay:
+                return replay
+            try:
+                result = self.run(connection, lambda cursor: Transaction.post(cursor, dict(data)), commit=False)
+            except Exception:
+                self.run(connection, lambda cursor: IdempotencyKey.release(cursor, idem))
+                raise
+            self.run(connection, lambda cursor: IdempotencyKey.complete(cursor, idem, result))
+        else:
+            def work(cursor):
+                replay = IdempotencyKey.reserve(cursor, idem)
+                if replay:
+                    return replay
+                posted = apply(cursor, dict(data))
+                IdempotencyKey.complete(cursor, idem, posted)
+                return posted
+
+            result = self.run(connection, work)
+            if result.get('replayed'):
+                return result
+
+        IdempotencyKey.remember(idem, result)
+        return result
+
+    def transfer(self, connection, from_account_id, to_account_id, amount, transaction_data=None, idempotency=None):
+        """Post a transfer between two accounts (see post)"""
+        data = dict(transaction_data or {})
+        data.update({
+            'from_account_id': from_account_id,
+            'to_account_id': to_account_id,
+            'transaction_type': data.get('transaction_type', 'transfer'),
+            'amount': amount
+        })
+        return self.post(connection, data, idempotency)
+
+    def post_batch(self, connection, from_account_id, lines, transaction_data=None):
+        """Post many credits from one source account in a single transaction.
+
+        lines is a list of {'to_account': account_number, 'amount', 'description'}.
+        Destinations are resolved with one set-based lookup, every involved
+        row is locked in account_id order, transactions are written with
+        chunked multi-row INSERTs and balances move by net delta per account.
+        Lines are accepted in order while the source balance covers them.
+
+        Returns a list of per-line results: {'line', 'to_account', 'amount',
+        'status': 'completed' | 'failed', 'transaction_uid' | 'error'}.
+        """
+        from_account_id = int(from_account_id)
+        base = dict(transaction_data or {})
+
+        # Validate line shape before touching the database
+        results = []
+        for index, line in enumerate(lines):
+            result = {'line': index, 'to_account': str(line.get('to_account', '')).strip().upper()}
+            try:
+                result['amount'] = to_money(line.get('amount'))
+                if result['amount'] <= 0:
+                    raise InvalidOperation
+            except (InvalidOperation, TypeError, ValueError):
+                result.update(status='failed', error='INVALID_AMOUNT', amount=line.get('amount'))
+            if not result['to_account'] and 'status' not in result:
+                result.update(status='failed', error='MISSING_DESTINATION')
+            result['description'] = str(line.get('description') or base.get('description') or 'Batch transfer')[:255]
+            results.append(result)
+
+        def work(cursor):
+            pending = [r for r in results if 'status' not in r]
+            destinations = Account.find_by_numbers(cursor, [r['to_account'] for r in pending])
+            hot = HotAccount.hot_accounts(cursor)
+            dest_ids = {d['account_id'] for d in destinations.values()} - {from_account_id}
+            locked = Account.lock_for_update(
+                cursor,
+                {from_account_id} | {a for a in dest_ids if a not in hot},
+                shared_ids={a for a in dest_ids if a in hot}
+            )
+
+            source = locked.get(from_account_id)
+            if not source or source['status'] != 'active':
+                raise AccountUnavailable(from_account_id)
+            if source['hot_slots']:
+                source['balance'] += HotAccount.fold(cursor, from_account_id)
+
+            available = source['balance']
+            deltas = {}
+            rows = []
+            outcome = {}
+            for r in pending:
+                dest = destinations.get(r['to_account'])
+                dest = locked.get(dest['account_id']) if dest else None
+                if not dest:
+                    outcome[r['line']] = {'status': 'failed', 'error': 'ACCOUNT_NOT_FOUND'}
+                elif dest['status'] != 'active':
+                    outcome[r['line']] = {'status': 'failed', 'error': 'ACCOUNT_INACTIVE'}
+                elif dest['account_id'] == from_account_id:
+                    outcome[r['line']] = {'status': 'failed', 'error': 'SAME_ACCOUNT'}
+                elif r['amount'] > available:
+                    outcome[r['line']] = {'status': 'failed', 'error': 'INSUFFICIENT_FUNDS'}
+                else:
+                    available -= r['amount']
+                    deltas[dest['account_id']] = deltas.get(dest['account_id'], 0) + r['amount']
+                    data = dict(base)
+                    data.update({
+                        'from_account_id': from_account_id,
+                        'to_account_id': dest['account_id'],
+                        'transaction_type': 'transfer',
+                        'amount': r['amount'],
+                        'description': r['description'],
+                        'status': 'completed'
+                    })
+                    rows.append((r['line'], data))
+
+            if rows:
+                deltas[from_account_id] = available - source['balance']
+                uids = Transaction.create_many(cursor, [data for _, data in rows])
+                Account.apply_deltas(cursor, deltas, locked)
+                AccountRollup.record(cursor, PostingEngine._batch_movements(from_account_id, rows, deltas, locked, hot))
+                Ledger.record_many(cursor, [
+                    (transaction_id, from_account_id, data['to_account_id'], data['amount'])
+                    for transaction_id, (_, data) in zip(Transaction.ids_for_uids(cursor, uids), rows)
+                ])
+                for (line, _), uid in zip(rows, uids):
+                    outcome[line] = {'status': 'completed', 'transaction_uid': uid}
+            return outcome
+
+        outcome = self.run(connection, work)
+        for r in results:
+            r.pop('description', None)
+            if 'status' not in r:
+                r.update(outcome[r['line']])
+        return results
+
+
+    @staticmethod
+    def _batch_movements(from_account_id, rows, deltas, locked, hot):
+        """Rollup movements of a posted batch (hot destinations are left to the fold job)"""
+        movements = {from_account_id: {
+            'debits': -deltas[from_account_id],
+            'count': len(rows),
+            'closing_balance': locked[from_account_id]['balance'] + deltas[from_account_id]
+        }}
+        for _, data in rows:
+            account_id = data['to_account_id']
+            if account_id in hot:
+                continue
+            movement = movements.setdefault(account_id, {
+                'credits': deltas[account_id],
+                'count': 0,
+                'closing_balance': locked[account_id]['balance'] + deltas[account_id]
+            })
+            movement['count'] += 1
+        return movements
+
+
+posting_engine = PostingEngine(mode=Config.POSTING_MODE, settlement=Config.SETTLEMENT_MODE)
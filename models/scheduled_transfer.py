@@ -0,0 +1,184 @@
+# models/scheduled_transfer.py
+import calendar
+from datetime import datetime, date, time, timedelta
+from config import Config
+
+FREQUENCIES = ('once', 'daily', 'weekly', 'monthly')
+
+
+class ScheduledTransfer:
+    """Standing orders and one-off future transfers.
+
+    The scheduler (jobs/run_scheduled_transfers.py) leases due rows in
+    bounded batches through the (status, next_run_at) index, posts each one
+    through the normal posting engine and advances all of them with one
+    UPDATE. Run times are spread over SCHEDULER_SPREAD_SECONDS after the
+    scheduled date by schedule_id, so schedules for the 1st of the month do
+    not all fall due in the same second.
+    """
+
+    @staticmethod
+    def run_at(schedule_id, run_date):
+        """Time a schedule fires on a given date"""
+        offset = schedule_id % Config.SCHEDULER_SPREAD_SECONDS if Config.SCHEDULER_SPREAD_SECONDS else 0
+        return datetime.combine(run_date, time()) + timedelta(seconds=offset)
+
+    @staticmethod
+    def next_date(frequency, current, anchor_day):
+        """Date of the next run after `current`, or None for one-off transfers"""
+        if frequency == 'daily':
+            return current + timedelta(days=1)
+        if frequency == 'weekly':
+            return current + timedelta(weeks=1)
+        if frequency == 'monthly':
+            year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+            return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+        return None
+
+    @staticmethod
+    def create(cursor, schedule_data):
+        """Create a schedule; returns schedule_id"""
+        start_date = schedule_data['start_date']
+        cursor.execute("""
+            INSERT INTO scheduled_transfers (
+                user_id, from_account_id, to_account_id, beneficiary_id, amount, description,
+                frequency, anchor_day, start_date, end_date, next_run_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            schedule_data['user_id'],
+            schedule_data['from_account_id'],
+            schedule_data['to_account_id'],
+            schedule_data.get('beneficiary_id'),
+            schedule_data['amount'],
+            schedule_data.get('description', ''),
+            schedule_data['frequency'],
+            start_date.day,
+            start_date,
+            schedule_data.get('end_date'),
+            datetime.combine(start_date, time())
+        ))
+        schedule_id = cursor.lastrowid
+        cursor.execute("UPDATE scheduled_transfers SET next_run_at = %s WHERE schedule_id = %s",
+                       (ScheduledTransfer.run_at(schedule_id, start_date), schedule_id))
+        return schedule_id
+
+    @staticmethod
+    def get_user_schedules(cursor, user_id):
+        """Active and paused schedules of a user"""
+        cursor.execute("""
+            SELECT s.*, a_from.account_number AS from_account_number,
+                   a_to.account_number AS to_account_number,
+                   b.nickname, b.beneficiary_name
+            FROM scheduled_transfers s
+            JOIN accounts a_from ON s.from_account_id = a_from.account_id
+            JOIN accounts a_to ON s.to_account_id = a_to.account_id
+            LEFT JOIN beneficiaries b ON s.beneficiary_id = b.beneficiary_id
+            WHERE s.user_id = %s AND s.status IN ('active', 'paused')
+            ORDER BY s.next_run_at
+        """, (user_id,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def cancel(cursor, schedule_id, user_id):
+        """Cancel one of the user's schedules; returns True if it was cancelled"""
+        cursor.execute("""
+            UPDATE scheduled_transfers SET status = 'cancelled'
+            WHERE schedule_id = %s AND user_id = %s AND status IN ('active', 'paused')
+        """, (schedule_id, user_id))
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def cancel_for_beneficiary(cursor, beneficiary_id, user_id):
+        """Cancel the user's schedules paying a beneficiary; returns how many"""
+        cursor.execute("""
+            UPDATE scheduled_transfers SET status = 'cancelled'
+            WHERE beneficiary_id = %s AND user_id = %s AND status IN ('active', 'paused')
+        """, (beneficiary_id, user_id))
+        return cursor.rowcount
+
+    @staticmethod
+    def claim_due(cursor, worker, batch_size=500, lease_seconds=300):
+        """Lease up to batch_size due schedules to this worker.
+
+        Rows are picked with FOR UPDATE SKIP LOCKED so concurrent schedulers
+        take disjoint batches, then leased (claimed_until) so they stay
+        reserved after this transaction commits and while they are posted.
+        beneficiary_active is FALSE for a schedule whose beneficiary was
+        removed (NULL when it has none); such runs must not be posted.
+        """
+        cursor.execute("""
+            SELECT s.schedule_id, s.user_id, s.from_account_id, s.to_account_id, s.amount, s.description,
+                   s.frequency, s.anchor_day, s.end_date, s.next_run_at, s.beneficiary_id,
+                   b.is_active AS beneficiary_active
+            FROM scheduled_transfers s
+            LEFT JOIN beneficiaries b ON b.beneficiary_id = s.beneficiary_id
+            WHERE s.status = 'active' AND s.next_run_at <= NOW()
+              AND (s.claimed_until IS NULL OR s.claimed_until < NOW())
+            ORDER BY s.next_run_at
+            LIMIT %s
+            FOR UPDATE OF s SKIP LOCKED
+        """, (batch_size,))
+        rows = cursor.fetchall()
+        if rows:
+            placeholders = ','.join(['%s'] * len(rows))
+            cursor.execute(f"""
+                UPDATE scheduled_transfers
+                SET claimed_by = %s, claimed_until = NOW() + INTERVAL %s SECOND
+                WHERE schedule_id IN ({placeholders})
+            """, [worker, lease_seconds] + [r['schedule_id'] for r in rows])
+        return rows
+
+    @staticmethod
+    def advance_many(cursor, outcomes, chunk_size=1000):
+        """Record run outcomes and move next_run_at for many schedules at once.
+
+        outcomes is a list of dicts: {'schedule_id', 'last_status'
+        ('completed' | 'failed' | 'retry'), 'next_run_at' (None when the
+        schedule is finished), 'transaction_id', 'error', 'retry_at'}.
+        'retry' keeps next_run_at and holds the lease until retry_at.
+        """
+        columns = {
+            'next_run_at': lambda o: o['next_run_at'] if o['last_status'] != 'retry' else None,
+            'status': lambda o: 'active' if o['last_status'] == 'retry' or o['next_run_at'] else 'completed',
+            'last_status': lambda o: o['last_status'],
+            'last_transaction_id': lambda o: o.get('transaction_id'),
+            'last_error': lambda o: (o.get('error') or '')[:255] or None,
+            'failure_count': lambda o: 1 if o['last_status'] == 'failed' else 0,
+            'run_count': lambda o: 0 if o['last_status'] == 'retry' else 1,
+            'claimed_until': lambda o: o.get('retry_at') if o['last_status'] == 'retry' else None,
+        }
+        assignments = {
+            'next_run_at': "next_run_at = COALESCE({case}, next_run_at)",
+            # A schedule cancelled while it was running stays cancelled
+            'status': "status = IF(status = 'active', {case}, status)",
+            'last_status': "last_status = {case}",
+            'last_transaction_id': "last_transaction_id = COALESCE({case}, last_transaction_id)",
+            'last_error': "last_error = {case}",
+            'failure_count': "failure_count = failure_count + {case}",
+            'run_count': "run_count = run_count + {case}",
+            'claimed_until': "claimed_until = {case}",
+        }
+        for i in range(0, len(outcomes), chunk_size):
+            chunk = outcomes[i:i + chunk_size]
+            ids = [o['schedule_id'] for o in chunk]
+            case = "CASE schedule_id " + ' '.join(["WHEN %s THEN %s"] * len(chunk)) + " END"
+            params = []
+            for column, value in columns.items():
+                for o in chunk:
+                    params += [o['schedule_id'], value(o)]
+            cursor.execute(f"""
+                UPDATE scheduled_transfers
+                SET {', '.join(assignments[c].format(case=case) for c in columns)},
+                    last_run_at = NOW(),
+                    claimed_by = NULL
+                WHERE schedule_id IN ({','.join(['%s'] * len(ids))})
+            """, params + ids)
+
+    @staticmethod
+    def next_run_at(schedule):
+        """next_run_at after the run that is due now, or None if finished"""
+        current = schedule['next_run_at'].date()
+        following = ScheduledTransfer.next_date(schedule['frequency'], current, schedule['anchor_day'])
+        if following is None or (schedule['end_date'] and following > schedule['end_date']):
+            return None
+        return ScheduledTransfer.run_at(schedule['schedule_id'], following)
@@ -0,0 +1,74 @@
+# models/settlement.py
+from models.account import Account
+from models.transaction import Transaction
+from models.hot_account import HotAccount
+from models.ledger import Ledger
+from models.errors import PostingError
+
+
+class Settlement:
+    """Settles transactions accepted as 'pending' (SETTLEMENT_MODE=async).
+
+    A worker claims a batch of pending rows with FOR UPDATE SKIP LOCKED, so
+    concurrent workers never wait on or double-settle each other's rows.
+    Every account the batch touches is locked once in account_id order, then
+    each row is applied inside its own savepoint: a row that fails (funds,
+    closed account) is rolled back alone and marked failed, the rest of the
+    batch still completes.
+    """
+
+    @staticmethod
+    def claim(cursor, batch_size=100):
+        """Lock up to batch_size pending transactions, oldest first"""
+        cursor.execute("""
+            SELECT transaction_id, transaction_uid, from_account_id, to_account_id, amount
+            FROM transactions
+            WHERE status = 'pending'
+            ORDER BY transaction_id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def settle_batch(cursor, batch_size=100):
+        """Claim and settle one batch; returns (completed, failed) counts"""
+        rows = Settlement.claim(cursor, batch_size)
+        if not rows:
+            return 0, 0
+
+        # Sources and plain destinations take exclusive locks; credits to hot
+        # accounts only need a shared one (see HotAccount)
+        hot = HotAccount.hot_accounts(cursor)
+        exclusive = {r['from_account_id'] for r in rows if r['from_account_id']}
+        exclusive |= {r['to_account_id'] for r in rows if r['to_account_id'] and r['to_account_id'] not in hot}
+        shared = {r['to_account_id'] for r in rows if r['to_account_id'] in hot} - exclusive
+        Account.lock_for_update(cursor, exclusive, shared_ids=shared)
+
+        completed = failed = 0
+        for row in rows:
+            cursor.execute("SAVEPOINT settle_row")
+            try:
+                Account.move_funds(cursor, row['from_account_id'], row['to_account_id'], row['amount'])
+                Ledger.record(cursor, row['transaction_id'], row['from_account_id'],
+                              row['to_account_id'], row['amount'])
+                Transaction.complete(cursor, row['transaction_uid'])
+                completed += 1
+            except PostingError as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT settle_row")
+                Transaction.fail(cursor, row['transaction_uid'], str(e))
+                # No balance moved: bump updated_at so the owners' page ETags change
+                touched = [i for i in (row['from_account_id'], row['to_account_id']) if i in exclusive]
+                if touched:
+                    cursor.execute(f"""
+                        UPDATE accounts SET updated_at = CURRENT_TIMESTAMP
+                        WHERE account_id IN ({','.join(['%s'] * len(touched))})
+                    """, touched)
+                failed += 1
+        return completed, failed
+
+    @staticmethod
+    def pending_count(cursor):
+        """Number of transactions waiting to be settled"""
+        cursor.execute("SELECT COUNT(*) as count FROM transactions WHERE status = 'pending'")
+        return cursor.fetchone()['count']
@@ -0,0 +1,142 @@
+# models/statement.py
+from datetime import datetime, timedelta
+import MySQLdb.cursors
+from models.account import Account
+from models.account_posting import AccountPosting
+from models.account_rollup import AccountRollup
+from models.hot_account import HotAccount
+
+CSV_COLUMNS = ('date', 'description', 'reference', 'type', 'debit', 'credit', 'balance')
+
+
+class Statement:
+    """Account statements produced as a stream.
+
+    The header figures (opening/closing balance, totals, count) come from
+    the daily rollup before any line is read. Lines are then read through
+    an unbuffered server-side cursor (SSDictCursor) in fetchmany chunks and
+    get their running balance in one forward pass from the opening
+    balance, so a statement of any length is held in memory one chunk at
+    a time. The same lines feed the HTML, CSV and NDJSON renderings.
+    """
+
+    @staticmethod
+    def get_account(cursor, account_id, user_id):
+        """The account with its holder's name and email, if it belongs to user_id"""
+        cursor.execute("""
+            SELECT a.*, u.first_name, u.last_name, u.email
+            FROM accounts a
+            JOIN users u ON a.user_id = u.user_id
+            WHERE a.account_id = %s AND a.user_id = %s
+        """, (account_id, user_id))
+        return HotAccount.include_pending(cursor, cursor.fetchone())
+
+    @staticmethod
+    def period(months, now=None):
+        """(start, end) covering `months` months back to the start of a day"""
+        end_date = now or datetime.now()
+        start_date = datetime.combine((end_date - timedelta(days=30 * months)).date(), datetime.min.time())
+        return start_date, end_date
+
+    @staticmethod
+    def month_period(month):
+        """(start, end) of a calendar month given as 'YYYY-MM'; ValueError if malformed"""
+        start_date = datetime.strptime(month, '%Y-%m')
+        next_month = (start_date + timedelta(days=32)).replace(day=1)
+        return start_date, next_month - timedelta(microseconds=1)
+
+    @staticmethod
+    def summary(cursor, account, start_date, end_date):
+        """Opening/closing balance, totals and line count from the daily rollup"""
+        account_id = account['account_id']
+        period = AccountRollup.totals(cursor, [account_id], start_date.date(), end_date.date())
+        opening_balance = AccountRollup.opening_balance(cursor, account_id, start_date.date())
+        if opening_balance is None:
+            opening_balance = Account.balance_as_of(cursor, account_id, start_date)
+        return {
+            'opening_balance': opening_balance,
+            'closing_balance': opening_balance + period['credits'] - period['debits'],
+            'total_credits': period['credits'],
+            'total_debits': period['debits'],
+            'transaction_count': period['count']
+        }
+
+    @staticmethod
+    def lines(connection, account_id, start_date, end_date, opening_balance, chunk_size=500):
+        """Completed transactions of the period, oldest first, with running_balance.
+
+        A generator over an SSDictCursor on `connection`; nothing else may
+        use the connection until it is exhausted. If the generator is closed
+        early the rest of the result is left unread rather than drained, so
+        the connection must then be discarded (see PooledMySQL.detached).
+        """
+        cursor = connection.cursor(MySQLdb.cursors.SSDictCursor)
+        finished = False
+        try:
+            cursor.execute(*AccountPosting.history_query(account_id, start_date, end_date, status='completed'))
+            balance = opening_balance
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    balance += row['amount'] if row['direction'] == 'credit' else -row['amount']
+                    row['running_balance'] = balance
+                    yield row
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+
+    @staticmethod
+    def describe(line):
+        """Statement description of a line (counterparty account included)"""
+        description = line['description'] or line['transaction_type'].title()
+        if line['direction'] == 'debit' and line['to_account_number']:
+            return f"{description} (to {line['to_account_number']})"
+        if line['direction'] == 'credit' and line['from_account_number']:
+            return f"{description} (from {line['from_account_number']})"
+        return description
+
+    @staticmethod
+    def csv_rows(summary, lines):
+        """Rows for CSV_COLUMNS: opening balance, one per line, closing balance"""
+        yield ('', 'Opening balance', '', '', '', '', summary['opening_balance'])
+        for line in lines:
+            debit = line['direction'] == 'debit'
+            yield (
+                line['initiated_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                Statement.describe(line),
+                line['transaction_uid'],
+                line['transaction_type'],
+                line['amount'] if debit else '',
+                '' if debit else line['amount'],
+                line['running_balance']
+            )
+        yield ('', 'Closing balance', '', '', '', '', summary['closing_balance'])
+
+    @staticmethod
+    def records(account, start_date, end_date, summary, lines):
+        """NDJSON records: a statement header, one record per line, then the summary"""
+        yield {
+            'record': 'statement',
+            'account_number': account['account_number'],
+            'account_type': account['account_type'],
+            'start_date': start_date,
+            'end_date': end_date,
+            'opening_balance': summary['opening_balance']
+        }
+        for line in lines:
+            yield {
+                'record': 'line',
+                'transaction_uid': line['transaction_uid'],
+                'initiated_at': line['initiated_at'],
+                'type': line['transaction_type'],
+                'direction': line['direction'],
+                'amount': line['amount'],
+                'description': line['description'],
+                'from_account': line['from_account_number'],
+                'to_account': line['to_account_number'],
+                'running_balance': line['running_balance']
+            }
+        yield dict(summary, record='summary')
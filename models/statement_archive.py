@@ -0,0 +1,98 @@
+# models/statement_archive.py
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from config import Config
+
+MONTH_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+class StatementArchive:
+    """Pre-generated monthly statements on local disk.
+
+    Layout under STATEMENTS_DIR:
+
+        <YYYY-MM>/<account_id>.csv.gz     one gzipped CSV statement per account
+        <YYYY-MM>/parts/<lo>-<hi>.json    entries of a finished account-id range
+        <YYYY-MM>/manifest.json           all entries, written when a run completes
+
+    Statement files are written to a temporary name and renamed into
+    place, so a file that exists is complete. A range's part file is only
+    written once all its statements are, which is what lets an interrupted
+    run skip finished ranges and, inside an unfinished one, finished files.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or Config.STATEMENTS_DIR
+
+    @staticmethod
+    def valid_month(month):
+        return bool(month and MONTH_PATTERN.match(month))
+
+    def month_dir(self, month):
+        return os.path.join(self.root, month)
+
+    def path(self, month, account_id):
+        return os.path.join(self.month_dir(month), f"{int(account_id)}.csv.gz")
+
+    def exists(self, month, account_id):
+        return self.valid_month(month) and os.path.isfile(self.path(month, account_id))
+
+    def available(self, account_ids, limit=12):
+        """{account_id: [months with a statement file, newest first]} over the last `limit` months"""
+        try:
+            months = sorted((m for m in os.listdir(self.root) if self.valid_month(m)), reverse=True)[:limit]
+        except FileNotFoundError:
+            return {}
+        return {account_id: [m for m in months if os.path.isfile(self.path(m, account_id))]
+                for account_id in account_ids}
+
+    def write(self, month, account_id, chunks):
+        """Write one statement from text chunks; returns its manifest entry"""
+        path = self.path(month, account_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as handle:
+                for chunk in chunks:
+                    handle.write(chunk.encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, path)
+        return {'file': os.path.basename(path), 'bytes': os.path.getsize(path)}
+
+    def _part_path(self, month, lo, hi):
+        return os.path.join(self.month_dir(month), 'parts', f"{lo}-{hi}.json")
+
+    def part_done(self, month, lo, hi):
+        return os.path.isfile(self._part_path(month, lo, hi))
+
+    def finish_part(self, month, lo, hi, entries):
+        """Record a finished account-id range [lo, hi)"""
+        path = self._part_path(month, lo, hi)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as handle:
+            json.dump({str(k): v for k, v in entries.items()}, handle)
+        os.replace(tmp, path)
+
+    def write_manifest(self, month, extra=None):
+        """Merge every part into manifest.json; returns the number of statements listed"""
+        parts_dir = os.path.join(self.month_dir(month), 'parts')
+        accounts = {}
+        for name in sorted(os.listdir(parts_dir)) if os.path.isdir(parts_dir) else []:
+            if name.endswith('.json'):
+                with open(os.path.join(parts_dir, name)) as handle:
+                    accounts.update(json.load(handle))
+        manifest = dict(extra or {}, month=month, generated_at=datetime.now().isoformat(timespec='seconds'),
+                        statements=len(accounts), accounts=accounts)
+        path = os.path.join(self.month_dir(month), 'manifest.json')
+        with open(f"{path}.tmp", 'w') as handle:
+            json.dump(manifest, handle)
+        os.replace(f"{path}.tmp", path)
+        return len(accounts)
+
+
+statement_archive = StatementArchive()
@@ -1,21 +1,32 @@
 # models/transaction.py
 import uuid
+import MySQLdb
 from datetime import datetime, timedelta
+from decimal import Decimal
+from models.errors import PostingError, AccountUnavailable, InsufficientFunds
+from models.counters import Counters
+from models.account_cache import account_cache
+from models.account_posting import AccountPosting
+from models.transaction_history import TransactionHistory
+
+# Error code MySQL raises for SIGNAL SQLSTATE '45000' inside a procedure
+SIGNAL_ERROR = 1644
 
 class Transaction:
     """Transaction model - handles all transaction-related database operations"""
     
     @staticmethod
     def create(cursor, transaction_data):
-        """Create a new transaction"""
+        """Create a new transaction (completed_at is set when it is created 'completed')"""
         if 'transaction_uid' not in transaction_data:
             transaction_data['transaction_uid'] = str(uuid.uuid4())
         
+        status = transaction_data.get('status', 'pending')
         query = """
             INSERT INTO transactions (
                 transaction_uid, from_account_id, to_account_id, transaction_type,
-                amount, description, status, initiated_by, ip_address, user_agent
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                amount, description, status, initiated_by, ip_address, user_agent, completed_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, IF(%s = 'completed', NOW(), NULL))
         """
         cursor.execute(query, (
             transaction_data['transaction_uid'],
@@ -24,12 +35,127 @@ class Transaction:
             transaction_data['transaction_type'],
             transaction_data['amount'],
             transaction_data.get('description', ''),
-            transaction_data.get('status', 'pending'),
+            status,
             transaction_data.get('initiated_by'),
             transaction_data.get('ip_address'),
-            transaction_data.get('user_agent')
+            transaction_data.get('user_agent'),
+            status
         ))
-        return cursor.lastrowid, transaction_data['transaction_uid']
+        transaction_id = cursor.lastrowid
+        AccountPosting.record(cursor, transaction_id)
+        Counters.record_transactions(cursor)
+        return transaction_id, transaction_data['transaction_uid']
+    
+    @staticmethod
+    def create_many(cursor, transactions, chunk_size=1000):
+        """Insert many transactions with chunked multi-row INSERTs.
+        
+        Each dict takes the same keys as create(); a transaction_uid is
+        generated where missing. Returns the list of transaction_uids.
+        """
+        rows = []
+        for data in transactions:
+            if 'transaction_uid' not in data:
+                data['transaction_uid'] = str(uuid.uuid4())
+            status = data.get('status', 'pending')
+            rows.append((
+                data['transaction_uid'],
+                data.get('from_account_id'),
+                data.get('to_account_id'),
+                data['transaction_type'],
+                data['amount'],
+                data.get('description', ''),
+                status,
+                data.get('initiated_by'),
+                data.get('ip_address'),
+                data.get('user_agent'),
+                status
+            ))
+        
+        row_sql = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, IF(%s = 'completed', NOW(), NULL))"
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            cursor.execute(f"""
+                INSERT INTO transactions (
+                    transaction_uid, from_account_id, to_account_id, transaction_type,
+                    amount, description, status, initiated_by, ip_address, user_agent, completed_at
+                ) VALUES {', '.join([row_sql] * len(chunk))}
+            """, [v for row in chunk for v in row])
+            AccountPosting.record_uids(cursor, [row[0] for row in chunk])
+        Counters.record_transactions(cursor, len(rows))
+        return [row[0] for row in rows]
+    
+    @staticmethod
+    def ids_for_uids(cursor, uids, chunk_size=1000):
+        """transaction_ids for a list of transaction_uids, in the same order"""
+        ids = {}
+        for i in range(0, len(uids), chunk_size):
+            chunk = uids[i:i + chunk_size]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                SELECT transaction_id, transaction_uid FROM transactions
+                WHERE transaction_uid IN ({placeholders})
+            """, chunk)
+            ids.update({row['transaction_uid']: row['transaction_id'] for row in cursor.fetchall()})
+        return [ids[uid] for uid in uids]
+    
+    @staticmethod
+    def post(cursor, transaction_data):
+        """Post a completed transaction in one round trip (sp_post_transaction).
+        
+        The procedure locks the accounts, validates status and funds, inserts
+        the transaction, applies the balances and commits server-side.
+        Returns {'transaction_id', 'transaction_uid', 'balances'}.
+        """
+        transaction_uid = transaction_data.get('transaction_uid') or str(uuid.uuid4())
+        from_account_id = transaction_data.get('from_account_id')
+        to_account_id = transaction_data.get('to_account_id')
+        try:
+            cursor.execute("CALL sp_post_transaction(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", (
+                transaction_uid,
+                transaction_data['transaction_type'],
+                from_account_id,
+                to_account_id,
+                transaction_data['amount'],
+                transaction_data.get('description', ''),
+                transaction_data.get('initiated_by'),
+                transaction_data.get('ip_address'),
+                transaction_data.get('user_agent'),
+                transaction_data.get('biller_id'),
+                (transaction_data.get('biller_reference') or '')[:50] or None
+            ))
+            row = cursor.fetchone()
+            # Drain the CALL status result so the connection is usable again
+            while cursor.nextset():
+                pass
+        except MySQLdb.MySQLError as e:
+            if e.args and e.args[0] == SIGNAL_ERROR:
+                raise Transaction._signal_to_error(e.args[1], transaction_data['amount']) from e
+            raise
+        
+        account_cache.touch(cursor, [row['from_user_id'], row['to_user_id']])
+        balances = {}
+        if from_account_id:
+            balances[int(from_account_id)] = row['from_balance']
+        if to_account_id:
+            balances[int(to_account_id)] = row['to_balance']
+        return {
+            'transaction_id': row['transaction_id'],
+            'transaction_uid': row['transaction_uid'],
+            'balances': balances,
+            'status': 'completed'
+        }
+    
+    @staticmethod
+    def _signal_to_error(message, amount):
+        """Map a sp_post_transaction SIGNAL message to a posting exception"""
+        code, _, detail = message.partition(':')
+        if code == 'INSUFFICIENT_FUNDS':
+            account_id, _, balance = detail.partition(':')
+            return InsufficientFunds(int(account_id), Decimal(balance), amount)
+        if code == 'ACCOUNT_UNAVAILABLE':
+            return AccountUnavailable(int(detail or 0))
+        return PostingError(message)
     
     @staticmethod
     def complete(cursor, transaction_uid):
@@ -51,45 +177,15 @@ class Transaction:
     
     @staticmethod
     def get_user_transactions(cursor, user_id, limit=50, offset=0):
-        """Get transactions for a user"""
-        cursor.execute("""
-            SELECT t.*, 
-                   a_from.account_number as from_account_number,
-                   a_to.account_number as to_account_number
-            FROM transactions t
-            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
-            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
-            WHERE t.from_account_id IN (SELECT account_id FROM accounts WHERE user_id = %s)
-               OR t.to_account_id IN (SELECT account_id FROM accounts WHERE user_id = %s)
-            ORDER BY t.initiated_at DESC
-            LIMIT %s OFFSET %s
-        """, (user_id, user_id, limit, offset))
-        return cursor.fetchall()
+        """Get transactions for a user (newest first, via account_postings)"""
+        cursor.execute("SELECT account_id FROM accounts WHERE user_id = %s", (user_id,))
+        account_ids = [row['account_id'] for row in cursor.fetchall()]
+        return TransactionHistory.recent(cursor, account_ids, limit, offset)
     
     @staticmethod
     def get_account_transactions(cursor, account_id, start_date=None, end_date=None):
-        """Get transactions for a specific account"""
-        query = """
-            SELECT t.*, 
-                   a_from.account_number as from_account_number,
-                   a_to.account_number as to_account_number
-            FROM transactions t
-            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
-            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
-            WHERE (t.from_account_id = %s OR t.to_account_id = %s)
-        """
-        params = [account_id, account_id]
-        
-        if start_date:
-            query += " AND t.initiated_at >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND t.initiated_at <= %s"
-            params.append(end_date)
-        
-        query += " ORDER BY t.initiated_at ASC"
-        cursor.execute(query, params)
-        return cursor.fetchall()
+        """Get transactions for a specific account (oldest first, via account_postings)"""
+        return AccountPosting.get_account_history(cursor, account_id, start_date, end_date)
     
     @staticmethod
     def get_recent_transactions(cursor, limit=20):
@@ -119,7 +215,5 @@ class Transaction:
     
     @staticmethod
     def get_today_count(cursor):
-        """Get today's transaction count"""
-        cursor.execute("SELECT COUNT(*) as total FROM transactions WHERE DATE(initiated_at) = CURDATE()")
-        result = cursor.fetchone()
-        return result['total']
\ No newline at end of file
+        """Get today's transaction count (from the stats counters)"""
+        return Counters.dashboard(cursor)['today_transactions']
\ No newline at end of file
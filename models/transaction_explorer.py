@@ -0,0 +1,245 @@
+# models/transaction_explorer.py
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import MySQLdb.cursors
+from utils.pagination import KeysetCursor
+
+CSV_COLUMNS = ('transaction_id', 'transaction_uid', 'initiated_at', 'completed_at', 'type', 'status',
+               'amount', 'currency', 'from_account', 'to_account', 'initiated_by', 'description',
+               'reference_number', 'ip_address')
+
+# Every value of the transactions.transaction_type / status enums
+TRANSACTION_TYPES = ('deposit', 'withdrawal', 'transfer', 'payment', 'fee', 'interest', 'refund', 'chargeback')
+STATUSES = ('pending', 'completed', 'failed', 'reversed', 'cancelled')
+
+explorer_cursor = KeysetCursor(salt='admin-transactions')
+
+
+class TransactionExplorer:
+    """Bank-wide transaction search for admins, newest first.
+
+    Rows are ordered by (initiated_at, transaction_id) and read through
+    whichever index already has that order behind the most selective
+    filter:
+
+    - an account: its account_postings range (account_id, initiated_at,
+      transaction_id),
+    - an initiator: transactions (initiated_by, initiated_at),
+    - a status or type alone: (status, initiated_at) / (transaction_type,
+      initiated_at),
+    - otherwise: (initiated_at).
+
+    The date range bounds that scan; the remaining filters (amount range
+    included) are checked on the rows read. Pages continue from the edge
+    row's key, so every page costs the same. The export runs the same
+    query without a limit through an unbuffered server-side cursor.
+    """
+
+    @staticmethod
+    def filters(args):
+        """Normalised filters from request args; unknown or malformed values mean 'all'"""
+        def day(name):
+            try:
+                return datetime.strptime(args.get(name, ''), '%Y-%m-%d')
+            except ValueError:
+                return None
+
+        def amount(name):
+            try:
+                value = Decimal(args.get(name, ''))
+                return value if value.is_finite() and value >= 0 else None
+            except InvalidOperation:
+                return None
+
+        transaction_type = args.get('type', 'all')
+        status = args.get('status', 'all')
+        return {
+            'start': day('start'),
+            'end': day('end'),
+            'type': transaction_type if transaction_type in TRANSACTION_TYPES else 'all',
+            'status': status if status in STATUSES else 'all',
+            'min_amount': amount('min_amount'),
+            'max_amount': amount('max_amount'),
+            'account': (args.get('account') or '').strip()[:30],
+            'initiator': (args.get('initiator') or '').strip()[:50]
+        }
+
+    @staticmethod
+    def query_args(filters):
+        """The filters as URL query arguments (for links and the export)"""
+        args = {}
+        for name in ('start', 'end'):
+            if filters[name]:
+                args[name] = filters[name].strftime('%Y-%m-%d')
+        for name in ('type', 'status'):
+            if filters[name] != 'all':
+                args[name] = filters[name]
+        for name in ('min_amount', 'max_amount'):
+            if filters[name] is not None:
+                args[name] = str(filters[name])
+        for name in ('account', 'initiator'):
+            if filters[name]:
+                args[name] = filters[name]
+        return args
+
+    @staticmethod
+    def resolve(cursor, filters):
+        """Look up the account number and initiator (username or user id) once.
+
+        Returns (account_id, initiator_id); 0 stands for "given but not
+        found", which matches nothing.
+        """
+        account_id = initiator_id = None
+        if filters['account']:
+            cursor.execute("SELECT account_id FROM accounts WHERE account_number = %s", (filters['account'],))
+            row = cursor.fetchone()
+            account_id = row['account_id'] if row else 0
+        if filters['initiator']:
+            if filters['initiator'].isdigit():
+                cursor.execute("SELECT user_id FROM users WHERE user_id = %s", (int(filters['initiator']),))
+            else:
+                cursor.execute("SELECT user_id FROM users WHERE username = %s", (filters['initiator'],))
+            row = cursor.fetchone()
+            initiator_id = row['user_id'] if row else 0
+        return account_id, initiator_id
+
+    @staticmethod
+    def query(filters, account_id=None, initiator_id=None, key=None, direction=KeysetCursor.NEXT, limit=None):
+        """SQL + params for the filtered rows in page order, continuing after key"""
+        conditions, params = [], []
+        if account_id is not None:
+            source = "account_postings p JOIN transactions t ON t.transaction_id = p.transaction_id"
+            ts, tid = 'p.initiated_at', 'p.transaction_id'
+            conditions.append("p.account_id = %s")
+            params.append(account_id)
+        else:
+            source = "transactions t"
+            ts, tid = 't.initiated_at', 't.transaction_id'
+        if initiator_id is not None:
+            conditions.append("t.initiated_by = %s")
+            params.append(initiator_id)
+        if filters['start']:
+            conditions.append(f"{ts} >= %s")
+            params.append(filters['start'])
+        if filters['end']:
+            conditions.append(f"{ts} < %s")
+            params.append(filters['end'] + timedelta(days=1))
+        if filters['type'] != 'all':
+            conditions.append("t.transaction_type = %s")
+            params.append(filters['type'])
+        if filters['status'] != 'all':
+            conditions.append("t.status = %s")
+            params.append(filters['status'])
+        if filters['min_amount'] is not None:
+            conditions.append("t.amount >= %s")
+            params.append(filters['min_amount'])
+        if filters['max_amount'] is not None:
+            conditions.append("t.amount <= %s")
+            params.append(filters['max_amount'])
+        if key:
+            op = '<' if direction == KeysetCursor.NEXT else '>'
+            conditions.append(f"({ts} {op} %s OR ({ts} = %s AND {tid} {op} %s))")
+            params += [key[0], key[0], key[1]]
+
+        order = 'DESC' if direction == KeysetCursor.NEXT else 'ASC'
+        sql = f"""
+            SELECT t.transaction_id, t.transaction_uid, t.transaction_type, t.amount, t.currency, t.status,
+                   t.description, t.reference_number, t.initiated_by, t.initiated_at, t.completed_at,
+                   t.ip_address, t.failure_reason,
+                   a_from.account_number AS from_account_number,
+                   a_to.account_number AS to_account_number,
+                   u.username AS initiated_by_username
+            FROM {source}
+            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
+            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
+            LEFT JOIN users u ON t.initiated_by = u.user_id
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY {ts} {order}, {tid} {order}
+        """
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return sql, params
+
+    @staticmethod
+    def page(cursor, filters, token=None, per_page=50):
+        """One page of transactions: {'transactions', 'next', 'prev'}"""
+        direction, key = explorer_cursor.decode(token, (datetime, int))
+        direction = direction or KeysetCursor.NEXT
+        account_id, initiator_id = TransactionExplorer.resolve(cursor, filters)
+        cursor.execute(*TransactionExplorer.query(filters, account_id, initiator_id, key, direction, per_page + 1))
+        rows = list(cursor.fetchall())
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == KeysetCursor.PREV:
+            rows.reverse()
+        next_token, prev_token = explorer_cursor.page(
+            rows, lambda r: (r['initiated_at'], r['transaction_id']),
+            direction if key else None, per_page, has_more
+        )
+        return {'transactions': rows, 'next': next_token, 'prev': prev_token}
+
+    @staticmethod
+    def export(connection, filters, account_id=None, initiator_id=None, chunk_size=2000):
+        """Every matching row, newest first, from an SSDictCursor on `connection`.
+
+        Memory stays at one chunk however many rows match. As with
+        Statement.lines, a generator closed early leaves the result unread,
+        so the connection must then be discarded (PooledMySQL.detached).
+        """
+        cursor = connection.cursor(MySQLdb.cursors.SSDictCursor)
+        finished = False
+        try:
+            cursor.execute(*TransactionExplorer.query(filters, account_id, initiator_id))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+
+    @staticmethod
+    def csv_rows(rows):
+        """Rows for CSV_COLUMNS"""
+        for row in rows:
+            yield (
+                row['transaction_id'],
+                row['transaction_uid'],
+                row['initiated_at'].strftime('%Y-%m-%d %H:%M:%S'),
+                row['completed_at'].strftime('%Y-%m-%d %H:%M:%S') if row['completed_at'] else '',
+                row['transaction_type'],
+                row['status'],
+                row['amount'],
+                row['currency'],
+                row['from_account_number'] or '',
+                row['to_account_number'] or '',
+                row['initiated_by_username'] or '',
+                row['description'] or '',
+                row['reference_number'] or '',
+                row['ip_address'] or ''
+            )
+
+    @staticmethod
+    def records(rows):
+        """NDJSON records, one per transaction"""
+        for row in rows:
+            yield {
+                'transaction_id': row['transaction_id'],
+                'transaction_uid': row['transaction_uid'],
+                'initiated_at': row['initiated_at'],
+                'completed_at': row['completed_at'],
+                'type': row['transaction_type'],
+                'status': row['status'],
+                'amount': row['amount'],
+                'currency': row['currency'],
+                'from_account': row['from_account_number'],
+                'to_account': row['to_account_number'],
+                'initiated_by': row['initiated_by_username'],
+                'description': row['description'],
+                'reference_number': row['reference_number'],
+                'ip_address': row['ip_address'],
+                'failure_reason': row['failure_reason']
+            }
@@ -0,0 +1,167 @@
+# models/transaction_history.py
+from datetime import datetime, timedelta
+from utils.cache import LRUCache
+from utils.pagination import KeysetCursor
+from models.account_posting import AccountPosting
+from models.account_rollup import AccountRollup
+
+TRANSACTION_TYPES = ('transfer', 'deposit', 'withdrawal', 'payment', 'fee', 'interest')
+STATUSES = ('completed', 'pending', 'failed', 'reversed')
+DATE_RANGES = ('30', '90', '180', '365', 'all')
+
+# Totals are approximate: counted up to COUNT_CAP and cached for a minute
+COUNT_CAP = 1000
+_count_cache = LRUCache(maxsize=10000, ttl=60)
+# user_id -> content version last seen by conditional_get; part of the count
+# cache key, so counts are never older than a page's ETag
+_count_versions = LRUCache(maxsize=10000, ttl=60)
+
+history_cursor = KeysetCursor(salt='transaction-history')
+
+
+class TransactionHistory:
+    """A customer's transaction history, newest first, paged by keyset.
+
+    Pages are ordered by (initiated_at, transaction_id) and read as one
+    account_postings range scan per account (see AccountPosting), each
+    limited to one page. Deep pages therefore cost the same as the first
+    one, unlike LIMIT/OFFSET over an OR-across-IN predicate.
+    """
+
+    @staticmethod
+    def filters(args, account_ids):
+        """Normalised filters from request args; unknown values mean 'all'"""
+        account = args.get('account', 'all')
+        account = int(account) if account.isdigit() and int(account) in account_ids else 'all'
+        transaction_type = args.get('type', 'all')
+        status = args.get('status', 'all')
+        date_range = args.get('date', '30')
+        return {
+            'account': account,
+            'type': transaction_type if transaction_type in TRANSACTION_TYPES else 'all',
+            'status': status if status in STATUSES else 'all',
+            'date': date_range if date_range in DATE_RANGES else '30'
+        }
+
+    @staticmethod
+    def _conditions(filters):
+        conditions = []
+        params = []
+        if filters['type'] != 'all':
+            conditions.append("t.transaction_type = %s")
+            params.append(filters['type'])
+        if filters['status'] != 'all':
+            conditions.append("t.status = %s")
+            params.append(filters['status'])
+        if filters['date'] != 'all':
+            conditions.append("p.initiated_at >= %s")
+            params.append(datetime.now().replace(microsecond=0) - timedelta(days=int(filters['date'])))
+        return conditions, params
+
+    @staticmethod
+    def _seeks(account_ids, filters, key=None, direction=KeysetCursor.NEXT, limit=None):
+        """UNION of per-account account_postings range scans returning (transaction_id, initiated_at)"""
+        conditions, params = TransactionHistory._conditions(filters)
+        ids = [filters['account']] if filters['account'] != 'all' else list(account_ids)
+        branches = []
+        args = []
+        for account_id in ids:
+            sql, branch_args = AccountPosting.seek(account_id, conditions, params, key,
+                                                   descending=direction == KeysetCursor.NEXT, limit=limit)
+            branches.append(f"({sql})")
+            args += branch_args
+        # UNION (not UNION ALL) drops transfers between the user's own accounts seen from both sides
+        return ' UNION '.join(branches), args
+
+    @staticmethod
+    def recent(cursor, account_ids, limit=10, offset=0):
+        """Newest transactions across the accounts (dashboard, API)"""
+        if not account_ids:
+            return []
+        filters = {'account': 'all', 'type': 'all', 'status': 'all', 'date': 'all'}
+        seeks, params = TransactionHistory._seeks(account_ids, filters, limit=limit + offset)
+        cursor.execute(f"""
+            SELECT t.*,
+                   a_from.account_number as from_account_number,
+                   a_to.account_number as to_account_number
+            FROM ({seeks}) k
+            JOIN transactions t ON t.transaction_id = k.transaction_id
+            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
+            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
+            ORDER BY k.initiated_at DESC, k.transaction_id DESC
+            LIMIT %s OFFSET %s
+        """, params + [limit, offset])
+        return cursor.fetchall()
+
+    @staticmethod
+    def page(cursor, account_ids, filters, token=None, per_page=20):
+        """One page of history: {'transactions', 'next', 'prev'}"""
+        if not account_ids:
+            return {'transactions': [], 'next': None, 'prev': None}
+        direction, key = history_cursor.decode(token, (datetime, int))
+        direction = direction or KeysetCursor.NEXT
+        seeks, params = TransactionHistory._seeks(account_ids, filters, key, direction, per_page + 1)
+        order = 'DESC' if direction == KeysetCursor.NEXT else 'ASC'
+        cursor.execute(f"""
+            SELECT t.*,
+                   a_from.account_number as from_account_number,
+                   a_to.account_number as to_account_number
+            FROM ({seeks}) k
+            JOIN transactions t ON t.transaction_id = k.transaction_id
+            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
+            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
+            ORDER BY k.initiated_at {order}, k.transaction_id {order}
+            LIMIT %s
+        """, params + [per_page + 1])
+        rows = list(cursor.fetchall())
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == KeysetCursor.PREV:
+            rows.reverse()
+        next_token, prev_token = history_cursor.page(
+            rows, lambda r: (r['initiated_at'], r['transaction_id']),
+            direction if key else None, per_page, has_more
+        )
+        return {'transactions': rows, 'next': next_token, 'prev': prev_token}
+
+    @staticmethod
+    def period_totals(cursor, user_id, account_ids, filters):
+        """{'credits', 'debits', 'pending'} for the filtered account(s) and date range.
+
+        Credits and debits are completed movements from the daily rollup
+        (whole days, regardless of the type/status filters); pending is the
+        capped count of pending transactions.
+        """
+        ids = [filters['account']] if filters['account'] != 'all' else list(account_ids)
+        start_day = None
+        if filters['date'] != 'all':
+            start_day = (datetime.now() - timedelta(days=int(filters['date']))).date()
+        totals = AccountRollup.totals(cursor, ids, start_day)
+        pending, _ = TransactionHistory.approximate_total(cursor, user_id, account_ids, dict(filters, status='pending'))
+        return {'credits': totals['credits'], 'debits': totals['debits'], 'pending': pending}
+
+    @staticmethod
+    def note_version(user_id, version):
+        """Key the user's cached counts on a content version (User.content_version).
+
+        conditional_get calls this before rendering a page it tags, so a
+        version it has not seen counts afresh instead of reusing a count
+        cached before the change.
+        """
+        _count_versions.set(user_id, tuple(sorted(version.items())))
+
+    @staticmethod
+    def approximate_total(cursor, user_id, account_ids, filters):
+        """(count, capped): matching transactions counted up to COUNT_CAP, cached for a minute"""
+        if not account_ids:
+            return 0, False
+        cache_key = (user_id, _count_versions.get(user_id), tuple(sorted(account_ids)),
+                     tuple(sorted(filters.items())))
+        cached = _count_cache.get(cache_key)
+        if cached is None:
+            seeks, params = TransactionHistory._seeks(account_ids, filters, limit=COUNT_CAP + 1)
+            cursor.execute(f"SELECT COUNT(*) AS total FROM ({seeks}) k", params)
+            total = cursor.fetchone()['total']
+            cached = (min(total, COUNT_CAP), total > COUNT_CAP)
+            _count_cache.set(cache_key, cached)
+        return cached
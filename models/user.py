@@ -1,4 +1,8 @@
 # models/user.py
+from models.counters import Counters
+from models.user_summary import UserSummary
+
+
 class User:
     """User model - handles all user-related database operations"""
     
@@ -30,7 +34,10 @@ class User:
             user_data.get('phone', ''),
             user_data.get('address', '')
         ))
-        return cursor.lastrowid
+        user_id = cursor.lastrowid
+        Counters.record_user(cursor)
+        UserSummary.add(cursor, {user_id: (0, 0)})
+        return user_id
     
     @staticmethod
     def update_last_login(cursor, user_id):
@@ -65,11 +72,12 @@ class User:
     @staticmethod
     def toggle_active(cursor, user_id):
         """Toggle user active status"""
-        cursor.execute("SELECT is_active FROM users WHERE user_id = %s", (user_id,))
+        cursor.execute("SELECT is_active, role FROM users WHERE user_id = %s FOR UPDATE", (user_id,))
         user = cursor.fetchone()
         if user:
             new_status = not user['is_active']
             cursor.execute("UPDATE users SET is_active = %s WHERE user_id = %s", (new_status, user_id))
+            Counters.record_toggle(cursor, new_status, user['role'])
             return new_status
         return None
     
@@ -80,12 +88,45 @@ class User:
                       (password_hash, user_id))
     
     @staticmethod
-    def get_stats(cursor):
-        """Get user statistics"""
-        cursor.execute("SELECT COUNT(*) as total FROM users WHERE role = 'customer'")
-        total = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM users WHERE role = 'customer' AND is_active = TRUE")
-        active = cursor.fetchone()['total']
+    def content_version(cursor, user_id):
+        """What a user's pages are built from, in one indexed read (for ETags).
         
-        return {'total': total, 'active': active}
\ No newline at end of file
+        Profile and account row timestamps, balance sums and a checksum of
+        the account rows (timestamps only have second precision), unfolded
+        hot-account credits and each account's newest posting. None if the
+        user does not exist.
+        """
+        cursor.execute("""
+            SELECT u.updated_at AS profile_at,
+                   COUNT(a.account_id) AS accounts,
+                   MAX(a.updated_at) AS accounts_at,
+                   MAX(a.last_transaction_date) AS last_transaction_at,
+                   SUM(a.balance) AS balance,
+                   SUM(a.available_balance) AS available_balance,
+                   BIT_XOR(CRC32(CONCAT_WS(':', a.account_id, a.balance, a.available_balance, a.status))) AS checksum,
+                   (SELECT COALESCE(SUM(s.balance), 0)
+                    FROM accounts h
+                    JOIN account_balance_slots s ON s.account_id = h.account_id
+                    WHERE h.user_id = u.user_id AND h.hot_slots > 0) AS unfolded,
+                   MAX(a.last_posting) AS last_posting
+            FROM users u
+            LEFT JOIN (
+                SELECT acc.*,
+                       (SELECT p.transaction_id
+                        FROM account_postings p
+                        WHERE p.account_id = acc.account_id
+                        ORDER BY p.initiated_at DESC, p.transaction_id DESC
+                        LIMIT 1) AS last_posting
+                FROM accounts acc
+                WHERE acc.user_id = %s
+            ) a ON a.user_id = u.user_id
+            WHERE u.user_id = %s
+            GROUP BY u.user_id, u.updated_at
+        """, (user_id, user_id))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def get_stats(cursor):
+        """Get user statistics (from the stats counters)"""
+        stats = Counters.dashboard(cursor)
+        return {'total': stats['total_users'], 'active': stats['active_users']}
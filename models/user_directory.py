@@ -0,0 +1,141 @@
+# models/user_directory.py
+from datetime import datetime
+from decimal import Decimal
+from utils.pagination import KeysetCursor
+from models.user_summary import UserSummary
+
+ROLES = ('customer', 'admin')
+STATUSES = ('active', 'inactive')
+KYC_STATUSES = ('PENDING', 'VERIFIED', 'REJECTED')
+
+# sort name -> (column, direction, key type); ties are broken by user_id in the same direction
+SORTS = {
+    'newest': ('u.created_at', 'DESC', datetime),
+    'oldest': ('u.created_at', 'ASC', datetime),
+    'username': ('u.username', 'ASC', str),
+    'email': ('u.email', 'ASC', str),
+    'name': ('u.last_name', 'ASC', str),
+    'balance': ('s.total_balance', 'DESC', Decimal),
+}
+
+# search field -> sort it implies (a prefix match is read in that column's index order)
+SEARCH_FIELDS = ('username', 'email', 'name')
+
+# One token namespace per sort, so a token is never read against another order
+_cursors = {sort: KeysetCursor(salt=f'user-directory:{sort}') for sort in SORTS}
+
+
+class UserDirectory:
+    """The admin user list: prefix search, filters and keyset pages.
+
+    Every page is one index range read of per_page + 1 rows: the sort
+    column's index (created_at, username, email, last_name, or
+    user_account_summary.total_balance), continued from the previous
+    page's edge row. A search is a prefix LIKE on the searched column and
+    is ordered by it, so it reads the same index. Role, status and KYC
+    filters are applied to the rows read; their (column, created_at)
+    indexes serve the default newest-first order directly. Account count
+    and total balance come from UserSummary instead of a GROUP BY over
+    accounts.
+    """
+
+    @staticmethod
+    def filters(args):
+        """Normalised filters from request args; unknown values mean 'all'"""
+        q = (args.get('q') or '').strip()[:100]
+        search_by = args.get('search_by', 'auto')
+        if search_by not in SEARCH_FIELDS:
+            search_by = 'email' if '@' in q else 'username'
+        role = args.get('role', 'all')
+        status = args.get('status', 'all')
+        kyc = args.get('kyc', 'all')
+        sort = args.get('sort', 'newest')
+        return {
+            'q': q,
+            'search_by': search_by,
+            'role': role if role in ROLES else 'all',
+            'status': status if status in STATUSES else 'all',
+            'kyc': kyc if kyc in KYC_STATUSES else 'all',
+            # A search is ordered by the searched column
+            'sort': search_by if q else (sort if sort in SORTS else 'newest')
+        }
+
+    @staticmethod
+    def _conditions(filters):
+        conditions = []
+        params = []
+        if filters['q']:
+            column = SORTS[filters['search_by']][0]
+            escaped = filters['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append(f"{column} LIKE %s")
+            params.append(escaped + '%')
+        if filters['role'] != 'all':
+            conditions.append("u.role = %s")
+            params.append(filters['role'])
+        if filters['status'] != 'all':
+            conditions.append("u.is_active = %s")
+            params.append(filters['status'] == 'active')
+        if filters['kyc'] != 'all':
+            conditions.append("u.kyc_status = %s")
+            params.append(filters['kyc'])
+        return conditions, params
+
+    @staticmethod
+    def _seek(column, id_column, key, op):
+        """Rows after `key` = (value, user_id) in the direction of `op`; NULLs sort first"""
+        value, user_id = key
+        if value is None:
+            if op == '>':
+                return f"({column} IS NOT NULL OR {id_column} > %s)", [user_id]
+            return f"({column} IS NULL AND {id_column} < %s)", [user_id]
+        condition = f"{column} {op} %s OR ({column} = %s AND {id_column} {op} %s)"
+        if op == '<':
+            condition += f" OR {column} IS NULL"
+        return f"({condition})", [value, value, user_id]
+
+    @staticmethod
+    def page(cursor, filters, token=None, per_page=50):
+        """One page of users: {'users', 'next', 'prev'}"""
+        column, order, key_type = SORTS[filters['sort']]
+        keyset = _cursors[filters['sort']]
+        direction, key = keyset.decode(token, (key_type, int))
+        direction = direction or KeysetCursor.NEXT
+        id_column = 's.user_id' if column.startswith('s.') else 'u.user_id'
+
+        # Reading backwards (previous page) flips the order and the comparison
+        forwards = direction == KeysetCursor.NEXT
+        read_order = order if forwards else ('ASC' if order == 'DESC' else 'DESC')
+        conditions, params = UserDirectory._conditions(filters)
+        if key:
+            seek, seek_params = UserDirectory._seek(column, id_column, key, '<' if read_order == 'DESC' else '>')
+            conditions.append(seek)
+            params += seek_params
+
+        if column.startswith('s.'):
+            # Drive the read from the summary's balance index
+            source = "user_account_summary s STRAIGHT_JOIN users u ON u.user_id = s.user_id"
+        else:
+            source = "users u LEFT JOIN user_account_summary s ON s.user_id = u.user_id"
+        cursor.execute(f"""
+            SELECT u.user_id, u.username, u.email, u.first_name, u.last_name, u.phone, u.address,
+                   u.role, u.is_active, u.kyc_status, u.created_at, u.last_login,
+                   COALESCE(s.account_count, 0) AS account_count,
+                   COALESCE(s.total_balance, 0) AS total_balance
+            FROM {source}
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY {column} {read_order}, {id_column} {read_order}
+            LIMIT %s
+        """, params + [per_page + 1])
+        rows = list(cursor.fetchall())
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if not forwards:
+            rows.reverse()
+        sort_key = column.split('.')[1]
+        next_token, prev_token = keyset.page(
+            rows, lambda r: (r[sort_key], r['user_id']),
+            direction if key else None, per_page, has_more
+        )
+        # The sort key was read before unfolded hot credits are added
+        UserSummary.include_pending(cursor, rows)
+        return {'users': rows, 'next': next_token, 'prev': prev_token}
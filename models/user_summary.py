@@ -0,0 +1,90 @@
+# models/user_summary.py
+
+
+class UserSummary:
+    """Per-user account count and total balance (user_account_summary).
+
+    Kept current by the write paths, like Counters: account creation adds
+    (1, opening balance) and every balance change adds its signed amount
+    to the owner's row inside the same transaction. Credits to hot
+    accounts are left out (they would make the owner's row as hot as the
+    account) and added when the slots are folded, so total_balance is the
+    sum of accounts.balance; include_pending adds the unfolded part for
+    display. The admin user directory sorts and pages on this table.
+    """
+
+    @staticmethod
+    def add(cursor, deltas):
+        """Add {user_id: (account_count delta, balance delta)} (user_ids sorted for a stable lock order)"""
+        rows = [(user_id, count, balance) for user_id, (count, balance) in sorted(deltas.items())]
+        if not rows:
+            return
+        cursor.execute(f"""
+            INSERT INTO user_account_summary (user_id, account_count, total_balance)
+            VALUES {', '.join(['(%s, %s, %s)'] * len(rows))}
+            ON DUPLICATE KEY UPDATE
+                account_count = account_count + VALUES(account_count),
+                total_balance = total_balance + VALUES(total_balance)
+        """, [v for row in rows for v in row])
+
+    @staticmethod
+    def record_balances(cursor, deltas, locked):
+        """Add {account_id: signed amount} to the owners' totals; locked maps account_id -> row with user_id"""
+        by_user = {}
+        for account_id, delta in deltas.items():
+            user_id = locked[account_id]['user_id']
+            by_user[user_id] = by_user.get(user_id, 0) + delta
+        UserSummary.add(cursor, {u: (0, d) for u, d in by_user.items() if d})
+
+    @staticmethod
+    def record_account_balance(cursor, account_id, delta):
+        """Add a signed amount to the total of the user owning account_id"""
+        if delta:
+            cursor.execute("""
+                UPDATE user_account_summary s
+                JOIN accounts a ON a.user_id = s.user_id
+                SET s.total_balance = s.total_balance + %s
+                WHERE a.account_id = %s
+            """, (delta, account_id))
+
+    @staticmethod
+    def include_pending(cursor, users):
+        """Add unfolded hot-account credits to total_balance of user rows"""
+        if not users:
+            return users
+        placeholders = ','.join(['%s'] * len(users))
+        cursor.execute(f"""
+            SELECT a.user_id, SUM(s.balance) AS pending
+            FROM accounts a
+            JOIN account_balance_slots s ON s.account_id = a.account_id
+            WHERE a.user_id IN ({placeholders}) AND a.hot_slots > 0
+            GROUP BY a.user_id
+        """, [u['user_id'] for u in users])
+        pending = {row['user_id']: row['pending'] for row in cursor.fetchall()}
+        for user in users:
+            user['total_balance'] += pending.get(user['user_id']) or 0
+        return users
+
+    @staticmethod
+    def rebuild(cursor, from_id, to_id):
+        """Recompute the rows of users with from_id <= user_id < to_id.
+
+        Locks the users' accounts first so concurrent postings wait and add
+        their delta on top of the rebuilt total. Returns the rows written.
+        """
+        cursor.execute("""
+            SELECT account_id FROM accounts
+            WHERE user_id >= %s AND user_id < %s
+            ORDER BY account_id
+            FOR UPDATE
+        """, (from_id, to_id))
+        cursor.execute("DELETE FROM user_account_summary WHERE user_id >= %s AND user_id < %s", (from_id, to_id))
+        cursor.execute("""
+            INSERT INTO user_account_summary (user_id, account_count, total_balance)
+            SELECT u.user_id, COUNT(a.account_id), COALESCE(SUM(a.balance), 0)
+            FROM users u
+            LEFT JOIN accounts a ON a.user_id = u.user_id
+            WHERE u.user_id >= %s AND u.user_id < %s
+            GROUP BY u.user_id
+        """, (from_id, to_id))
+        return cursor.rowcount
@@ -1,9 +1,13 @@
 # routes/admin.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response
 from extensions import mysql
 from utils.decorators import admin_required
 from utils.logger import bank_logger
+from utils.streaming import logged, csv_lines, ndjson_lines
 from utils.helpers import get_client_ip, write_to_audit_table
+from models.counters import Counters
+from models.user_directory import UserDirectory
+from models.transaction_explorer import TransactionExplorer, CSV_COLUMNS as EXPORT_COLUMNS
 import os
 import json
 from datetime import datetime
@@ -14,24 +18,11 @@ admin_bp = Blueprint('admin', __name__)
 @admin_required
 def dashboard():
     """Admin dashboard"""
-    cursor = mysql.connection.cursor()
+    cursor = mysql.read_connection().cursor()
     
     try:
-        # Get stats
-        cursor.execute("SELECT COUNT(*) as total FROM users WHERE role = 'customer'")
-        total_users = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM users WHERE role = 'customer' AND is_active = TRUE")
-        active_users = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM accounts")
-        total_accounts = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT COUNT(*) as total FROM transactions WHERE DATE(initiated_at) = CURDATE()")
-        today_transactions = cursor.fetchone()['total']
-        
-        cursor.execute("SELECT SUM(balance) as total FROM accounts")
-        total_balance = cursor.fetchone()['total'] or 0
+        # Get stats (one read of the maintained counters)
+        stats = Counters.dashboard(cursor)
         
         # Get recent users
         cursor.execute("""
@@ -61,11 +52,11 @@ def dashboard():
         )
         
         return render_template('admin/dashboard.html',
-                              total_users=total_users,
-                              active_users=active_users,
-                              total_accounts=total_accounts,
-                              today_transactions=today_transactions,
-                              total_balance=total_balance,
+                              total_users=stats['total_users'],
+                              active_users=stats['active_users'],
+                              total_accounts=stats['total_accounts'],
+                              today_transactions=stats['today_transactions'],
+                              total_balance=stats['total_balance'],
                               recent_users=recent_users,
                               recent_transactions=recent_transactions)
     
@@ -86,30 +77,81 @@ def dashboard():
 @admin_bp.route('/admin/users')
 @admin_required
 def users():
-    """User management"""
-    cursor = mysql.connection.cursor()
+    """User management: server-side search, filters and keyset pages (see UserDirectory)"""
+    filters = UserDirectory.filters(request.args)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 10), 100)
+    cursor = mysql.read_connection().cursor()
     
     try:
-        cursor.execute("""
-            SELECT u.*, 
-                   COUNT(DISTINCT a.account_id) as account_count,
-                   COALESCE(SUM(a.balance), 0) as total_balance
-            FROM users u
-            LEFT JOIN accounts a ON u.user_id = a.user_id
-            GROUP BY u.user_id
-            ORDER BY u.created_at DESC
-        """)
-        users = cursor.fetchall()
+        stats = Counters.dashboard(cursor)
+        page = UserDirectory.page(cursor, filters, request.args.get('cursor'), per_page)
         
-        return render_template('admin/users.html', users=users)
+        return render_template('admin/users.html',
+                              users=page['users'],
+                              next_cursor=page['next'],
+                              prev_cursor=page['prev'],
+                              filters=filters,
+                              per_page=per_page,
+                              stats=stats)
     
     except Exception as e:
         bank_logger.log_error(e, context="admin_users")
         flash('Error loading users.', 'danger')
-        return render_template('admin/users.html', users=[])
+        return render_template('admin/users.html', users=[], filters=filters, per_page=per_page, stats={})
     finally:
         cursor.close()
 
+@admin_bp.route('/admin/transactions')
+@admin_required
+def transactions():
+    """Transaction explorer: filters and keyset pages, or a streamed export (?format=csv|ndjson)"""
+    admin_id = session['user_id']
+    filters = TransactionExplorer.filters(request.args)
+    output = request.args.get('format', 'html')
+    per_page = min(max(request.args.get('per_page', 50, type=int), 10), 200)
+    cursor = mysql.read_connection().cursor()
+    
+    try:
+        if output in ('csv', 'ndjson'):
+            account_id, initiator_id = TransactionExplorer.resolve(cursor, filters)
+            db = mysql.detached()
+        else:
+            page = TransactionExplorer.page(cursor, filters, request.args.get('cursor'), per_page)
+    except Exception as e:
+        bank_logger.log_error(e, context="admin_transactions")
+        flash('Error loading transactions.', 'danger')
+        return render_template('admin/transactions.html', transactions=[], filters=filters,
+                              query_args=TransactionExplorer.query_args(filters), per_page=per_page)
+    finally:
+        cursor.close()
+    
+    if output not in ('csv', 'ndjson'):
+        return render_template('admin/transactions.html',
+                              transactions=page['transactions'],
+                              next_cursor=page['next'],
+                              prev_cursor=page['prev'],
+                              filters=filters,
+                              query_args=TransactionExplorer.query_args(filters),
+                              per_page=per_page)
+    
+    bank_logger.log_audit(admin_id, get_client_ip(), 'TRANSACTIONS_EXPORT',
+                          dict(TransactionExplorer.query_args(filters), format=output))
+    
+    def rows():
+        with db as conn:
+            yield from TransactionExplorer.export(conn, filters, account_id, initiator_id)
+    
+    filename = f"transactions-{datetime.now():%Y%m%d-%H%M%S}"
+    if output == 'csv':
+        return Response(logged(csv_lines(EXPORT_COLUMNS, TransactionExplorer.csv_rows(rows())),
+                               "admin_transactions_export", admin_id, size=65536),
+                        mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
+    return Response(logged(ndjson_lines(TransactionExplorer.records(rows())),
+                           "admin_transactions_export", admin_id, size=65536),
+                    mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.ndjson'})
+
 @admin_bp.route('/admin/user/<int:user_id>/toggle')
 @admin_required
 def toggle_user(user_id):
@@ -123,12 +165,13 @@ def toggle_user(user_id):
             flash('You cannot deactivate your own account.', 'danger')
             return redirect(url_for('admin.users'))
         
-        cursor.execute("SELECT is_active, username FROM users WHERE user_id = %s", (user_id,))
+        cursor.execute("SELECT is_active, username, role FROM users WHERE user_id = %s FOR UPDATE", (user_id,))
         user = cursor.fetchone()
         
         if user:
             new_status = not user['is_active']
             cursor.execute("UPDATE users SET is_active = %s WHERE user_id = %s", (new_status, user_id))
+            Counters.record_toggle(cursor, new_status, user['role'])
             mysql.connection.commit()
             
             bank_logger.log_audit(
@@ -238,3 +281,9 @@ def json_logs():
             bank_logger.log_error(e, context="json_logs")
     
     return jsonify({'logs': logs, 'count': len(logs)})
+
+@admin_bp.route('/admin/pool-stats')
+@admin_required
+def pool_stats():
+    """Connection pool and log queue metrics for this worker"""
+    return jsonify({'pid': os.getpid(), 'pool': mysql.stats(), 'log_queue': bank_logger.stats()})
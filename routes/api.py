@@ -1,27 +1,184 @@
 # routes/api.py
-from flask import Blueprint, jsonify, request
+import uuid
+from flask import Blueprint, jsonify, request, session, current_app
 from extensions import mysql
-from utils.decorators import login_required
+from utils.decorators import login_required, conditional_get
+from utils.logger import bank_logger
+from utils.helpers import get_client_ip, write_to_audit_table
+from models.account import Account
+from models.account_lookup import account_lookup
+from models.transaction_history import TransactionHistory
+from models.posting import posting_engine
+from models.errors import AccountUnavailable
 
 api_bp = Blueprint('api', __name__)
 
 @api_bp.route('/api/verify_account/<account_number>')
 @login_required
 def verify_account(account_number):
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT a.account_number, u.first_name, u.last_name 
-        FROM accounts a
-        JOIN users u ON a.user_id = u.user_id
-        WHERE a.account_number = %s
-    """, (account_number,))
-    account = cursor.fetchone()
-    cursor.close()
+    cursor = mysql.read_connection().cursor()
+    try:
+        account = account_lookup.lookup(cursor, account_number)
+    except Exception as e:
+        bank_logger.log_error(e, context="verify_account", user_id=session['user_id'])
+        return jsonify({'success': False, 'error': 'Could not verify account'}), 500
+    finally:
+        cursor.close()
     
     if account:
-        return jsonify({
-            'success': True,
-            'account_number': account['account_number'],
-            'holder_name': f"{account['first_name']} {account['last_name']}".strip()
+        return jsonify(dict(account, success=True))
+    return jsonify({'success': False, 'error': 'Account not found'}), 404
+
+@api_bp.route('/api/verify_accounts', methods=['POST'])
+@login_required
+def verify_accounts():
+    """Verify many account numbers at once (e.g. before a batch transfer).
+    
+    Body: {"account_numbers": ["ACC...", ...]}
+    Each number is answered in request order with found/holder_name.
+    """
+    payload = request.get_json(silent=True) or {}
+    numbers = payload.get('account_numbers')
+    
+    if not isinstance(numbers, list) or not numbers or not all(isinstance(n, str) for n in numbers):
+        return jsonify({'success': False, 'error': 'account_numbers must be a non-empty list of strings'}), 400
+    max_numbers = current_app.config['ACCOUNT_LOOKUP_BATCH_MAX']
+    if len(numbers) > max_numbers:
+        return jsonify({'success': False, 'error': f'At most {max_numbers} account numbers per request'}), 413
+    
+    cursor = mysql.read_connection().cursor()
+    try:
+        found = account_lookup.lookup_many(cursor, numbers)
+    except Exception as e:
+        bank_logger.log_error(e, context="verify_accounts", user_id=session['user_id'])
+        return jsonify({'success': False, 'error': 'Could not verify accounts'}), 500
+    finally:
+        cursor.close()
+    
+    results = []
+    for number in numbers:
+        account = found.get(account_lookup.normalize(number))
+        if account:
+            results.append(dict(account, found=True))
+        else:
+            results.append({'account_number': number, 'found': False})
+    return jsonify({'success': True, 'results': results})
+
+@api_bp.route('/api/transactions')
+@login_required
+@conditional_get()
+def transactions():
+    """The user's transaction history, one keyset page at a time.
+    
+    Query: account, type, status, date (as on /transactions), limit (max 100)
+    and cursor (the 'next' or 'prev' token of a previous response).
+    """
+    user_id = session['user_id']
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    cursor = mysql.read_connection().cursor()
+    try:
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=False)
+        account_ids = [acc['account_id'] for acc in accounts]
+        filters = TransactionHistory.filters(request.args, account_ids)
+        history = TransactionHistory.page(cursor, account_ids, filters, request.args.get('cursor'), limit)
+        total, total_capped = TransactionHistory.approximate_total(cursor, user_id, account_ids, filters)
+    except Exception as e:
+        bank_logger.log_error(e, context="api_transactions", user_id=user_id)
+        return jsonify({'success': False, 'error': 'Could not load transactions'}), 500
+    finally:
+        cursor.close()
+    
+    return jsonify({
+        'success': True,
+        'transactions': [{
+            'transaction_uid': t['transaction_uid'],
+            'type': t['transaction_type'],
+            'status': t['status'],
+            'amount': str(t['amount']),
+            'direction': 'debit' if t['from_account_id'] in account_ids else 'credit',
+            'from_account': t['from_account_number'],
+            'to_account': t['to_account_number'],
+            'description': t['description'],
+            'initiated_at': t['initiated_at'].isoformat(),
+            'completed_at': t['completed_at'].isoformat() if t['completed_at'] else None
+        } for t in history['transactions']],
+        'next': history['next'],
+        'prev': history['prev'],
+        'total': total,
+        'total_is_estimate': total_capped
+    })
+
+@api_bp.route('/api/transfers/batch', methods=['POST'])
+@login_required
+def batch_transfer():
+    """Post many credits (payroll, disbursements) from one of the user's accounts.
+    
+    Body: {"from_account_id": 1, "lines": [{"to_account": "ACC...", "amount": 10.5,
+           "description": "..."}]}
+    Every line gets its own status; accepted lines are committed together.
+    """
+    user_id = session['user_id']
+    payload = request.get_json(silent=True) or {}
+    from_account_id = payload.get('from_account_id')
+    lines = payload.get('lines')
+    
+    if not from_account_id or not isinstance(lines, list) or not lines:
+        return jsonify({'success': False, 'error': 'from_account_id and a non-empty lines list are required'}), 400
+    if not all(isinstance(line, dict) for line in lines):
+        return jsonify({'success': False, 'error': 'Each line must be an object'}), 400
+    max_lines = current_app.config['BATCH_TRANSFER_MAX_LINES']
+    if len(lines) > max_lines:
+        return jsonify({'success': False, 'error': f'A batch may contain at most {max_lines} lines'}), 413
+    
+    cursor = mysql.connection.cursor()
+    try:
+        account = Account.get_by_id(cursor, from_account_id, user_id)
+    finally:
+        cursor.close()
+    if not account:
+        return jsonify({'success': False, 'error': 'Source account not found'}), 404
+    
+    batch_id = str(uuid.uuid4())
+    try:
+        results = posting_engine.post_batch(mysql.connection, account['account_id'], lines, {
+            'description': payload.get('description') or f'Batch transfer {batch_id[:8]}',
+            'initiated_by': user_id,
+            'ip_address': get_client_ip(),
+            'user_agent': request.headers.get('User-Agent', 'Unknown')[:255]
         })
-    return jsonify({'success': False, 'error': 'Account not found'}), 404
\ No newline at end of file
+    except AccountUnavailable:
+        return jsonify({'success': False, 'error': 'Source account is not active'}), 409
+    except Exception as e:
+        bank_logger.log_error(e, context="batch_transfer", user_id=user_id)
+        return jsonify({'success': False, 'error': 'Batch failed, nothing was posted'}), 500
+    
+    completed = [r for r in results if r['status'] == 'completed']
+    total_amount = sum(r['amount'] for r in completed)
+    
+    bank_logger.log_transaction(
+        batch_id,
+        account['account_number'],
+        'BATCH',
+        total_amount,
+        'completed',
+        user_id=user_id,
+        lines=len(results),
+        accepted=len(completed)
+    )
+    write_to_audit_table(
+        user_id,
+        'BATCH_TRANSFER',
+        'account',
+        account['account_id'],
+        None,
+        {'batch_id': batch_id, 'lines': len(results), 'accepted': len(completed), 'amount': total_amount}
+    )
+    
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'accepted': len(completed),
+        'rejected': len(results) - len(completed),
+        'total_amount': total_amount,
+        'lines': results
+    })
@@ -2,6 +2,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from extensions import mysql, bcrypt
 from utils.logger import bank_logger
+from models.user import User
+from models.account import Account
 from utils.helpers import get_client_ip, validate_email, validate_phone, generate_account_number, write_to_audit_table
 import re
 from datetime import datetime
@@ -117,27 +119,26 @@ def register():
             cursor.execute("START TRANSACTION")
             
             password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, first_name, last_name, phone)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (username, email, password_hash, first_name, last_name, phone))
-            user_id = cursor.lastrowid
+            user_id = User.create(cursor, {
+                'username': username,
+                'email': email,
+                'password_hash': password_hash,
+                'first_name': first_name,
+                'last_name': last_name,
+                'phone': phone
+            })
             
-            if account_type in ['savings', 'both']:
-                acc_num = generate_account_number(user_id)
-                amount = initial_deposit / 2 if account_type == 'both' else initial_deposit
-                cursor.execute("""
-                    INSERT INTO accounts (account_number, user_id, account_type, balance, available_balance, opened_date)
-                    VALUES (%s, %s, 'savings', %s, %s, CURDATE())
-                """, (acc_num, user_id, amount, amount))
-            
-            if account_type in ['checking', 'both']:
-                acc_num = generate_account_number(user_id)
-                amount = initial_deposit / 2 if account_type == 'both' else initial_deposit
-                cursor.execute("""
-                    INSERT INTO accounts (account_number, user_id, account_type, balance, available_balance, opened_date)
-                    VALUES (%s, %s, 'checking', %s, %s, CURDATE())
-                """, (acc_num, user_id, amount, amount))
+            # Open the requested account(s) with the initial deposit
+            for acc_type in ('savings', 'checking'):
+                if account_type in (acc_type, 'both'):
+                    amount = initial_deposit / 2 if account_type == 'both' else initial_deposit
+                    Account.create(cursor, {
+                        'account_number': generate_account_number(user_id),
+                        'user_id': user_id,
+                        'account_type': acc_type,
+                        'balance': amount,
+                        'available_balance': amount
+                    })
             
             mysql.connection.commit()
             bank_logger.log_audit(user_id, get_client_ip(), 'REGISTER', {'username': username})
@@ -1,14 +1,24 @@
 # routes/customer.py (COMPLETE VERSION)
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, flash, session, jsonify, Response, send_file
 from extensions import mysql, bcrypt
-from utils.decorators import login_required
+from utils.decorators import login_required, conditional_get
 from utils.logger import bank_logger
-from utils.helpers import get_client_ip, format_currency, write_to_audit_table, generate_account_number
+from utils.streaming import logged, csv_lines, ndjson_lines
+from utils.helpers import get_client_ip, format_currency, write_to_audit_table, generate_account_number, get_idempotency_key
 from models.user import User
-from models.account import Account
+from models.account import Account, to_money
 from models.transaction import Transaction
+from models.transaction_history import TransactionHistory
+from models.statement import Statement, CSV_COLUMNS
+from models.statement_archive import statement_archive
+from models.biller import Biller
+from models.scheduled_transfer import ScheduledTransfer, FREQUENCIES
+from models.posting import posting_engine
+from models.idempotency import IdempotencyKey
+from models.errors import InsufficientFunds, AccountUnavailable, IdempotencyConflict, IdempotencyInProgress
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
+from decimal import InvalidOperation
 
 customer_bp = Blueprint('customer', __name__)
 
@@ -17,10 +27,11 @@ customer_bp = Blueprint('customer', __name__)
 # =============================================
 @customer_bp.route('/dashboard')
 @login_required
+@conditional_get()
 def dashboard():
     """Customer dashboard"""
     user_id = session['user_id']
-    cursor = mysql.connection.cursor()
+    cursor = mysql.read_connection().cursor()
     
     try:
         # Get user details
@@ -32,20 +43,7 @@ def dashboard():
         # Get recent transactions
         transactions = []
         if accounts:
-            account_ids = [acc['account_id'] for acc in accounts]
-            placeholders = ','.join(['%s'] * len(account_ids))
-            cursor.execute(f"""
-                SELECT t.*, 
-                       a_from.account_number as from_account_number,
-                       a_to.account_number as to_account_number
-                FROM transactions t
-                LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
-                LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
-                WHERE t.from_account_id IN ({placeholders}) OR t.to_account_id IN ({placeholders})
-                ORDER BY t.initiated_at DESC
-                LIMIT 10
-            """, account_ids * 2)
-            transactions = cursor.fetchall()
+            transactions = TransactionHistory.recent(cursor, [acc['account_id'] for acc in accounts], limit=10)
             
             total_balance = sum(acc['balance'] for acc in accounts)
         else:
@@ -81,12 +79,8 @@ def transfer():
     cursor = mysql.connection.cursor()
     
     try:
-        # Get user's active accounts
-        cursor.execute("""
-            SELECT * FROM accounts 
-            WHERE user_id = %s AND status = 'active'
-        """, (user_id,))
-        accounts = cursor.fetchall()
+        # Get user's active accounts (re-read on submit to validate the form)
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=True, fresh=request.method == 'POST')
         
         # Get beneficiaries
         cursor.execute("""
@@ -119,20 +113,28 @@ def transfer():
                 flash('Please enter a valid number for amount.', 'danger')
                 return redirect(url_for('customer.transfer'))
             
-            # Get source account
-            cursor.execute("""
-                SELECT * FROM accounts 
-                WHERE account_id = %s AND user_id = %s AND status = 'active'
-            """, (from_account_id, user_id))
-            from_account = cursor.fetchone()
+            idem_key = get_idempotency_key()
+            idempotency = IdempotencyKey.build(user_id, idem_key, 'transfer', {
+                'from': from_account_id, 'to': to_account_number,
+                'amount': amount, 'description': description
+            }) if idem_key else None
             
-            if not from_account:
-                flash('Invalid source account.', 'danger')
+            # A retry gets its first result, whatever the balances and accounts are now
+            try:
+                replay = posting_engine.replay(mysql.connection, idempotency) if idempotency else None
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
                 return redirect(url_for('customer.transfer'))
+            if replay:
+                bank_logger.log_app('info', 'Idempotent transfer replayed', user_id=user_id, transaction_id=replay['transaction_uid'])
+                flash(f'✅ Successfully transferred ${amount:,.2f} to account {to_account_number}', 'success')
+                return redirect(url_for('customer.transactions'))
             
-            # Check sufficient balance
-            if from_account['balance'] < amount:
-                flash(f'Insufficient funds. Available balance: ${from_account["balance"]:,.2f}', 'danger')
+            # Get source account (funds are checked under the row lock when posting)
+            from_account = Account.pick(accounts, from_account_id)
+            
+            if not from_account or from_account['status'] != 'active':
+                flash('Invalid source account.', 'danger')
                 return redirect(url_for('customer.transfer'))
             
             # Get destination account
@@ -153,46 +155,27 @@ def transfer():
                 flash('Cannot transfer to the same account.', 'danger')
                 return redirect(url_for('customer.transfer'))
             
-            # Generate transaction UID
-            transaction_uid = str(uuid.uuid4())
-            
             try:
-                # Start transaction
-                cursor.execute("START TRANSACTION")
-                
-                # Create transaction record
-                cursor.execute("""
-                    INSERT INTO transactions (
-                        transaction_uid, from_account_id, to_account_id,
-                        transaction_type, amount, description, status,
-                        initiated_by, ip_address, user_agent
-                    ) VALUES (%s, %s, %s, 'transfer', %s, %s, 'completed', %s, %s, %s)
-                """, (
-                    transaction_uid, from_account['account_id'], to_account['account_id'],
-                    amount, description, user_id, get_client_ip(),
-                    request.headers.get('User-Agent', 'Unknown')[:255]
-                ))
-                
-                # Update source account balance
-                cursor.execute("""
-                    UPDATE accounts 
-                    SET balance = balance - %s, 
-                        available_balance = available_balance - %s,
-                        last_transaction_date = NOW()
-                    WHERE account_id = %s
-                """, (amount, amount, from_account['account_id']))
-                
-                # Update destination account balance
-                cursor.execute("""
-                    UPDATE accounts 
-                    SET balance = balance + %s, 
-                        available_balance = available_balance + %s,
-                        last_transaction_date = NOW()
-                    WHERE account_id = %s
-                """, (amount, amount, to_account['account_id']))
+                # Lock both accounts, re-check funds and post (retries on deadlock)
+                result = posting_engine.transfer(
+                    mysql.connection,
+                    from_account['account_id'],
+                    to_account['account_id'],
+                    amount,
+                    {
+                        'description': description,
+                        'initiated_by': user_id,
+                        'ip_address': get_client_ip(),
+                        'user_agent': request.headers.get('User-Agent', 'Unknown')[:255]
+                    },
+                    idempotency=idempotency
+                )
+                transaction_uid = result['transaction_uid']
                 
-                # Commit transaction
-                mysql.connection.commit()
+                if result.get('replayed'):
+                    bank_logger.log_app('info', 'Idempotent transfer replayed', user_id=user_id, transaction_id=transaction_uid)
+                    flash(f'✅ Successfully transferred ${amount:,.2f} to account {to_account_number}', 'success')
+                    return redirect(url_for('customer.transactions'))
                 
                 # Log the transaction
                 bank_logger.log_transaction(
@@ -200,7 +183,7 @@ def transfer():
                     from_account['account_number'],
                     to_account_number,
                     amount,
-                    'completed',
+                    result['status'],
                     user_id=user_id
                 )
                 
@@ -209,7 +192,7 @@ def transfer():
                     user_id,
                     'TRANSFER',
                     'transaction',
-                    cursor.lastrowid,
+                    result['transaction_id'],
                     None,
                     {
                         'from': from_account['account_number'],
@@ -218,16 +201,31 @@ def transfer():
                     }
                 )
                 
-                flash(f'✅ Successfully transferred ${amount:,.2f} to account {to_account_number}', 'success')
+                if result['status'] == 'pending':
+                    flash(f'Transfer of ${amount:,.2f} to account {to_account_number} accepted and is being processed.', 'info')
+                else:
+                    flash(f'✅ Successfully transferred ${amount:,.2f} to account {to_account_number}', 'success')
                 return redirect(url_for('customer.transactions'))
                 
+            except InsufficientFunds as e:
+                flash(f'Insufficient funds. Available balance: ${e.balance:,.2f}', 'danger')
+                return redirect(url_for('customer.transfer'))
+            except AccountUnavailable:
+                flash('Source or destination account is no longer active.', 'danger')
+                return redirect(url_for('customer.transfer'))
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
+                return redirect(url_for('customer.transfer'))
+            except IdempotencyInProgress:
+                flash('This transfer is already being processed.', 'warning')
+                return redirect(url_for('customer.transactions'))
             except Exception as e:
-                mysql.connection.rollback()
                 bank_logger.log_error(e, context="transfer_execution", user_id=user_id)
                 flash('Transfer failed. Please try again.', 'danger')
                 return redirect(url_for('customer.transfer'))
         
-        return render_template('transfer.html', accounts=accounts, beneficiaries=beneficiaries)
+        return render_template('transfer.html', accounts=accounts, beneficiaries=beneficiaries,
+                               idempotency_key=str(uuid.uuid4()))
     
     except Exception as e:
         bank_logger.log_error(e, context="transfer_page", user_id=user_id)
@@ -255,12 +253,8 @@ def deposit():
     cursor = mysql.connection.cursor()
     
     try:
-        # Get user's accounts
-        cursor.execute("""
-            SELECT * FROM accounts 
-            WHERE user_id = %s AND status = 'active'
-        """, (user_id,))
-        accounts = cursor.fetchall()
+        # Get user's accounts (re-read on submit to validate the form)
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=True, fresh=request.method == 'POST')
         print(f"Found {len(accounts)} accounts for user")
         
         if request.method == 'POST':
@@ -277,12 +271,24 @@ def deposit():
                 flash('Please select an account and enter a valid amount.', 'danger')
                 return redirect(url_for('customer.deposit'))
             
+            idem_key = get_idempotency_key()
+            idempotency = IdempotencyKey.build(user_id, idem_key, 'deposit', {
+                'account': account_id, 'amount': amount, 'description': description
+            }) if idem_key else None
+            
+            # A retry gets its first result, even if the account has changed since
+            try:
+                replay = posting_engine.replay(mysql.connection, idempotency) if idempotency else None
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
+                return redirect(url_for('customer.deposit'))
+            if replay:
+                bank_logger.log_app('info', 'Idempotent deposit replayed', user_id=user_id, transaction_id=replay['transaction_uid'])
+                flash(f'Successfully deposited ${amount:,.2f}', 'success')
+                return redirect(url_for('customer.transactions'))
+            
             # Get account before update
-            cursor.execute("""
-                SELECT * FROM accounts 
-                WHERE account_id = %s AND user_id = %s
-            """, (account_id, user_id))
-            account = cursor.fetchone()
+            account = Account.pick(accounts, account_id)
             
             if not account:
                 flash('Invalid account.', 'danger')
@@ -290,48 +296,25 @@ def deposit():
             
             print(f"Account before deposit: ${account['balance']}")
             
-            # Generate transaction UID
-            transaction_uid = str(uuid.uuid4())
-            print(f"Transaction UID: {transaction_uid}")
-            
             try:
-                # Start transaction
-                cursor.execute("START TRANSACTION")
-                print("Transaction started")
-                
-                # Create transaction record
-                cursor.execute("""
-                    INSERT INTO transactions (
-                        transaction_uid, to_account_id,
-                        transaction_type, amount, description, status,
-                        initiated_by, ip_address, user_agent
-                    ) VALUES (%s, %s, 'deposit', %s, %s, 'completed', %s, %s, %s)
-                """, (
-                    transaction_uid, account_id,
-                    amount, description, user_id, get_client_ip(),
-                    request.headers.get('User-Agent', 'Unknown')[:255]
-                ))
-                txn_id = cursor.lastrowid
-                print(f"Transaction record created with ID: {txn_id}")
-                
-                # Update balance
-                cursor.execute("""
-                    UPDATE accounts 
-                    SET balance = balance + %s, 
-                        available_balance = available_balance + %s,
-                        last_transaction_date = NOW()
-                    WHERE account_id = %s
-                """, (amount, amount, account_id))
-                print(f"Account balance updated (+${amount})")
-                
-                # Commit the transaction
-                mysql.connection.commit()
-                print("Transaction COMMITTED successfully")
+                # Record and apply the deposit
+                result = posting_engine.post(mysql.connection, {
+                    'to_account_id': account['account_id'],
+                    'transaction_type': 'deposit',
+                    'amount': amount,
+                    'description': description,
+                    'initiated_by': user_id,
+                    'ip_address': get_client_ip(),
+                    'user_agent': request.headers.get('User-Agent', 'Unknown')[:255]
+                }, idempotency=idempotency)
+                transaction_uid = result['transaction_uid']
+                new_balance = result['balances'].get(account['account_id'])
+                print(f"Transaction {transaction_uid} posted, new balance after deposit: ${new_balance}")
                 
-                # Verify the update
-                cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
-                new_balance = cursor.fetchone()['balance']
-                print(f"New balance after deposit: ${new_balance}")
+                if result.get('replayed'):
+                    bank_logger.log_app('info', 'Idempotent deposit replayed', user_id=user_id, transaction_id=transaction_uid)
+                    flash(f'Successfully deposited ${amount:,.2f} to account {account["account_number"]}', 'success')
+                    return redirect(url_for('customer.transactions'))
                 
                 # Log transaction
                 bank_logger.log_transaction(
@@ -339,21 +322,29 @@ def deposit():
                     'DEPOSIT',
                     account['account_number'],
                     amount,
-                    'completed',
+                    result['status'],
                     user_id=user_id
                 )
                 
-                flash(f'Successfully deposited ${amount:,.2f} to account {account["account_number"]}', 'success')
+                if result['status'] == 'pending':
+                    flash(f'Deposit of ${amount:,.2f} to account {account["account_number"]} accepted and is being processed.', 'info')
+                else:
+                    flash(f'Successfully deposited ${amount:,.2f} to account {account["account_number"]}', 'success')
                 print("Redirecting to transactions page")
                 return redirect(url_for('customer.transactions'))
                 
+            except AccountUnavailable:
+                flash('This account is not active.', 'danger')
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
+            except IdempotencyInProgress:
+                flash('This deposit is already being processed.', 'warning')
             except Exception as e:
-                mysql.connection.rollback()
                 print(f"ERROR: Transaction rolled back - {str(e)}")
                 bank_logger.log_error(e, context="deposit", user_id=user_id)
                 flash('Deposit failed. Please try again.', 'danger')
         
-        return render_template('deposit.html', accounts=accounts)
+        return render_template('deposit.html', accounts=accounts, idempotency_key=str(uuid.uuid4()))
     
     except Exception as e:
         print(f"ERROR in deposit route: {str(e)}")
@@ -381,33 +372,21 @@ def pay_bills():
     cursor = mysql.connection.cursor()
     
     try:
-        # Get user's accounts
-        cursor.execute("""
-            SELECT * FROM accounts 
-            WHERE user_id = %s AND status = 'active'
-        """, (user_id,))
-        accounts = cursor.fetchall()
+        # Get user's accounts (re-read on submit to validate the form)
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=True, fresh=request.method == 'POST')
         print(f"Found {len(accounts)} accounts for user")
         
-        # Billers list
-        billers = [
-            {'id': 'electric', 'name': 'Electric Company'},
-            {'id': 'water', 'name': 'Water Utility'},
-            {'id': 'internet', 'name': 'Internet Provider'},
-            {'id': 'phone', 'name': 'Phone Company'},
-            {'id': 'credit', 'name': 'Credit Card'},
-            {'id': 'insurance', 'name': 'Insurance'},
-            {'id': 'rent', 'name': 'Rent'},
-            {'id': 'other', 'name': 'Other'}
-        ]
+        # Billers from the registry
+        billers = Biller.get_active(cursor)
         
         if request.method == 'POST':
             print("\n--- Processing Pay Bill POST Request ---")
             account_id = request.form.get('account_id')
-            biller = request.form.get('biller')
+            biller_row = Biller.get_by_code(cursor, request.form.get('biller'))
+            biller = biller_row['name'] if biller_row else None
             account_number = request.form.get('account_number', '').strip()
             amount = float(request.form.get('amount', 0))
-            description = request.form.get('description', f'Bill payment - {biller}')
+            description = request.form.get('description') or f'Bill payment - {biller}'
             
             print(f"Account ID: {account_id}")
             print(f"Biller: {biller}")
@@ -419,66 +398,53 @@ def pay_bills():
                 flash('Please fill in all required fields.', 'danger')
                 return redirect(url_for('customer.pay_bills'))
             
-            # Get account before update
-            cursor.execute("""
-                SELECT * FROM accounts 
-                WHERE account_id = %s AND user_id = %s
-            """, (account_id, user_id))
-            from_account = cursor.fetchone()
+            idem_key = get_idempotency_key()
+            idempotency = IdempotencyKey.build(user_id, idem_key, 'pay_bills', {
+                'account': account_id, 'biller': biller_row['code'],
+                'biller_account': account_number, 'amount': amount, 'description': description
+            }) if idem_key else None
             
-            if not from_account:
-                flash('Invalid source account.', 'danger')
+            # A retry gets its first result, whatever the balance is now
+            try:
+                replay = posting_engine.replay(mysql.connection, idempotency) if idempotency else None
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
                 return redirect(url_for('customer.pay_bills'))
+            if replay:
+                bank_logger.log_app('info', 'Idempotent bill payment replayed', user_id=user_id, transaction_id=replay['transaction_uid'])
+                flash(f'Successfully paid ${amount:,.2f} to {biller}', 'success')
+                return redirect(url_for('customer.transactions'))
             
-            print(f"Account before payment: ${from_account['balance']}")
+            # Get account before update (funds are checked under the row lock when posting)
+            from_account = Account.pick(accounts, account_id)
             
-            # Check sufficient balance
-            if from_account['balance'] < amount:
-                flash(f'Insufficient funds. Available balance: ${from_account["balance"]:,.2f}', 'danger')
+            if not from_account:
+                flash('Invalid source account.', 'danger')
                 return redirect(url_for('customer.pay_bills'))
             
-            # Generate transaction UID
-            transaction_uid = str(uuid.uuid4())
-            print(f"Transaction UID: {transaction_uid}")
+            print(f"Account before payment: ${from_account['balance']}")
             
             try:
-                # Start transaction
-                cursor.execute("START TRANSACTION")
-                print("Transaction started")
-                
-                # Create transaction record
-                cursor.execute("""
-                    INSERT INTO transactions (
-                        transaction_uid, from_account_id,
-                        transaction_type, amount, description, status,
-                        initiated_by, ip_address, user_agent
-                    ) VALUES (%s, %s, 'payment', %s, %s, 'completed', %s, %s, %s)
-                """, (
-                    transaction_uid, account_id,
-                    amount, f"{description} - Acc: {account_number}", user_id, get_client_ip(),
-                    request.headers.get('User-Agent', 'Unknown')[:255]
-                ))
-                txn_id = cursor.lastrowid
-                print(f"Transaction record created with ID: {txn_id}")
-                
-                # Update balance
-                cursor.execute("""
-                    UPDATE accounts 
-                    SET balance = balance - %s, 
-                        available_balance = available_balance - %s,
-                        last_transaction_date = NOW()
-                    WHERE account_id = %s
-                """, (amount, amount, account_id))
-                print(f"Account balance updated (-${amount})")
-                
-                # Commit the transaction
-                mysql.connection.commit()
-                print("Transaction COMMITTED successfully")
+                # Record the payment and debit the account (funds re-checked under lock)
+                result = posting_engine.post(mysql.connection, {
+                    'from_account_id': from_account['account_id'],
+                    'transaction_type': 'payment',
+                    'amount': amount,
+                    'description': f"{description} - Acc: {account_number}"[:255],
+                    'biller_id': biller_row['biller_id'],
+                    'biller_reference': account_number,
+                    'initiated_by': user_id,
+                    'ip_address': get_client_ip(),
+                    'user_agent': request.headers.get('User-Agent', 'Unknown')[:255]
+                }, idempotency=idempotency)
+                transaction_uid = result['transaction_uid']
+                new_balance = result['balances'].get(from_account['account_id'])
+                print(f"Transaction {transaction_uid} posted, new balance after payment: ${new_balance}")
                 
-                # Verify the update
-                cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
-                new_balance = cursor.fetchone()['balance']
-                print(f"New balance after payment: ${new_balance}")
+                if result.get('replayed'):
+                    bank_logger.log_app('info', 'Idempotent bill payment replayed', user_id=user_id, transaction_id=transaction_uid)
+                    flash(f'Successfully paid ${amount:,.2f} to {biller}', 'success')
+                    return redirect(url_for('customer.transactions'))
                 
                 # Log transaction
                 bank_logger.log_transaction(
@@ -486,21 +452,32 @@ def pay_bills():
                     from_account['account_number'],
                     biller,
                     amount,
-                    'completed',
+                    result['status'],
                     user_id=user_id
                 )
                 
-                flash(f'Successfully paid ${amount:,.2f} to {biller}', 'success')
+                if result['status'] == 'pending':
+                    flash(f'Payment of ${amount:,.2f} to {biller} accepted and is being processed.', 'info')
+                else:
+                    flash(f'Successfully paid ${amount:,.2f} to {biller}', 'success')
                 print("Redirecting to transactions page")
                 return redirect(url_for('customer.transactions'))
                 
+            except InsufficientFunds as e:
+                flash(f'Insufficient funds. Available balance: ${e.balance:,.2f}', 'danger')
+            except AccountUnavailable:
+                flash('This account is not active.', 'danger')
+            except IdempotencyConflict:
+                flash('This request was already submitted with different details.', 'danger')
+            except IdempotencyInProgress:
+                flash('This payment is already being processed.', 'warning')
             except Exception as e:
-                mysql.connection.rollback()
                 print(f"ERROR: Transaction rolled back - {str(e)}")
                 bank_logger.log_error(e, context="pay_bills", user_id=user_id)
                 flash('Payment failed. Please try again.', 'danger')
         
-        return render_template('pay_bills.html', accounts=accounts, billers=billers)
+        return render_template('pay_bills.html', accounts=accounts, billers=billers,
+                               idempotency_key=str(uuid.uuid4()))
     
     except Exception as e:
         print(f"ERROR in pay_bills route: {str(e)}")
@@ -515,94 +492,38 @@ def pay_bills():
 # =============================================
 @customer_bp.route('/transactions')
 @login_required
+@conditional_get()
 def transactions():
-    """View transaction history"""
+    """View transaction history (keyset pages, see TransactionHistory)"""
     user_id = session['user_id']
-    page = int(request.args.get('page', 1))
     per_page = 20
-    offset = (page - 1) * per_page
     
-    cursor = mysql.connection.cursor()
+    cursor = mysql.read_connection().cursor()
     
     try:
         # Get user's accounts
         accounts = Account.get_user_accounts(cursor, user_id, active_only=False)
         account_ids = [acc['account_id'] for acc in accounts]
         
-        # Get filter parameters
-        account_filter = request.args.get('account', 'all')
-        type_filter = request.args.get('type', 'all')
-        status_filter = request.args.get('status', 'all')
-        date_range = request.args.get('date', '30')
-        
-        # Build query conditions
-        conditions = []
-        params = []
-        
-        if account_ids:
-            if account_filter != 'all':
-                conditions.append("(t.from_account_id = %s OR t.to_account_id = %s)")
-                params.extend([account_filter, account_filter])
-            else:
-                placeholders = ','.join(['%s'] * len(account_ids))
-                conditions.append(f"(t.from_account_id IN ({placeholders}) OR t.to_account_id IN ({placeholders}))")
-                params.extend(account_ids * 2)
-        
-        if type_filter != 'all':
-            conditions.append("t.transaction_type = %s")
-            params.append(type_filter)
-        
-        if status_filter != 'all':
-            conditions.append("t.status = %s")
-            params.append(status_filter)
-        
-        if date_range != 'all':
-            days = int(date_range)
-            conditions.append("t.initiated_at >= DATE_SUB(NOW(), INTERVAL %s DAY)")
-            params.append(days)
-        
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-        
-        # Get total count
-        count_query = f"""
-            SELECT COUNT(*) as total 
-            FROM transactions t
-            WHERE {where_clause}
-        """
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()['total']
-        total_pages = (total + per_page - 1) // per_page
-        
-        # Get transactions
-        query = f"""
-            SELECT t.*, 
-                   a_from.account_number as from_account_number,
-                   a_to.account_number as to_account_number
-            FROM transactions t
-            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
-            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
-            WHERE {where_clause}
-            ORDER BY t.initiated_at DESC
-            LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, params + [per_page, offset])
-        transactions = cursor.fetchall()
+        filters = TransactionHistory.filters(request.args, account_ids)
+        history = TransactionHistory.page(cursor, account_ids, filters, request.args.get('cursor'), per_page)
+        total, total_capped = TransactionHistory.approximate_total(cursor, user_id, account_ids, filters)
+        transactions = history['transactions']
         
-        # Calculate totals
-        total_credits = sum(t['amount'] for t in transactions 
-                           if t['to_account_id'] in account_ids)
-        total_debits = sum(t['amount'] for t in transactions 
-                          if t['from_account_id'] in account_ids)
-        pending_count = sum(1 for t in transactions if t['status'] == 'pending')
+        # Totals over the whole period (daily rollup), not just this page
+        period = TransactionHistory.period_totals(cursor, user_id, account_ids, filters)
         
         return render_template('transactions.html',
                              transactions=transactions,
                              accounts=accounts,
-                             total_credits=total_credits,
-                             total_debits=total_debits,
-                             pending_count=pending_count,
-                             page=page,
-                             total_pages=total_pages,
+                             total_credits=period['credits'],
+                             total_debits=period['debits'],
+                             pending_count=period['pending'],
+                             filters=filters,
+                             next_cursor=history['next'],
+                             prev_cursor=history['prev'],
+                             total=total,
+                             total_capped=total_capped,
                              per_page=per_page)
     
     except Exception as e:
@@ -676,6 +597,7 @@ def profile():
 # =============================================
 @customer_bp.route('/statements')
 @login_required
+@conditional_get()
 def statements():
     """View account statements"""
     user_id = session.get('user_id')
@@ -683,16 +605,11 @@ def statements():
         flash('Please log in to continue.', 'warning')
         return redirect(url_for('auth.login'))
     
-    cursor = mysql.connection.cursor()
+    cursor = mysql.read_connection().cursor()
     
     try:
         # Get user's accounts
-        cursor.execute("""
-            SELECT * FROM accounts 
-            WHERE user_id = %s
-            ORDER BY account_type
-        """, (user_id,))
-        accounts = cursor.fetchall()
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=False)
         
         return render_template('statements.html', accounts=accounts)
     
@@ -707,76 +624,44 @@ def statements():
 # =============================================
 # GENERATE STATEMENT - COMPLETE WORKING VERSION
 # =============================================
+def _statement_etag_extra(account_id):
+    """The HTML statement links the account's prepared monthly files"""
+    return statement_archive.available([account_id]).get(account_id)
+
 @customer_bp.route('/generate-statement/<int:account_id>')
 @login_required
+@conditional_get(extra=_statement_etag_extra)
 def generate_statement(account_id):
-    """Generate statement for an account"""
+    """Generate statement for an account, streamed as HTML, CSV or NDJSON (?format=).
+    
+    The period is the last ?months=N months, or the calendar month ?month=YYYY-MM.
+    """
     user_id = session.get('user_id')
     if not user_id:
         flash('Please log in to continue.', 'warning')
         return redirect(url_for('auth.login'))
     
     months = int(request.args.get('months', 3))
+    month = request.args.get('month')
+    output = request.args.get('format', 'html')
     
-    cursor = mysql.connection.cursor()
+    cursor = mysql.read_connection().cursor()
     
     try:
         # Verify account belongs to user
-        cursor.execute("""
-            SELECT a.*, u.first_name, u.last_name, u.email
-            FROM accounts a
-            JOIN users u ON a.user_id = u.user_id
-            WHERE a.account_id = %s AND a.user_id = %s
-        """, (account_id, user_id))
-        account = cursor.fetchone()
+        account = Statement.get_account(cursor, account_id, user_id)
         
         if not account:
             flash('Account not found.', 'danger')
             return redirect(url_for('customer.statements'))
         
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30 * months)
-        
-        # Get transactions
-        cursor.execute("""
-            SELECT t.*, 
-                   a_from.account_number as from_account_number,
-                   a_to.account_number as to_account_number
-            FROM transactions t
-            LEFT JOIN accounts a_from ON t.from_account_id = a_from.account_id
-            LEFT JOIN accounts a_to ON t.to_account_id = a_to.account_id
-            WHERE (t.from_account_id = %s OR t.to_account_id = %s)
-              AND t.initiated_at BETWEEN %s AND %s
-              AND t.status = 'completed'
-            ORDER BY t.initiated_at ASC
-        """, (account_id, account_id, start_date, end_date))
-        
-        transactions = cursor.fetchall()
-        
-        # Calculate running balance
-        running_balance = account['balance']
-        for txn in reversed(transactions):
-            if txn['to_account_id'] == account_id:
-                running_balance -= txn['amount']
-            else:
-                running_balance += txn['amount']
-            txn['running_balance'] = running_balance
-        
-        # Calculate totals
-        total_credits = sum(t['amount'] for t in transactions if t['to_account_id'] == account_id)
-        total_debits = sum(t['amount'] for t in transactions if t['from_account_id'] == account_id)
-        
-        return render_template('statement.html',
-                             account=account,
-                             transactions=transactions,
-                             start_date=start_date.strftime('%B %d, %Y'),
-                             end_date=end_date.strftime('%B %d, %Y'),
-                             opening_balance=running_balance,
-                             closing_balance=account['balance'],
-                             total_credits=total_credits,
-                             total_debits=total_debits,
-                             months=months)
+        # Header figures from the daily rollup; lines are streamed below
+        if statement_archive.valid_month(month):
+            start_date, end_date = Statement.month_period(month)
+        else:
+            start_date, end_date = Statement.period(months)
+        summary = Statement.summary(cursor, account, start_date, end_date)
+        db = mysql.detached()
     
     except Exception as e:
         bank_logger.log_error(e, context="generate_statement", user_id=user_id)
@@ -784,6 +669,73 @@ def generate_statement(account_id):
         return redirect(url_for('customer.statements'))
     finally:
         cursor.close()
+    
+    def lines():
+        with db as conn:
+            yield from Statement.lines(conn, account_id, start_date, end_date, summary['opening_balance'])
+    
+    filename = f"statement-{account['account_number']}-{end_date:%Y%m%d}"
+    if output == 'csv':
+        return Response(logged(csv_lines(CSV_COLUMNS, Statement.csv_rows(summary, lines())),
+                               "generate_statement_stream", user_id),
+                        mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
+    if output == 'ndjson':
+        return Response(logged(ndjson_lines(Statement.records(account, start_date, end_date, summary, lines())),
+                               "generate_statement_stream", user_id),
+                        mimetype='application/x-ndjson',
+                        headers={'Content-Disposition': f'attachment; filename={filename}.ndjson'})
+    
+    return Response(logged(stream_template('statements.html',
+                                           account=account,
+                                           transactions=lines(),
+                                           start_date=start_date.strftime('%B %d, %Y'),
+                                           end_date=end_date.strftime('%B %d, %Y'),
+                                           months=months,
+                                           prepared_months=statement_archive.available([account_id])[account_id],
+                                           **summary),
+                           "generate_statement_stream", user_id),
+                    mimetype='text/html')
+@customer_bp.route('/statements/<int:account_id>/<month>')
+@login_required
+def monthly_statement(account_id, month):
+    """Pre-generated monthly statement (jobs/generate_statements.py), else generated on demand"""
+    user_id = session['user_id']
+    if not statement_archive.valid_month(month):
+        flash('Invalid statement month.', 'danger')
+        return redirect(url_for('customer.statements'))
+    
+    cursor = mysql.read_connection().cursor()
+    try:
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=False)
+        account = Account.pick(accounts, account_id)
+    except Exception as e:
+        bank_logger.log_error(e, context="monthly_statement", user_id=user_id)
+        flash('Error loading statement. Please try again.', 'danger')
+        return redirect(url_for('customer.statements'))
+    finally:
+        cursor.close()
+    
+    if not account:
+        flash('Account not found.', 'danger')
+        return redirect(url_for('customer.statements'))
+    if not statement_archive.exists(month, account_id):
+        return redirect(url_for('customer.generate_statement', account_id=account_id, month=month, format='csv'))
+    
+    # The file is sent as stored (wsgi.file_wrapper / sendfile); clients that
+    # take gzip get it as a CSV with Content-Encoding, others as a .csv.gz
+    filename = f"statement-{account['account_number']}-{month}.csv"
+    path = statement_archive.path(month, account_id)
+    if 'gzip' in request.accept_encodings:
+        response = send_file(path, mimetype='text/csv', as_attachment=True, download_name=filename,
+                             etag=False, conditional=False)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(path, mimetype='application/gzip', as_attachment=True,
+                             download_name=filename + '.gz', conditional=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 # =============================================
 # BENEFICIARIES
 # =============================================
@@ -875,16 +827,22 @@ def remove_beneficiary(beneficiary_id):
             SET is_active = FALSE 
             WHERE beneficiary_id = %s AND user_id = %s
         """, (beneficiary_id, user_id))
+        removed = cursor.rowcount > 0
+        # Standing orders to a removed beneficiary stop with it
+        cancelled = ScheduledTransfer.cancel_for_beneficiary(cursor, beneficiary_id, user_id) if removed else 0
         mysql.connection.commit()
         
-        if cursor.rowcount > 0:
+        if removed:
             bank_logger.log_audit(
                 user_id,
                 get_client_ip(),
                 'REMOVE_BENEFICIARY',
-                {'beneficiary_id': beneficiary_id}
+                {'beneficiary_id': beneficiary_id, 'cancelled_schedules': cancelled}
             )
-            flash('Beneficiary removed successfully.', 'success')
+            if cancelled:
+                flash(f'Beneficiary removed and {cancelled} scheduled transfer(s) to it cancelled.', 'success')
+            else:
+                flash('Beneficiary removed successfully.', 'success')
         else:
             flash('Beneficiary not found.', 'danger')
     
@@ -896,6 +854,129 @@ def remove_beneficiary(beneficiary_id):
         cursor.close()
     
     return redirect(url_for('customer.transfer'))
+
+# =============================================
+# SCHEDULED TRANSFERS (STANDING ORDERS)
+# =============================================
+@customer_bp.route('/scheduled-transfers', methods=['GET', 'POST'])
+@login_required
+def scheduled_transfers():
+    """List and create scheduled / recurring transfers"""
+    user_id = session['user_id']
+    cursor = mysql.connection.cursor()
+    
+    try:
+        accounts = Account.get_user_accounts(cursor, user_id, active_only=True)
+        cursor.execute("""
+            SELECT b.beneficiary_id, b.beneficiary_name, b.nickname, b.beneficiary_account_id, a.account_number
+            FROM beneficiaries b
+            JOIN accounts a ON b.beneficiary_account_id = a.account_id
+            WHERE b.user_id = %s AND b.is_active = TRUE AND a.status = 'active'
+            ORDER BY b.nickname
+        """, (user_id,))
+        beneficiaries = cursor.fetchall()
+        
+        if request.method == 'POST':
+            from_account_id = request.form.get('from_account', type=int)
+            beneficiary_id = request.form.get('beneficiary_id', type=int)
+            frequency = request.form.get('frequency', 'monthly')
+            description = request.form.get('description', '').strip()[:255]
+            
+            try:
+                amount = to_money(request.form.get('amount', '0').replace(',', ''))
+                start_date = datetime.strptime(request.form.get('start_date', ''), '%Y-%m-%d').date()
+                end_date = request.form.get('end_date')
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+            except (InvalidOperation, ValueError):
+                flash('Please enter a valid amount and dates.', 'danger')
+                return redirect(url_for('customer.scheduled_transfers'))
+            
+            from_account = next((a for a in accounts if a['account_id'] == from_account_id), None)
+            beneficiary = next((b for b in beneficiaries if b['beneficiary_id'] == beneficiary_id), None)
+            
+            if not from_account or not beneficiary:
+                flash('Please select a source account and a beneficiary.', 'danger')
+            elif amount <= 0:
+                flash('Please enter a valid amount greater than 0.', 'danger')
+            elif frequency not in FREQUENCIES:
+                flash('Please choose how often the transfer should run.', 'danger')
+            elif start_date < datetime.now().date() or (end_date and end_date < start_date):
+                flash('The start date must be today or later, and before the end date.', 'danger')
+            else:
+                schedule_id = ScheduledTransfer.create(cursor, {
+                    'user_id': user_id,
+                    'from_account_id': from_account_id,
+                    'to_account_id': beneficiary['beneficiary_account_id'],
+                    'beneficiary_id': beneficiary_id,
+                    'amount': amount,
+                    'description': description or f"Standing order to {beneficiary['nickname'] or beneficiary['beneficiary_name']}",
+                    'frequency': frequency,
+                    'start_date': start_date,
+                    'end_date': end_date
+                })
+                mysql.connection.commit()
+                
+                write_to_audit_table(
+                    user_id,
+                    'SCHEDULE_TRANSFER',
+                    'scheduled_transfer',
+                    schedule_id,
+                    None,
+                    {
+                        'from': from_account['account_number'],
+                        'to': beneficiary['account_number'],
+                        'amount': str(amount),
+                        'frequency': frequency,
+                        'start_date': start_date.isoformat()
+                    }
+                )
+                flash('Scheduled transfer created.', 'success')
+            return redirect(url_for('customer.scheduled_transfers'))
+        
+        schedules = ScheduledTransfer.get_user_schedules(cursor, user_id)
+        return render_template('scheduled_transfers.html', accounts=accounts, beneficiaries=beneficiaries,
+                               schedules=schedules, frequencies=FREQUENCIES,
+                               today=datetime.now().date().isoformat())
+    
+    except Exception as e:
+        mysql.connection.rollback()
+        bank_logger.log_error(e, context="scheduled_transfers", user_id=user_id)
+        flash('Error loading scheduled transfers. Please try again.', 'danger')
+        return redirect(url_for('customer.dashboard'))
+    finally:
+        cursor.close()
+
+@customer_bp.route('/scheduled-transfers/<int:schedule_id>/cancel', methods=['POST'])
+@login_required
+def cancel_scheduled_transfer(schedule_id):
+    """Cancel a scheduled transfer"""
+    user_id = session['user_id']
+    cursor = mysql.connection.cursor()
+    
+    try:
+        cancelled = ScheduledTransfer.cancel(cursor, schedule_id, user_id)
+        mysql.connection.commit()
+        
+        if cancelled:
+            bank_logger.log_audit(
+                user_id,
+                get_client_ip(),
+                'CANCEL_SCHEDULED_TRANSFER',
+                {'schedule_id': schedule_id}
+            )
+            flash('Scheduled transfer cancelled.', 'success')
+        else:
+            flash('Scheduled transfer not found.', 'danger')
+    
+    except Exception as e:
+        mysql.connection.rollback()
+        bank_logger.log_error(e, context="cancel_scheduled_transfer", user_id=user_id)
+        flash('Error cancelling scheduled transfer.', 'danger')
+    finally:
+        cursor.close()
+    
+    return redirect(url_for('customer.scheduled_transfers'))
+
 @customer_bp.route('/check-session')
 def check_session():
     """Debug endpoint to check session status"""
@@ -0,0 +1,440 @@
+# utils/db.py
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import MySQLdb
+import MySQLdb.cursors
+from config import Config
+
+# MySQL error codes that mean "roll back and try the whole transaction again"
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+RETRYABLE_ERRORS = (DEADLOCK, LOCK_WAIT_TIMEOUT)
+
+
+def connect(config=Config, **overrides):
+    """Open a standalone connection (jobs, scripts and benchmarks)"""
+    params = {
+        'host': config.MYSQL_HOST,
+        'user': config.MYSQL_USER,
+        'passwd': config.MYSQL_PASSWORD,
+        'db': config.MYSQL_DB,
+        'port': config.MYSQL_PORT,
+        'charset': config.MYSQL_CHARSET,
+        'cursorclass': MySQLdb.cursors.DictCursor,
+        'autocommit': False,
+    }
+    params.update(overrides)
+    return MySQLdb.connect(**params)
+
+
+def is_retryable(error):
+    """True if a MySQL error is a deadlock or lock wait timeout"""
+    return isinstance(error, MySQLdb.OperationalError) and bool(error.args) and error.args[0] in RETRYABLE_ERRORS
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of open MySQLdb connections.
+
+    At most `size` connections are open; acquire() waits up to `timeout`
+    seconds for one to come back. Connections older than `recycle` seconds
+    are replaced on checkout, and one idle for `ping_after` seconds or more
+    is pinged first and replaced if the ping fails (0 = ping every checkout).
+    Idle connections are reused most-recently-used first so a quiet pool
+    keeps a few warm connections rather than cycling through all of them.
+    """
+
+    # Upper bounds (ms) of the wait-time histogram buckets
+    WAIT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self, factory, size=10, timeout=5.0, recycle=1800, ping_after=30):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._idle = deque()
+        self._born = {}
+        self._open = 0
+        self._cond = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_histogram = [0] * (len(self.WAIT_BUCKETS) + 1)
+
+    def acquire(self):
+        started = time.monotonic()
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no MySQL connection free after {self.timeout}s (pool size {self.size})")
+                self._cond.wait(remaining)
+            self._record_wait(time.monotonic() - started)
+
+        try:
+            if entry is None:
+                return self._create()
+            conn, last_used = entry
+            now = time.monotonic()
+            if self.recycle and now - self._born.get(id(conn), now) > self.recycle:
+                self.recycled += 1
+                self._close(conn)
+                return self._create()
+            if self.ping_after is not None and now - last_used >= self.ping_after:
+                try:
+                    conn.ping()
+                except MySQLdb.Error:
+                    self.ping_failures += 1
+                    self._close(conn)
+                    return self._create()
+            return conn
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection; any open transaction is rolled back"""
+        if not discard:
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                discard = True
+        with self._cond:
+            if discard:
+                self._close(conn)
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def warm_up(self, count=None):
+        """Open connections up front (up to `count`, default the pool size)"""
+        conns = []
+        try:
+            for _ in range(min(count or self.size, self.size)):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                self.release(conn)
+        return len(conns)
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+                self._open -= 1
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            open_count = self._open
+        return {
+            'size': self.size,
+            'open': open_count,
+            'idle': idle,
+            'in_use': open_count - idle,
+            'created': self.created,
+            'recycled': self.recycled,
+            'ping_failures': self.ping_failures,
+            'timeouts': self.timeouts,
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'wait_avg_ms': round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            'wait_max_ms': round(self.wait_max * 1000, 3),
+            'wait_histogram_ms': dict(zip([f'<={b}' for b in self.WAIT_BUCKETS] + ['>1000'], self.wait_histogram))
+        }
+
+    def _create(self):
+        conn = self.factory()
+        self._born[id(conn)] = time.monotonic()
+        self.created += 1
+        return conn
+
+    def _close(self, conn):
+        self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+
+    def _record_wait(self, seconds):
+        # Called with self._cond held
+        self.acquired += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        ms = seconds * 1000
+        if ms >= 1:
+            self.waited += 1
+        for i, bound in enumerate(self.WAIT_BUCKETS):
+            if ms <= bound:
+                self.wait_histogram[i] += 1
+                break
+        else:
+            self.wait_histogram[-1] += 1
+
+
+class PooledMySQL:
+    """Flask extension: pooled drop-in for flask_mysqldb.MySQL.
+
+    mysql.connection returns a primary connection checked out of the
+    worker's pool for the current app context; it goes back to the pool
+    (rolled back) at teardown. Pools are created lazily per process, so a
+    pool built before gunicorn forks is never shared between workers.
+
+    With MYSQL_REPLICA_HOST set, read-only code can ask for
+    mysql.read_connection() ("read, replica OK"). It gets the replica
+    unless the session wrote within the last MYSQL_PRIMARY_PIN_SECONDS
+    (read-your-writes) or the replica lags more than MYSQL_REPLICA_MAX_LAG
+    seconds or is unreachable; in those cases it gets the primary.
+    mysql.connection always means the primary.
+    """
+
+    PRIMARY = 'primary'
+    REPLICA = 'replica'
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pools = {}
+        self._pid = None
+        self._lock = threading.Lock()
+        self._replica_state = {'checked_at': 0.0, 'lag': None, 'healthy': False}
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('MYSQL_POOL_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5)
+        app.config.setdefault('MYSQL_POOL_RECYCLE', 1800)
+        app.config.setdefault('MYSQL_POOL_PING_AFTER', 30)
+        app.config.setdefault('MYSQL_POOL_WARMUP', 2)
+        app.config.setdefault('MYSQL_REPLICA_HOST', None)
+        app.config.setdefault('MYSQL_REPLICA_MAX_LAG', 5)
+        app.config.setdefault('MYSQL_REPLICA_CHECK_SECONDS', 2)
+        app.config.setdefault('MYSQL_PRIMARY_PIN_SECONDS', 5)
+        app.teardown_appcontext(self.teardown)
+        app.after_request(self._pin_after_write)
+        app.extensions['mysql'] = self
+
+    @property
+    def replica_enabled(self):
+        return bool(self.app.config.get('MYSQL_REPLICA_HOST'))
+
+    def _pool_for(self, role):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pools = {}
+                    self._pid = os.getpid()
+        pool = self._pools.get(role)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(role)
+                if pool is None:
+                    pool = self._pools[role] = self._build_pool(role)
+        return pool
+
+    def _build_pool(self, role):
+        config = self.app.config
+        prefix = 'MYSQL_REPLICA_' if role == self.REPLICA else 'MYSQL_'
+        cursorclass = getattr(MySQLdb.cursors, config.get('MYSQL_CURSORCLASS') or 'DictCursor')
+        params = {
+            'host': config[prefix + 'HOST'],
+            'user': config.get(prefix + 'USER') or config['MYSQL_USER'],
+            'passwd': config.get(prefix + 'PASSWORD') or config['MYSQL_PASSWORD'],
+            'db': config.get(prefix + 'DB') or config['MYSQL_DB'],
+            'port': config.get(prefix + 'PORT') or config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'cursorclass': cursorclass
+        }
+        return ConnectionPool(
+            lambda: connect(**params),
+            size=config.get(prefix + 'POOL_SIZE') or config['MYSQL_POOL_SIZE'],
+            timeout=config['MYSQL_POOL_TIMEOUT'],
+            recycle=config['MYSQL_POOL_RECYCLE'],
+            ping_after=config['MYSQL_POOL_PING_AFTER']
+        )
+
+    @property
+    def pool(self):
+        return self._pool_for(self.PRIMARY)
+
+    def _checkout(self, role):
+        from flask import g
+        key = f'_mysql_{role}_connection'
+        conn = g.get(key)
+        if conn is None:
+            conn = self._pool_for(role).acquire()
+            setattr(g, key, conn)
+        return conn
+
+    @property
+    def connection(self):
+        """Primary connection (writes and read-your-writes reads)"""
+        return self._checkout(self.PRIMARY)
+
+    def read_connection(self, replica_ok=True):
+        """Connection for a read: the replica when allowed and fresh enough"""
+        if self._read_role(replica_ok) == self.REPLICA:
+            try:
+                conn = self._checkout(self.REPLICA)
+                self.replica_reads += 1
+                return conn
+            except (MySQLdb.Error, PoolTimeout):
+                self._replica_state.update(healthy=False, checked_at=time.monotonic())
+                self.primary_fallbacks += 1
+        return self.connection
+
+    def detached(self, replica_ok=True):
+        """Context manager checking a read connection out of the pool directly.
+
+        For responses that outlive the view (streamed downloads): the
+        connection is not bound to the app context, so teardown does not
+        return it while the body is still being read. The role is chosen
+        now, in the request; the checkout happens when the block is entered.
+        A block left by an exception, including GeneratorExit when the
+        client goes away, closes the connection instead of pooling it, so a
+        half-read server-side result set is never drained or reused.
+        """
+        role = self._read_role(replica_ok)
+        if role == self.REPLICA:
+            self.replica_reads += 1
+
+        @contextmanager
+        def checkout():
+            pool = self._pool_for(role)
+            conn = pool.acquire()
+            discard = False
+            try:
+                yield conn
+            except BaseException:
+                discard = True
+                raise
+            finally:
+                pool.release(conn, discard=discard)
+        return checkout()
+
+    def _read_role(self, replica_ok):
+        if replica_ok and self.replica_enabled:
+            if not self._pinned() and self._replica_fresh():
+                return self.REPLICA
+            self.primary_fallbacks += 1
+        return self.PRIMARY
+
+    def _pinned(self):
+        from flask import session
+        return session.get('_primary_until', 0) > time.time()
+
+    def _pin_after_write(self, response):
+        """Pin the session to the primary for a while after a write request"""
+        from flask import g, request, session
+        if (self.replica_enabled and request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and g.get(f'_mysql_{self.PRIMARY}_connection') is not None):
+            session['_primary_until'] = time.time() + self.app.config['MYSQL_PRIMARY_PIN_SECONDS']
+        return response
+
+    def _replica_fresh(self):
+        """True if the replica answered its last lag check within MYSQL_REPLICA_MAX_LAG"""
+        state = self._replica_state
+        now = time.monotonic()
+        if now - state['checked_at'] >= self.app.config['MYSQL_REPLICA_CHECK_SECONDS']:
+            state['checked_at'] = now
+            lag = self._measure_lag()
+            max_lag = self.app.config['MYSQL_REPLICA_MAX_LAG']
+            state['lag'] = lag
+            state['healthy'] = max_lag < 0 or (lag is not None and lag <= max_lag)
+        return state['healthy']
+
+    def _measure_lag(self):
+        """Seconds behind the source, or None if unknown / not replicating.
+
+        MYSQL_REPLICA_MAX_LAG < 0 skips the check, for a plain second
+        instance standing in as the replica.
+        """
+        if self.app.config['MYSQL_REPLICA_MAX_LAG'] < 0:
+            return 0
+        pool = self._pool_for(self.REPLICA)
+        try:
+            conn = pool.acquire()
+        except (MySQLdb.Error, PoolTimeout):
+            return None
+        discard = False
+        try:
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                row = cursor.fetchone()
+                lag = row.get('Seconds_Behind_Source') if row else None
+            except MySQLdb.ProgrammingError:
+                # Before MySQL 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+                row = cursor.fetchone()
+                lag = row.get('Seconds_Behind_Master') if row else None
+            cursor.close()
+            return lag
+        except MySQLdb.Error:
+            discard = True
+            return None
+        finally:
+            pool.release(conn, discard=discard)
+
+    def teardown(self, exception):
+        from flask import g
+        discard = isinstance(exception, MySQLdb.OperationalError)
+        for role in (self.PRIMARY, self.REPLICA):
+            conn = g.pop(f'_mysql_{role}_connection', None)
+            if conn is not None:
+                self._pool_for(role).release(conn, discard=discard)
+
+    def warm_up(self, count=None):
+        """Open MYSQL_POOL_WARMUP connections before the worker takes traffic"""
+        count = self.app.config['MYSQL_POOL_WARMUP'] if count is None else count
+        if not count:
+            return 0
+        opened = self.pool.warm_up(count)
+        if self.replica_enabled:
+            try:
+                opened += self._pool_for(self.REPLICA).warm_up(count)
+            except MySQLdb.Error:
+                pass
+        return opened
+
+    def close(self):
+        if self._pid == os.getpid():
+            for pool in self._pools.values():
+                pool.close_all()
+
+    def stats(self):
+        stats = {'primary': self.pool.stats()}
+        if self.replica_enabled:
+            stats['replica'] = dict(self._pool_for(self.REPLICA).stats(),
+                                    lag=self._replica_state['lag'],
+                                    healthy=self._replica_state['healthy'],
+                                    reads=self.replica_reads,
+                                    primary_fallbacks=self.primary_fallbacks)
+        return stats
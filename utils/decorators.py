@@ -1,9 +1,14 @@
 # utils/decorators.py
+import hashlib
+import os
 from functools import wraps
-from flask import session, flash, redirect, url_for, request
+from flask import session, flash, redirect, url_for, request, current_app, make_response, get_flashed_messages
 from utils.logger import bank_logger
 from utils.helpers import get_client_ip
-from datetime import datetime
+from datetime import date, datetime
+
+# Templates' newest mtime plus ETAG_RELEASE, computed once per process
+_release = None
 
 def login_required(f):
     @wraps(f)
@@ -40,4 +45,74 @@ def log_performance(f):
         duration = (datetime.now() - start).total_seconds() * 1000
         # Log performance (you can implement this)
         return response
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def _release_key():
+    """Changes when templates (or ETAG_RELEASE) change, so a deploy invalidates every ETag"""
+    global _release
+    if _release is None:
+        newest = 0
+        folder = os.path.join(current_app.root_path, current_app.template_folder or 'templates')
+        for root, _, files in os.walk(folder):
+            for name in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+        _release = f"{current_app.config.get('ETAG_RELEASE', '')}:{newest}"
+    return _release
+
+def conditional_get(extra=None):
+    """ETag / 304 for GET pages built only from the logged-in user's data.
+    
+    Before the view runs, one indexed query (User.content_version) reads
+    what the user's pages depend on; the ETag hashes it with the URL, the
+    session's user/role and extra(**view_args) for anything else the
+    response depends on. A matching If-None-Match gets an empty 304 and the
+    view is never called. Otherwise the user's accounts are re-read into
+    the process account cache after the version, so the page tagged with
+    it is never rendered from older cached rows (the cache's own
+    updated_at marker only has one-second precision), and the cached
+    transaction counts are keyed on the version so a new one recounts.
+    Responses that show a flash message are not tagged.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return f(*args, **kwargs)
+            # Imported here: models import utils, not the other way round
+            from extensions import mysql
+            from models.user import User
+            from models.account_cache import account_cache
+            from models.transaction_history import TransactionHistory
+            
+            user_id = session['user_id']
+            cursor = mysql.read_connection().cursor()
+            try:
+                version = User.content_version(cursor, user_id)
+                if version:
+                    # The day is included for relative periods ("last 30 days", ?months=N)
+                    parts = (_release_key(), date.today(), user_id, session.get('username'), session.get('role'),
+                             request.full_path, sorted(version.items()), extra(**kwargs) if extra else None)
+                    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+                    matched = request.if_none_match.contains_weak(etag)
+                    if not matched:
+                        account_cache.get_user_accounts(cursor, user_id, active_only=False, fresh=True)
+                        TransactionHistory.note_version(user_id, version)
+            except Exception as e:
+                bank_logger.log_error(e, context="conditional_get", user_id=user_id)
+                return f(*args, **kwargs)
+            finally:
+                cursor.close()
+            if not version:
+                return f(*args, **kwargs)
+            
+            if matched:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or get_flashed_messages():
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -14,6 +14,12 @@ def get_client_ip():
         return request.headers.get('X-Forwarded-For').split(',')[0]
     return request.remote_addr or '127.0.0.1'
 
+def get_idempotency_key():
+    """Client-supplied idempotency key (Idempotency-Key header or form field)"""
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or ''
+    key = key.strip()
+    return key[:64] or None
+
 def generate_account_number(user_id=None):
     """Generate unique account number"""
     time_part = str(int(time.time() * 1000))[-8:]
@@ -2,21 +2,109 @@
 import logging
 import logging.handlers
 import os
+import atexit
+import copy
+import queue
+import threading
+import time
 import traceback
 import json
-from datetime import datetime
+from datetime import date, datetime, timezone
+from decimal import Decimal
 import socket
+from config import Config
 
-class JSONFormatter(logging.Formatter):
-    """Custom JSON formatter for SIEM-compatible logs"""
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used without it
+    orjson = None
+
+
+def _json_default(value):
+    """Decimal amounts as exact strings, dates in ISO 8601, anything else as str()"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_details(value):
+    """Audit details given as a JSON string are embedded as JSON"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+# Declared fields per event_type (the 'extra' the BankingLogger.log_* methods
+# set), in output order: a record attribute name, or (name, converter).
+# Keyword arguments passed on by log_app/log_transaction/log_error arrive as
+# the 'fields' dict and are appended after them.
+LOG_SCHEMAS = {
+    None: (),
+    'transaction': ('transaction_id', 'from_account', 'to_account', 'amount', 'status', 'user_id', 'event_type'),
+    'audit': ('user_id', 'ip_address', 'action', ('details', _json_details), 'event_type'),
+    'error': ('error', 'error_type', 'traceback', 'event_type'),
+    'performance': ('endpoint', 'duration_ms', 'user_id', 'event_type'),
+}
+
+
+class LogSerializer:
+    """Record -> one JSON line, from the schema of the record's event_type.
     
-    def __init__(self):
-        super().__init__()
+    Each schema is compiled once into (attribute, converter) pairs, so a
+    record costs one dict lookup per declared field instead of a hasattr
+    probe per known name. The hostname is read once and the timestamp's
+    '%Y-%m-%dT%H:%M:%S.' prefix is formatted once per second from
+    record.created (the time of the call, not of the write). orjson is
+    used when installed (non-str dict keys allowed; a record it cannot
+    encode falls back to json), otherwise a reused compact json.JSONEncoder.
+    """
+    
+    BACKENDS = ('orjson', 'json')
+    
+    def __init__(self, schemas=None, backend=None):
+        backend = backend or ('orjson' if orjson is not None else 'json')
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("orjson is not installed")
+        self.backend = backend
+        self._encode = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(',', ':')).encode
+        self._dumps = self._orjson_dumps if backend == 'orjson' else self._encode
         self.hostname = socket.gethostname()
+        self._compiled = {event_type: self._compile(fields)
+                          for event_type, fields in (schemas or LOG_SCHEMAS).items()}
+        self._second = (None, '')
     
-    def format(self, record):
+    def _orjson_dumps(self, obj):
+        try:
+            return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # Integers beyond 64 bits and the like: stdlib json still writes the record
+            return self._encode(obj)
+    
+    @staticmethod
+    def _compile(fields):
+        return tuple((f, None) if isinstance(f, str) else tuple(f) for f in fields)
+    
+    def timestamp(self, created):
+        """UTC ISO 8601 with microseconds and a Z suffix"""
+        second = int(created)
+        cached = self._second
+        if cached[0] != second:
+            cached = (second, datetime.fromtimestamp(second, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.'))
+            self._second = cached
+        return f"{cached[1]}{int((created - second) * 1000000):06d}Z"
+    
+    def serialize(self, record):
+        attrs = record.__dict__
+        fields = self._compiled.get(attrs.get('event_type')) or self._compiled[None]
         log_record = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': self.timestamp(record.created),
             'hostname': self.hostname,
             'level': record.levelname,
             'logger': record.name,
@@ -25,6 +113,16 @@ class JSONFormatter(logging.Formatter):
             'line': record.lineno,
             'message': record.getMessage(),
         }
+        for name, convert in fields:
+            if name in attrs:
+                value = attrs[name]
+                log_record[name] = convert(value) if convert is not None else value
+        
+        # Caller keyword arguments; never replace the fields above
+        extra = attrs.get('fields')
+        if extra:
+            for name, value in extra.items():
+                log_record.setdefault(name, value)
         
         # Add exception info if present
         if record.exc_info:
@@ -34,86 +132,236 @@ class JSONFormatter(logging.Formatter):
                 'traceback': traceback.format_exception(*record.exc_info)
             }
         
-        # Add custom fields from 'extra' parameter
-        if hasattr(record, 'user_id'):
-            log_record['user_id'] = record.user_id
-        if hasattr(record, 'ip'):
-            log_record['ip_address'] = record.ip
-        if hasattr(record, 'action'):
-            log_record['action'] = record.action
-        if hasattr(record, 'details'):
-            try:
-                # Try to parse details as JSON
-                if isinstance(record.details, str):
-                    log_record['details'] = json.loads(record.details)
+        return self._dumps(log_record)
+
+
+class JSONFormatter(logging.Formatter):
+    """Custom JSON formatter for SIEM-compatible logs (see LogSerializer)"""
+    
+    def __init__(self, backend=None):
+        super().__init__()
+        self.serializer = LogSerializer(backend=backend)
+    
+    def format(self, record):
+        return self.serializer.serialize(record)
+
+class LogQueue(queue.Queue):
+    """Bounded record queue with an overflow policy for when the writer falls behind.
+
+    - 'block': the logging thread waits for room (nothing is lost),
+    - 'drop-debug': DEBUG records are dropped, everything else waits,
+    - 'drop-oldest': the oldest queued record makes room (never waits).
+
+    The listener's stop sentinel (None) always waits for room.
+    """
+
+    POLICIES = ('block', 'drop-debug', 'drop-oldest')
+
+    def __init__(self, maxsize, policy='drop-debug'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.high_water = 0
+
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            if self.maxsize > 0 and self._qsize() >= self.maxsize:
+                if item is not None and self.policy == 'drop-oldest':
+                    self._get()
+                    self.unfinished_tasks -= 1
+                    self.dropped += 1
+                elif item is not None and self.policy == 'drop-debug' and item.levelno <= logging.DEBUG:
+                    self.dropped += 1
+                    return
                 else:
-                    log_record['details'] = record.details
-            except:
-                log_record['details'] = record.details
-        
-        return json.dumps(log_record)
+                    self.blocked += 1
+                    while self._qsize() >= self.maxsize:
+                        self.not_full.wait()
+            self._put(item)
+            self.unfinished_tasks += 1
+            if item is not None:
+                self.enqueued += 1
+            self.high_water = max(self.high_water, self._qsize())
+            self.not_empty.notify()
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    """Hands records to the BankingLogger writer thread instead of writing them"""
+
+    def __init__(self, owner):
+        super().__init__(None)
+        self.owner = owner
+
+    def prepare(self, record):
+        # Same process, so no pickling: only fix the message now, in case
+        # the args change before the writer gets to the record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self.owner.enqueue(record)
+
+
+class LogWriter(logging.handlers.QueueListener):
+    """Background thread writing queued records to their logger's file handler"""
+
+    # Report dropped records at most this often (seconds)
+    REPORT_INTERVAL = 60
+
+    def __init__(self, log_queue, routes):
+        super().__init__(log_queue, *routes.values(), respect_handler_level=True)
+        self.routes = routes
+        self.written = 0
+        self._reported_dropped = 0
+        self._reported_at = 0.0
+
+    def handle(self, record):
+        handler = self.routes.get(record.name)
+        if handler is not None and record.levelno >= handler.level:
+            handler.handle(record)
+        self.written += 1
+        dropped = self.queue.dropped
+        if dropped != self._reported_dropped and time.monotonic() - self._reported_at >= self.REPORT_INTERVAL:
+            self.report_dropped()
+
+    def report_dropped(self):
+        """Write a warning to the application log if records were dropped since the last one"""
+        dropped = self.queue.dropped
+        if dropped == self._reported_dropped:
+            return
+        record = logging.getLogger('application').makeRecord(
+            'application', logging.WARNING, __file__, 0, 'Log records dropped (queue full)', None, None,
+            extra={'fields': {'dropped': dropped - self._reported_dropped, 'dropped_total': dropped,
+                              'policy': self.queue.policy, 'queue_size': self.queue.maxsize}}
+        )
+        self.routes['application'].handle(record)
+        self._reported_dropped = dropped
+        self._reported_at = time.monotonic()
+
 
 class BankingLogger:
-    """Centralized logging for banking application - SIEM Compatible"""
+    """Centralized logging for banking application - SIEM Compatible
+    
+    Each log_* call only puts the record on a bounded in-process queue
+    (LOG_QUEUE_SIZE); one writer thread formats it and writes it to the
+    rotating file, so JSON encoding, disk writes and 10 MB rollovers never
+    run on a request thread. When the queue is full LOG_QUEUE_POLICY
+    decides between waiting and dropping (see LogQueue). The writer is
+    started per process on first use (so it survives a gunicorn fork) and
+    close() drains the queue at exit. LOG_QUEUE_SIZE=0 writes synchronously.
+    """
     
-    def __init__(self):
+    # (attribute, logger name, level, file)
+    LOGS = (
+        ('app_logger', 'application', logging.DEBUG, 'logs/application.json'),
+        ('txn_logger', 'transactions', logging.INFO, 'logs/transactions.json'),
+        ('audit_logger', 'audit', logging.INFO, 'logs/audit.json'),
+        ('error_logger', 'errors', logging.ERROR, 'logs/errors.json'),
+        ('perf_logger', 'performance', logging.INFO, 'logs/performance.json'),
+    )
+    
+    def __init__(self, queue_size=10000, policy='drop-debug', json_backend=None):
         # Create logs directory if it doesn't exist
         if not os.path.exists('logs'):
             os.makedirs('logs')
         
         # JSON Formatter for all logs
-        json_formatter = JSONFormatter()
-        
-        # 1. Application Log
-        self.app_logger = logging.getLogger('application')
-        self.app_logger.setLevel(logging.DEBUG)
-        app_handler = logging.handlers.RotatingFileHandler(
-            'logs/application.json', maxBytes=10485760, backupCount=5
-        )
-        app_handler.setFormatter(json_formatter)
-        self.app_logger.addHandler(app_handler)
+        json_formatter = JSONFormatter(backend=json_backend)
         
-        # 2. Transaction Log
-        self.txn_logger = logging.getLogger('transactions')
-        self.txn_logger.setLevel(logging.INFO)
-        txn_handler = logging.handlers.RotatingFileHandler(
-            'logs/transactions.json', maxBytes=10485760, backupCount=5
-        )
-        txn_handler.setFormatter(json_formatter)
-        self.txn_logger.addHandler(txn_handler)
+        self.queue_size = queue_size
+        self.policy = policy
+        self._queue = None
+        self._writer = None
+        self._pid = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._handler = QueuedHandler(self) if queue_size > 0 else None
         
-        # 3. Audit Log
-        self.audit_logger = logging.getLogger('audit')
-        self.audit_logger.setLevel(logging.INFO)
-        audit_handler = logging.handlers.RotatingFileHandler(
-            'logs/audit.json', maxBytes=10485760, backupCount=5
-        )
-        audit_handler.setFormatter(json_formatter)
-        self.audit_logger.addHandler(audit_handler)
-        
-        # 4. Error Log
-        self.error_logger = logging.getLogger('errors')
-        self.error_logger.setLevel(logging.ERROR)
-        error_handler = logging.handlers.RotatingFileHandler(
-            'logs/errors.json', maxBytes=10485760, backupCount=5
-        )
-        error_handler.setFormatter(json_formatter)
-        self.error_logger.addHandler(error_handler)
+        # Application, transaction, audit, error and performance logs
+        self.file_handlers = {}
+        for attr, name, level, filename in self.LOGS:
+            logger = logging.getLogger(name)
+            logger.setLevel(level)
+            file_handler = logging.handlers.RotatingFileHandler(
+                filename, maxBytes=10485760, backupCount=5, encoding='utf-8'
+            )
+            file_handler.setFormatter(json_formatter)
+            self.file_handlers[name] = file_handler
+            logger.addHandler(self._handler or file_handler)
+            setattr(self, attr, logger)
         
-        # 5. Performance Log
-        self.perf_logger = logging.getLogger('performance')
-        self.perf_logger.setLevel(logging.INFO)
-        perf_handler = logging.handlers.RotatingFileHandler(
-            'logs/performance.json', maxBytes=10485760, backupCount=5
-        )
-        perf_handler.setFormatter(json_formatter)
-        self.perf_logger.addHandler(perf_handler)
+        if self._handler is not None:
+            atexit.register(self.close)
+    
+    def _start(self):
+        """Start this process's writer (again after a fork: the parent's thread is gone)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = LogQueue(self.queue_size, self.policy)
+            self._writer = LogWriter(self._queue, self.file_handlers)
+            self._writer.start()
+            self._pid = os.getpid()
+    
+    def enqueue(self, record):
+        if self._closed:
+            # After close() (e.g. from later atexit handlers): write directly
+            handler = self.file_handlers.get(record.name)
+            if handler is not None and record.levelno >= handler.level:
+                handler.handle(record)
+            return
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put_nowait(record)
+    
+    def flush(self, timeout=5.0):
+        """Wait until every queued record is written; False if it took longer than timeout"""
+        log_queue = self._queue
+        if log_queue is None or self._pid != os.getpid():
+            return True
+        with log_queue.all_tasks_done:
+            return log_queue.all_tasks_done.wait_for(lambda: log_queue.unfinished_tasks == 0, timeout)
+    
+    def close(self):
+        """Drain the queue, stop the writer and flush the files (atexit, gunicorn worker_exit)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer if self._pid == os.getpid() else None
+        if writer is not None:
+            writer.stop()
+            writer.report_dropped()
+        for handler in self.file_handlers.values():
+            handler.flush()
+    
+    def stats(self):
+        """Queue depth and counters for this process"""
+        log_queue = self._queue if self._pid == os.getpid() else None
+        if log_queue is None:
+            return {'queued': self._handler is not None, 'running': False}
+        return {
+            'queued': True,
+            'running': not self._closed,
+            'policy': log_queue.policy,
+            'maxsize': log_queue.maxsize,
+            'depth': log_queue.qsize(),
+            'high_water': log_queue.high_water,
+            'enqueued': log_queue.enqueued,
+            'written': self._writer.written,
+            'dropped': log_queue.dropped,
+            'blocked': log_queue.blocked
+        }
     
     def log_app(self, level, message, **kwargs):
         """Log application event"""
-        extra = {}
-        extra.update(kwargs)
-        getattr(self.app_logger, level)(message, extra=extra)
+        getattr(self.app_logger, level)(message, extra={'fields': kwargs})
     
     def log_transaction(self, transaction_id, from_acc, to_acc, amount, status, user_id=None, **kwargs):
         """Log financial transaction"""
@@ -124,9 +372,9 @@ class BankingLogger:
             'amount': amount,
             'status': status,
             'user_id': user_id or 'system',
-            'event_type': 'transaction'
+            'event_type': 'transaction',
+            'fields': kwargs
         }
-        extra.update(kwargs)
         self.txn_logger.info('Transaction', extra=extra)
     
     def log_audit(self, user_id, ip, action, details):
@@ -146,9 +394,9 @@ class BankingLogger:
             'error': str(error),
             'error_type': type(error).__name__,
             'traceback': traceback.format_exc(),
-            'event_type': 'error'
+            'event_type': 'error',
+            'fields': kwargs
         }
-        extra.update(kwargs)
         self.error_logger.error('Error occurred', extra=extra)
     
     def log_performance(self, endpoint, duration_ms, user_id=None):
@@ -162,4 +410,5 @@ class BankingLogger:
         self.perf_logger.info('Performance Metric', extra=extra)
 
 # Create global logger instance
-bank_logger = BankingLogger()
\ No newline at end of file
+bank_logger = BankingLogger(queue_size=Config.LOG_QUEUE_SIZE, policy=Config.LOG_QUEUE_POLICY,
+                            json_backend=Config.LOG_JSON_BACKEND or None)
\ No newline at end of file
@@ -0,0 +1,63 @@
+# utils/pagination.py
+from datetime import datetime
+from decimal import Decimal
+from itsdangerous import URLSafeSerializer, BadSignature
+from config import Config
+
+
+class KeysetCursor:
+    """Opaque, signed page tokens for keyset (seek) pagination.
+
+    A token carries the sort key of the row at the edge of a page, e.g.
+    (initiated_at, transaction_id), plus the direction to read from it.
+    The next page is read with WHERE key < token-key (or > for the
+    previous page) over an index in key order, so every page costs the
+    same however deep it is. Tokens are signed so they can be passed back
+    untouched by the client but not forged.
+    """
+
+    NEXT = 'n'
+    PREV = 'p'
+
+    def __init__(self, salt, secret_key=None):
+        self._serializer = URLSafeSerializer(secret_key or Config.SECRET_KEY, salt=salt)
+
+    def encode(self, key, direction):
+        """Token for reading in `direction` from the key tuple"""
+        values = [v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, Decimal) else v for v in key]
+        return self._serializer.dumps([direction, values])
+
+    def decode(self, token, types):
+        """(direction, key) from a token, or (None, None) if it is missing or invalid.
+
+        types converts each key value back, e.g. (datetime, int); None
+        values (NULL sort keys) stay None.
+        """
+        if not token:
+            return None, None
+        try:
+            direction, values = self._serializer.loads(token)
+            if direction not in (self.NEXT, self.PREV) or len(values) != len(types):
+                return None, None
+            key = tuple(None if v is None else datetime.fromisoformat(v) if t is datetime else t(v)
+                        for t, v in zip(types, values))
+            return direction, key
+        except (BadSignature, TypeError, ValueError, ArithmeticError):
+            return None, None
+
+    def page(self, rows, key, direction, limit, has_more):
+        """Tokens around a page of rows already in display order.
+
+        rows holds at most `limit` rows; has_more says whether the read
+        found a row beyond them in `direction`. Returns (next, prev).
+        """
+        if not rows:
+            return None, None
+        first, last = key(rows[0]), key(rows[-1])
+        if direction == self.PREV:
+            next_token = self.encode(last, self.NEXT)
+            prev_token = self.encode(first, self.PREV) if has_more else None
+        else:
+            next_token = self.encode(last, self.NEXT) if has_more else None
+            prev_token = self.encode(first, self.PREV) if direction == self.NEXT else None
+        return next_token, prev_token
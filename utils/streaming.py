@@ -0,0 +1,80 @@
+# utils/streaming.py
+import csv
+import io
+import itertools
+import json
+from datetime import date
+from decimal import Decimal
+from utils.logger import bank_logger
+
+# Leading characters that make a spreadsheet read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def buffered(chunks, size=16384):
+    """Re-chunk an iterable of strings into pieces of about `size` characters.
+
+    Template and row generators yield many tiny strings; sending each as
+    its own chunked-encoding frame costs more than the data itself.
+    """
+    parts = []
+    length = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def logged(chunks, context, user_id=None, size=16384):
+    """buffered(chunks), logging any error raised while streaming.
+
+    Headers are already sent once streaming starts, so errors can only be logged.
+    """
+    try:
+        yield from buffered(chunks, size=size)
+    except Exception as e:
+        bank_logger.log_error(e, context=context, user_id=user_id)
+        raise
+
+
+def csv_text(value):
+    """A text cell a spreadsheet will not evaluate: formula-like strings get a leading quote"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(header, rows):
+    """CSV text for a header and an iterable of row sequences, one line at a time.
+
+    String cells go through csv_text, so user-typed text (descriptions,
+    references) opens as text, not a formula. Numbers and dates are left as is.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in itertools.chain([header] if header else [], rows):
+        out.seek(0)
+        out.truncate()
+        writer.writerow([csv_text(value) for value in row])
+        yield out.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(records):
+    """Newline-delimited JSON, one record per line (Decimal as string, dates ISO)"""
+    for record in records:
+        yield json.dumps(record, default=_json_default, separators=(',', ':')) + '\n'